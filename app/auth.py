@@ -1,3 +1,4 @@
+import os
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -15,6 +16,13 @@ from .schemas import TokenData
 SECRET_KEY = "your-secret-key-here-change-in-production"  # Change this in production!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Contas com acesso aos endpoints /admin (métricas e diagnóstico), separadas por
+# vírgula na variável ADMIN_EMAILS; vazia (padrão) = /admin desabilitado para todos
+ADMIN_EMAILS = frozenset(
+    email.strip().lower()
+    for email in os.environ.get("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+)
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -58,6 +66,16 @@ def verify_token(token: str, credentials_exception: HTTPException) -> TokenData:
         raise credentials_exception
 
 
+def token_user_id(token: str) -> Optional[int]:
+    """User id from the "uid" claim of a valid token; None if invalid or issued without it."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    user_id = payload.get("uid")
+    return user_id if isinstance(user_id, int) else None
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
 ) -> User:
@@ -81,3 +99,13 @@ def get_current_user(
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get the current active user (for future use if we add user status)."""
     return current_user
+
+
+def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+    """Restrict operational endpoints (metrics, diagnostics) to the admin accounts."""
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores",
+        )
+    return current_user
@@ -1,10 +1,23 @@
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
 
 from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import (
+    String,
+    and_,
+    bindparam,
+    case,
+    cast,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    type_coerce,
+    update,
+)
 
 from . import models, schemas
 
@@ -86,16 +99,65 @@ def list_products(
     fornecedor_id: Optional[int] = None,
     low_stock: Optional[bool] = None,
 ) -> List[models.Product]:
-    q = db.query(models.Product).filter(models.Product.user_id == user_id)
+    q = db.query(models.Product).filter(
+        *_product_filters(user_id, nome, categoria, fornecedor_id, low_stock)
+    )
+    return q.order_by(models.Product.nome).all()
+
+
+def _product_filters(user_id, nome, categoria, fornecedor_id, low_stock) -> list:
+    conditions = [models.Product.user_id == user_id]
     if nome:
-        q = q.filter(models.Product.nome.ilike(f"%{nome}%"))
+        conditions.append(models.Product.nome.ilike(f"%{nome}%"))
     if categoria:
-        q = q.filter(models.Product.categoria == categoria)
+        conditions.append(models.Product.categoria == categoria)
     if fornecedor_id:
-        q = q.filter(models.Product.fornecedor_id == fornecedor_id)
+        conditions.append(models.Product.fornecedor_id == fornecedor_id)
     if low_stock is True:
-        q = q.filter(models.Product.quantidade <= models.Product.estoque_minimo)
-    return q.order_by(models.Product.nome).all()
+        conditions.append(models.Product.quantidade <= models.Product.estoque_minimo)
+    return conditions
+
+
+# Colunas de schemas.Product (em_estoque_baixo é calculado na projeção)
+_PRODUCT_COLUMNS = (
+    models.Product.id,
+    models.Product.user_id,
+    models.Product.codigo,
+    models.Product.nome,
+    models.Product.categoria,
+    models.Product.quantidade,
+    models.Product.preco,
+    models.Product.descricao,
+    models.Product.fornecedor_id,
+    models.Product.estoque_minimo,
+    models.Product.lead_time_days,
+    models.Product.safety_stock,
+    models.Product.last_sale_date,
+    models.Product.criado_em,
+    models.Product.atualizado_em,
+)
+
+
+def list_products_rows(
+    db: Session,
+    user_id: int,
+    nome: Optional[str] = None,
+    categoria: Optional[str] = None,
+    fornecedor_id: Optional[int] = None,
+    low_stock: Optional[bool] = None,
+) -> List[dict]:
+    """Same listing as `list_products`, projected from SQL straight into response dicts."""
+    q = (
+        db.query(*_PRODUCT_COLUMNS)
+        .filter(*_product_filters(user_id, nome, categoria, fornecedor_id, low_stock))
+        .order_by(models.Product.nome)
+    )
+    products = []
+    for row in q:
+        product = row._asdict()
+        product["em_estoque_baixo"] = product["quantidade"] <= product["estoque_minimo"]
+        products.append(product)
+    return products
 
 
 def get_product(db: Session, product_id: int, user_id: int) -> models.Product:
@@ -225,16 +287,307 @@ def set_stock(
     return product
 
 
+MOVEMENTS_PAGE_SIZE = 100
+
+
+# No SQLite, criado_em pode estar gravado com ou sem microssegundos (server_default
+# vs. valores do Python); o cursor guarda o valor bruto para comparar texto com texto.
+_movement_criado_em_raw = type_coerce(models.StockMovement.criado_em, String)
+
+
+def decode_movement_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        criado_em, movement_id = cursor.rsplit("_", 1)
+        datetime.fromisoformat(criado_em)
+        return criado_em, int(movement_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+
+
+def _movement_filters(
+    product_id: int,
+    date_from: Optional[date],
+    date_to: Optional[date],
+    tipo: Optional[models.MovementType] = None,
+) -> list:
+    filters = [models.StockMovement.produto_id == product_id]
+    if date_from:
+        filters.append(
+            models.StockMovement.criado_em >= datetime.combine(date_from, datetime.min.time())
+        )
+    if date_to:
+        # date_to é inclusivo
+        filters.append(
+            models.StockMovement.criado_em
+            < datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+        )
+    if tipo:
+        filters.append(models.StockMovement.tipo == tipo)
+    return filters
+
+
 def list_movements(
-    db: Session, product_id: int, user_id: int
-) -> List[models.StockMovement]:
+    db: Session,
+    product_id: int,
+    user_id: int,
+    limit: int = MOVEMENTS_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    tipo: Optional[models.MovementType] = None,
+) -> Tuple[List[models.StockMovement], Optional[str]]:
+    """Return one page of movements (newest first) and the cursor of the next page."""
     get_product(db, product_id, user_id)  # valida existência
-    return (
-        db.query(models.StockMovement)
-        .filter(models.StockMovement.produto_id == product_id)
-        .order_by(models.StockMovement.criado_em.desc())
+    q = db.query(models.StockMovement, _movement_criado_em_raw).filter(
+        *_movement_filters(product_id, date_from, date_to, tipo)
+    )
+    if cursor:
+        cursor_criado_em, cursor_id = decode_movement_cursor(cursor)
+        q = q.filter(
+            or_(
+                _movement_criado_em_raw < cursor_criado_em,
+                and_(
+                    _movement_criado_em_raw == cursor_criado_em,
+                    models.StockMovement.id < cursor_id,
+                ),
+            )
+        )
+    rows = (
+        q.order_by(models.StockMovement.criado_em.desc(), models.StockMovement.id.desc())
+        .limit(limit + 1)
         .all()
     )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, last_criado_em = rows[-1]
+        next_cursor = f"{last_criado_em}_{last.id}"
+    return [movement for movement, _ in rows], next_cursor
+
+
+def daily_movement_totals(
+    db: Session,
+    product_id: int,
+    user_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[dict]:
+    """Daily IN/OUT/ADJUST buckets for a product, aggregated in SQL."""
+    get_product(db, product_id, user_id)  # valida existência
+    quantidade = func.abs(models.StockMovement.quantidade_alterada)
+    tipo = models.StockMovement.tipo
+    dia = func.date(models.StockMovement.criado_em).label("data")
+    entradas = func.sum(case((tipo == models.MovementType.IN, quantidade), else_=0))
+    saidas = func.sum(case((tipo == models.MovementType.OUT, quantidade), else_=0))
+    rows = (
+        db.query(
+            dia,
+            entradas.label("entradas"),
+            saidas.label("saidas"),
+            func.sum(case((tipo == models.MovementType.ADJUST, 1), else_=0)).label("ajustes"),
+            func.count(models.StockMovement.id).label("movimentos"),
+        )
+        .filter(*_movement_filters(product_id, date_from, date_to))
+        .group_by(dia)
+        .order_by(dia.desc())
+        .all()
+    )
+    # Dias já arquivados vêm dos resumos diários
+    summary = models.StockMovementSummary
+    archived = db.query(
+        summary.data, summary.entradas, summary.saidas, summary.ajustes, summary.movimentos
+    ).filter(summary.produto_id == product_id)
+    if date_from:
+        archived = archived.filter(summary.data >= date_from)
+    if date_to:
+        archived = archived.filter(summary.data <= date_to)
+
+    totals = {}
+    for row in [*rows, *archived]:
+        dia = row.data if isinstance(row.data, date) else date.fromisoformat(row.data)
+        bucket = totals.setdefault(
+            dia, {"data": dia, "entradas": 0, "saidas": 0, "ajustes": 0, "movimentos": 0}
+        )
+        for field in ("entradas", "saidas", "ajustes", "movimentos"):
+            bucket[field] += getattr(row, field) or 0
+    for bucket in totals.values():
+        bucket["liquido"] = bucket["entradas"] - bucket["saidas"]
+    return sorted(totals.values(), key=lambda bucket: bucket["data"], reverse=True)
+
+
+# Auto restock
+# Nível recomendado = 2x o estoque mínimo
+_recommended_stock = models.Product.estoque_minimo * 2
+_restock_needed = _recommended_stock - models.Product.quantidade
+_restock_filter = models.Product.quantidade < _recommended_stock
+_restock_urgency = case(
+    (models.Product.quantidade == 0, "critical"),
+    (models.Product.quantidade <= models.Product.estoque_minimo, "high"),
+    (models.Product.quantidade < _recommended_stock, "medium"),
+    else_="low",
+)
+_restock_urgency_rank = case(
+    (models.Product.quantidade == 0, 0),
+    (models.Product.quantidade <= models.Product.estoque_minimo, 1),
+    (models.Product.quantidade < _recommended_stock, 2),
+    else_=3,
+)
+
+
+def get_restock_analysis(
+    db: Session, user_id: int, limit: Optional[int] = None, offset: int = 0
+) -> dict:
+    """Products below the recommended level with supplier, cost and urgency, computed in SQL."""
+    rows = (
+        db.query(
+            models.Product.id,
+            models.Product.nome,
+            models.Product.codigo,
+            models.Product.categoria,
+            models.Product.quantidade,
+            models.Product.estoque_minimo,
+            models.Product.preco,
+            models.Supplier.id.label("supplier_id"),
+            models.Supplier.nome.label("supplier_nome"),
+            _recommended_stock.label("recommended_stock"),
+            _restock_needed.label("restock_needed"),
+            (_restock_needed * models.Product.preco).label("estimated_cost"),
+            _restock_urgency.label("urgency"),
+        )
+        .outerjoin(
+            models.Supplier,
+            and_(
+                models.Supplier.id == models.Product.fornecedor_id,
+                models.Supplier.user_id == user_id,
+            ),
+        )
+        .filter(models.Product.user_id == user_id, _restock_filter)
+        .order_by(_restock_urgency_rank, models.Product.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+    totals = (
+        db.query(
+            _restock_urgency.label("urgency"),
+            func.count(models.Product.id).label("items"),
+            func.sum(_restock_needed * models.Product.preco).label("cost"),
+        )
+        .filter(models.Product.user_id == user_id, _restock_filter)
+        .group_by(_restock_urgency)
+        .all()
+    )
+    counts = {row.urgency: row.items for row in totals}
+
+    return {
+        "restock_items": [
+            {
+                "product": {
+                    "id": row.id,
+                    "nome": row.nome,
+                    "codigo": row.codigo,
+                    "categoria": row.categoria,
+                    "quantidade": row.quantidade,
+                    "estoque_minimo": row.estoque_minimo,
+                    "preco": row.preco,
+                },
+                "supplier": (
+                    {"id": row.supplier_id, "nome": row.supplier_nome}
+                    if row.supplier_id
+                    else None
+                ),
+                "restock_info": {
+                    "current_stock": row.quantidade,
+                    "recommended_stock": row.recommended_stock,
+                    "restock_needed": row.restock_needed,
+                    "estimated_cost": row.estimated_cost,
+                    "urgency": row.urgency,
+                },
+            }
+            for row in rows
+        ],
+        "total_items": sum(counts.values()),
+        "total_cost": sum(row.cost or 0 for row in totals),
+        "critical_count": counts.get("critical", 0),
+        "high_count": counts.get("high", 0),
+        "medium_count": counts.get("medium", 0),
+        "low_count": counts.get("low", 0),
+        "offset": offset,
+        "limit": limit,
+    }
+
+
+def restock_all(db: Session, user_id: int) -> dict:
+    """Raise every product below the recommended level to it with set-based statements."""
+    product = models.Product
+    movement_table = models.StockMovement.__table__
+    motivo = (
+        literal("Auto-restock: Reposição automática para ")
+        + cast(_recommended_stock, String)
+        + literal(" unidades")
+    )
+    # Trava os candidatos: no Postgres (READ COMMITTED) cada instrução enxerga os commits
+    # mais recentes, e uma venda entre o INSERT e o UPDATE desparearia movimento e estoque
+    candidates = db.scalars(
+        select(product.id)
+        .where(product.user_id == user_id, _restock_filter)
+        .with_for_update()
+    ).all()
+    locked = product.id.in_(candidates)
+
+    # Movimentos antes do UPDATE: o mesmo filtro ainda enxerga o estoque anterior
+    movements = db.execute(
+        insert(movement_table)
+        .from_select(
+            [
+                "user_id",
+                "produto_id",
+                "tipo",
+                "quantidade_alterada",
+                "quantidade_resultante",
+                "motivo",
+            ],
+            select(
+                product.user_id,
+                product.id,
+                literal(models.MovementType.IN, movement_table.c.tipo.type),
+                _restock_needed,
+                _recommended_stock,
+                motivo,
+            ).where(locked),
+        )
+        .returning(movement_table.c.produto_id, movement_table.c.quantidade_alterada)
+    ).all()
+    restock_amounts = dict(movements)
+
+    updated = db.execute(
+        update(product)
+        .where(locked)
+        .values(quantidade=_recommended_stock)
+        .returning(product.id, product.nome, product.preco, product.quantidade)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    # Resposta montada antes do commit: um erro aqui não vira 500 de uma escrita já gravada
+    restocked_products = [
+        {
+            "product": row.nome,
+            "product_id": row.id,
+            "previous_stock": row.quantidade - restock_amounts[row.id],
+            "new_stock": row.quantidade,
+            "restock_amount": restock_amounts[row.id],
+            "cost": restock_amounts[row.id] * row.preco,
+        }
+        for row in sorted(updated, key=lambda row: row.id)
+    ]
+    db.commit()
+    return {
+        "message": f"Successfully restocked {len(restocked_products)} products",
+        "restocked_products": restocked_products,
+        "total_value": sum(item["cost"] for item in restocked_products),
+        "products_restocked": len(restocked_products),
+    }
 
 
 # Purchase Orders
@@ -244,11 +597,19 @@ def create_purchase_order(
     # Validate supplier exists
     get_supplier(db, data.fornecedor_id, user_id)
 
+    # Validate all products in one query
+    product_ids = {item.produto_id for item in data.items}
+    found = {
+        product_id
+        for (product_id,) in db.query(models.Product.id).filter(
+            models.Product.id.in_(product_ids), models.Product.user_id == user_id
+        )
+    }
+    if found != product_ids:
+        raise HTTPException(status_code=404, detail="Produto não encontrado.")
+
     # Calculate total value
-    total_value = 0.0
-    for item in data.items:
-        get_product(db, item.produto_id, user_id)
-        total_value += item.quantidade_solicitada * item.preco_unitario
+    total_value = sum(item.quantidade_solicitada * item.preco_unitario for item in data.items)
 
     # Create purchase order
     purchase_order = models.PurchaseOrder(
@@ -262,14 +623,19 @@ def create_purchase_order(
     db.flush()  # Get the ID
 
     # Create purchase order items
-    for item in data.items:
-        po_item = models.PurchaseOrderItem(
-            purchase_order_id=purchase_order.id,
-            produto_id=item.produto_id,
-            quantidade_solicitada=item.quantidade_solicitada,
-            preco_unitario=item.preco_unitario,
+    if data.items:
+        db.execute(
+            insert(models.PurchaseOrderItem),
+            [
+                {
+                    "purchase_order_id": purchase_order.id,
+                    "produto_id": item.produto_id,
+                    "quantidade_solicitada": item.quantidade_solicitada,
+                    "preco_unitario": item.preco_unitario,
+                }
+                for item in data.items
+            ],
         )
-        db.add(po_item)
 
     db.commit()
     db.refresh(purchase_order)
@@ -348,12 +714,65 @@ def list_purchase_orders(
     status: Optional[models.PurchaseOrderStatus] = None,
     fornecedor_id: Optional[int] = None,
 ) -> List[models.PurchaseOrder]:
-    q = db.query(models.PurchaseOrder).filter(models.PurchaseOrder.user_id == user_id)
+    q = db.query(models.PurchaseOrder).filter(
+        *_purchase_order_filters(user_id, status, fornecedor_id)
+    )
+    return q.order_by(models.PurchaseOrder.criado_em.desc()).all()
+
+
+def _purchase_order_filters(user_id, status, fornecedor_id) -> list:
+    conditions = [models.PurchaseOrder.user_id == user_id]
     if status:
-        q = q.filter(models.PurchaseOrder.status == status)
+        conditions.append(models.PurchaseOrder.status == status)
     if fornecedor_id:
-        q = q.filter(models.PurchaseOrder.fornecedor_id == fornecedor_id)
-    return q.order_by(models.PurchaseOrder.criado_em.desc()).all()
+        conditions.append(models.PurchaseOrder.fornecedor_id == fornecedor_id)
+    return conditions
+
+
+def list_purchase_orders_rows(
+    db: Session,
+    user_id: int,
+    status: Optional[models.PurchaseOrderStatus] = None,
+    fornecedor_id: Optional[int] = None,
+) -> List[dict]:
+    """`list_purchase_orders` as schemas.PurchaseOrder dicts, orders and items in two queries."""
+    conditions = _purchase_order_filters(user_id, status, fornecedor_id)
+    orders = [
+        row._asdict()
+        for row in db.query(
+            models.PurchaseOrder.id,
+            models.PurchaseOrder.user_id,
+            models.PurchaseOrder.fornecedor_id,
+            models.PurchaseOrder.status,
+            models.PurchaseOrder.total_value,
+            models.PurchaseOrder.observacoes,
+            models.PurchaseOrder.criado_em,
+        )
+        .filter(*conditions)
+        .order_by(models.PurchaseOrder.criado_em.desc())
+    ]
+    if not orders:
+        return orders
+
+    items_by_order = {}
+    for order in orders:
+        order["items"] = items_by_order[order["id"]] = []
+    items = (
+        db.query(
+            models.PurchaseOrderItem.id,
+            models.PurchaseOrderItem.purchase_order_id,
+            models.PurchaseOrderItem.produto_id,
+            models.PurchaseOrderItem.quantidade_solicitada,
+            models.PurchaseOrderItem.preco_unitario,
+            models.PurchaseOrderItem.criado_em,
+        )
+        .join(models.PurchaseOrder)
+        .filter(*conditions)
+        .order_by(models.PurchaseOrderItem.id)
+    )
+    for row in items:
+        items_by_order[row.purchase_order_id].append(row._asdict())
+    return orders
 
 
 def get_purchase_orders_statistics(db: Session, user_id: int) -> dict:
@@ -436,18 +855,15 @@ def approve_purchase_order(
             status_code=400, detail="Apenas pedidos pendentes podem ser aprovados."
         )
 
+    from .services import outbox
+
     po.status = models.PurchaseOrderStatus.APPROVED
     po.aprovado_em = datetime.now()
 
-    # Create a real sale from the approved purchase order
-    try:
-        sale = create_sale_from_purchase_order(db, po_id, user_id)
-        print(f"✅ Venda criada: Sale #{sale.id} - R$ {sale.total_value:.2f}")
-    except Exception as e:
-        print(f"❌ Erro ao criar venda: {e}")
-        # Continue with approval even if sale creation fails
-
+    # A venda é criada em segundo plano; o job é gravado na mesma transação da aprovação
+    outbox.enqueue(db, user_id, outbox.JOB_SALE_FROM_PURCHASE_ORDER, [po_id])
     db.commit()
+    outbox.wake_worker()
     db.refresh(po)
     return po
 
@@ -471,49 +887,145 @@ def reject_purchase_order(
 
 
 def receive_purchase_order_items(
-    db: Session, po_id: int, item_receipts: List[dict], user_id: int
-) -> models.PurchaseOrder:
+    db: Session,
+    po_id: int,
+    item_receipts: List[schemas.PurchaseOrderReceiptItem],
+    user_id: int,
+    allow_over_receipt: bool = True,
+) -> dict:
     """
     Receive items from a purchase order and update stock.
-    item_receipts should be a list of dicts with 'item_id' and 'quantidade_recebida'
+
+    Each receipt carries the quantity arriving now; it is added to the item's
+    quantidade_recebida, so partial deliveries can be received in several calls.
     """
-    po = get_purchase_order(db, po_id, user_id)
-    if po.status != models.PurchaseOrderStatus.APPROVED:
+    status = (
+        db.query(models.PurchaseOrder.status)
+        .filter(models.PurchaseOrder.id == po_id, models.PurchaseOrder.user_id == user_id)
+        .scalar()
+    )
+    if status is None:
+        raise HTTPException(status_code=404, detail="Pedido de compra não encontrado.")
+    if status != models.PurchaseOrderStatus.APPROVED:
         raise HTTPException(
             status_code=400, detail="Apenas pedidos aprovados podem receber itens."
         )
 
+    # Linhas repetidas para o mesmo item são somadas
+    arriving = {}
     for receipt in item_receipts:
-        item = db.get(models.PurchaseOrderItem, receipt["item_id"])
-        if not item or item.purchase_order_id != po_id:
-            raise HTTPException(
-                status_code=404, detail="Item do pedido não encontrado."
-            )
+        arriving[receipt.item_id] = arriving.get(receipt.item_id, 0) + receipt.quantidade_recebida
+
+    # Itens do pedido e produtos em uma consulta
+    rows = (
+        db.query(
+            models.PurchaseOrderItem.id,
+            models.PurchaseOrderItem.produto_id,
+            models.PurchaseOrderItem.quantidade_solicitada,
+            func.coalesce(models.PurchaseOrderItem.quantidade_recebida, 0).label("recebida"),
+            models.Product.quantidade.label("estoque"),
+        )
+        .join(models.Product, models.PurchaseOrderItem.produto_id == models.Product.id)
+        .filter(
+            models.PurchaseOrderItem.purchase_order_id == po_id,
+            models.Product.user_id == user_id,
+        )
+        .order_by(models.PurchaseOrderItem.id)
+        .all()
+    )
+    items = {row.id: row for row in rows}
+    if set(arriving) - set(items):
+        raise HTTPException(status_code=404, detail="Item do pedido não encontrado.")
+
+    lines = []
+    item_updates = []
+    movements = []
+    stock = {row.produto_id: row.estoque for row in rows}
+    for row in rows:
+        agora = arriving.get(row.id, 0)
+        recebida = row.recebida + agora
+        lines.append(
+            {
+                "item_id": row.id,
+                "produto_id": row.produto_id,
+                "quantidade_solicitada": row.quantidade_solicitada,
+                "quantidade_recebida": recebida,
+                "recebido_agora": agora,
+                "pendente": max(0, row.quantidade_solicitada - recebida),
+                "excedente": max(0, recebida - row.quantidade_solicitada),
+            }
+        )
+        if not agora:
+            continue
+        item_updates.append({"id": row.id, "quantidade_recebida": recebida})
+        stock[row.produto_id] += agora
+        movements.append(
+            {
+                "user_id": user_id,
+                "produto_id": row.produto_id,
+                "tipo": models.MovementType.IN,
+                "quantidade_alterada": agora,
+                "quantidade_resultante": stock[row.produto_id],
+                "motivo": f"Recebimento do pedido #{po_id}",
+            }
+        )
 
-        # Update received quantity
-        item.quantidade_recebida = receipt["quantidade_recebida"]
-
-        # Add stock to product
-        if receipt["quantidade_recebida"] > 0:
-            product = get_product(db, item.produto_id, user_id)
-            product.quantidade += receipt["quantidade_recebida"]
-            _create_movement(
-                db,
-                product,
-                models.MovementType.IN,
-                receipt["quantidade_recebida"],
-                f"Recebimento do pedido #{po_id}",
-            )
+    over_received = [
+        line["item_id"] for line in lines if line["excedente"] and line["recebido_agora"]
+    ]
+    if over_received and not allow_over_receipt:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Quantidade recebida maior que a solicitada nos itens {over_received}.",
+        )
 
+    if item_updates:
+        db.execute(update(models.PurchaseOrderItem), item_updates)
+        products = models.Product.__table__
+        increments = {}
+        for movement in movements:
+            increments[movement["produto_id"]] = (
+                increments.get(movement["produto_id"], 0) + movement["quantidade_alterada"]
+            )
+        db.execute(
+            update(products)
+            .where(products.c.id == bindparam("produto_id"))
+            .values(quantidade=products.c.quantidade + bindparam("incremento")),
+            [
+                {"produto_id": produto_id, "incremento": incremento}
+                for produto_id, incremento in increments.items()
+            ],
+        )
+        db.execute(insert(models.StockMovement), movements)
     db.commit()
-    db.refresh(po)
-    return po
+
+    return {
+        "message": "Items received successfully",
+        "purchase_order_id": po_id,
+        "itens_recebidos": len(item_updates),
+        "quantidade_total": sum(arriving.values()),
+        "completo": all(line["pendente"] == 0 for line in lines),
+        "linhas": lines,
+    }
 
 
 def auto_generate_purchase_order(
     db: Session, fornecedor_id: int, user_id: int
 ) -> models.PurchaseOrder:
     """Auto-generate a purchase order for a supplier based on low stock items."""
+    from .services import reorder_engine
+
+    if reorder_engine.ENGINE_AVAILABLE:
+        # Ponto de pedido / lote econômico a partir da previsão de demanda
+        orders = reorder_engine.generate_draft_orders(db, user_id, [fornecedor_id])
+        if not orders:
+            raise HTTPException(
+                status_code=404,
+                detail="No products found that need restocking for this supplier",
+            )
+        return orders[0]
+
+    # Sem pandas/numpy: regra fixa de 2x o estoque mínimo
     # Get all products that need restocking for this supplier
     # Use 2x minimum stock as threshold for more useful auto-generation
     products = (
@@ -567,6 +1079,52 @@ def auto_generate_purchase_order(
     return po
 
 
+def batch_generate_purchase_orders(
+    db: Session, user_id: int, fornecedor_ids: Optional[List[int]] = None
+) -> dict:
+    """Generate draft purchase orders for many suppliers at once and summarize them."""
+    from .services import reorder_engine
+
+    if not reorder_engine.ENGINE_AVAILABLE:
+        raise HTTPException(
+            status_code=503, detail="Geração em lote requer pandas e numpy instalados."
+        )
+
+    start = datetime.now()
+    suppliers_query = db.query(models.Supplier.id, models.Supplier.nome).filter(
+        models.Supplier.user_id == user_id
+    )
+    if fornecedor_ids:
+        suppliers_query = suppliers_query.filter(models.Supplier.id.in_(fornecedor_ids))
+    suppliers = dict(suppliers_query.all())
+    missing = sorted(set(fornecedor_ids or []) - set(suppliers))
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Fornecedores não encontrados: {missing}"
+        )
+
+    orders = reorder_engine.generate_draft_orders(db, user_id, list(suppliers))
+    purchase_orders = [
+        {
+            "id": po.id,
+            "fornecedor_id": po.fornecedor_id,
+            "fornecedor_nome": suppliers[po.fornecedor_id],
+            "itens": len(po.items),
+            "total_value": po.total_value,
+        }
+        for po in orders
+    ]
+    with_orders = {po.fornecedor_id for po in orders}
+    return {
+        "pedidos": len(purchase_orders),
+        "itens": sum(po["itens"] for po in purchase_orders),
+        "valor_total": sum(po["total_value"] for po in purchase_orders),
+        "fornecedores_sem_itens": sorted(set(suppliers) - with_orders),
+        "purchase_orders": purchase_orders,
+        "elapsed_seconds": round((datetime.now() - start).total_seconds(), 3),
+    }
+
+
 # Sales CRUD
 def create_sale(db: Session, sale_data: schemas.SaleCreate, user_id: int) -> models.Sale:
     """Create a new sale and update product stock."""
@@ -579,29 +1137,26 @@ def create_sale(db: Session, sale_data: schemas.SaleCreate, user_id: int) -> mod
     db.add(sale)
     db.flush()  # To get the sale ID
 
-    # Create sale items and update stock
-    for item_data in sale_data.items:
-        # Create sale item
-        sale_item = models.SaleItem(
-            sale_id=sale.id,
-            produto_id=item_data.produto_id,
-            quantidade=item_data.quantidade,
-            preco_unitario=item_data.preco_unitario,
-            preco_total=item_data.preco_total
-        )
-        db.add(sale_item)
-
-        # Update product stock
-        product = db.query(models.Product).filter(
-            models.Product.id == item_data.produto_id,
-            models.Product.user_id == user_id
-        ).first()
-
-        if product:
-            # Reduce stock
-            product.quantidade = max(0, product.quantidade - item_data.quantidade)
-            # Update last sale date
-            product.last_sale_date = func.now()
+    # Itens e baixa de estoque em lote (um INSERT e um UPDATE, não um SELECT por item)
+    if sale_data.items:
+        db.execute(
+            insert(models.SaleItem),
+            [
+                {
+                    "sale_id": sale.id,
+                    "produto_id": item.produto_id,
+                    "quantidade": item.quantidade,
+                    "preco_unitario": item.preco_unitario,
+                    "preco_total": item.preco_total,
+                }
+                for item in sale_data.items
+            ],
+        )
+        stock_out = {}
+        for item in sale_data.items:
+            key = (user_id, item.produto_id)
+            stock_out[key] = stock_out.get(key, 0) + item.quantidade
+        _apply_stock_out(db, stock_out)
 
     db.commit()
     db.refresh(sale)
@@ -619,6 +1174,49 @@ def get_sales(db: Session, user_id: int, limit: int = 100) -> List[models.Sale]:
     )
 
 
+def get_sales_rows(db: Session, user_id: int, limit: int = 100) -> List[dict]:
+    """Latest sales as schemas.SaleOut dicts, items with product name and code, in two queries."""
+    # Vendas com os itens arquivados (services/archiver.py) ficam fora da listagem
+    has_items = (
+        select(models.SaleItem.id).where(models.SaleItem.sale_id == models.Sale.id).exists()
+    )
+    sales = [
+        row._asdict()
+        for row in db.query(
+            models.Sale.id, models.Sale.total_value, models.Sale.status, models.Sale.criado_em
+        )
+        .filter(models.Sale.user_id == user_id, has_items)
+        .order_by(models.Sale.criado_em.desc())
+        .limit(limit)
+    ]
+    if not sales:
+        return sales
+
+    items_by_sale = {}
+    for sale in sales:
+        sale["items"] = items_by_sale[sale["id"]] = []
+    items = (
+        db.query(
+            models.SaleItem.sale_id,
+            models.SaleItem.id,
+            models.SaleItem.produto_id,
+            models.SaleItem.quantidade,
+            models.SaleItem.preco_unitario,
+            models.SaleItem.preco_total,
+            models.SaleItem.criado_em,
+            func.coalesce(models.Product.nome, "Produto não encontrado").label("produto_nome"),
+            func.coalesce(models.Product.codigo, "N/A").label("produto_codigo"),
+        )
+        .outerjoin(models.Product, models.Product.id == models.SaleItem.produto_id)
+        .filter(models.SaleItem.sale_id.in_(list(items_by_sale)))
+        .order_by(models.SaleItem.id)
+    )
+    for row in items:
+        item = row._asdict()
+        items_by_sale[item.pop("sale_id")].append(item)
+    return sales
+
+
 def get_sale_with_details(db: Session, sale_id: int, user_id: int) -> dict:
     """Get sale with product details for API response."""
     from sqlalchemy.orm import joinedload
@@ -750,48 +1348,117 @@ def get_top_selling_products(db: Session, user_id: int, limit: int = 5) -> List[
         ]
 
 
-def create_sale_from_purchase_order(db: Session, po_id: int, user_id: int) -> models.Sale:
-    """Create a sale from an approved purchase order."""
-    from sqlalchemy.orm import joinedload
+def create_sales_from_purchase_orders(db: Session, po_ids: List[int]) -> dict:
+    """
+    Create one COMPLETED sale per approved purchase order with set-based statements.
 
-    # Get the purchase order with items and products
-    po = (
-        db.query(models.PurchaseOrder)
-        .options(
-            joinedload(models.PurchaseOrder.items).joinedload(models.PurchaseOrderItem.produto)
+    Orders that are missing or no longer approved are skipped. Does not commit, so the
+    outbox worker can commit the sales together with the job status. Returns {po_id: sale_id}.
+    """
+    rows = db.execute(
+        select(
+            models.PurchaseOrder.id,
+            models.PurchaseOrder.user_id,
+            models.PurchaseOrderItem.produto_id,
+            models.PurchaseOrderItem.quantidade_solicitada,
+            models.PurchaseOrderItem.preco_unitario,
         )
-        .filter(
-            models.PurchaseOrder.id == po_id,
-            models.PurchaseOrder.user_id == user_id
+        .outerjoin(
+            models.PurchaseOrderItem,
+            models.PurchaseOrderItem.purchase_order_id == models.PurchaseOrder.id,
         )
-        .first()
-    )
-
-    if not po:
-        raise HTTPException(status_code=404, detail="Purchase order não encontrada.")
-
-    if po.status != models.PurchaseOrderStatus.APPROVED:
-        raise HTTPException(status_code=400, detail="Purchase order deve estar aprovada para criar venda.")
+        .where(
+            models.PurchaseOrder.id.in_(po_ids),
+            models.PurchaseOrder.status == models.PurchaseOrderStatus.APPROVED,
+        )
+        .order_by(models.PurchaseOrder.id, models.PurchaseOrderItem.id)
+    ).all()
+
+    orders = {}
+    for po_id, owner_id, produto_id, quantidade, preco_unitario in rows:
+        order = orders.setdefault(po_id, {"user_id": owner_id, "total_value": 0.0, "items": []})
+        if produto_id is None:
+            continue  # pedido sem itens: venda com valor zero, como antes
+        order["items"].append((produto_id, quantidade, preco_unitario))
+        order["total_value"] += quantidade * preco_unitario
+    if not orders:
+        return {}
+
+    sale_ids = db.scalars(
+        insert(models.Sale).returning(models.Sale.id, sort_by_parameter_order=True),
+        [
+            {
+                "user_id": order["user_id"],
+                "total_value": order["total_value"],
+                "status": models.SaleStatus.COMPLETED,
+            }
+            for order in orders.values()
+        ],
+    ).all()
+    sale_by_order = dict(zip(orders, sale_ids))
 
-    # Create sale items from purchase order items
     sale_items = []
-    total_value = 0
-
-    for po_item in po.items:
-        sale_item_data = schemas.SaleItemCreate(
-            produto_id=po_item.produto_id,
-            quantidade=po_item.quantidade_solicitada,
-            preco_unitario=po_item.preco_unitario,
-            preco_total=po_item.quantidade_solicitada * po_item.preco_unitario
+    stock_out = {}
+    for po_id, order in orders.items():
+        for produto_id, quantidade, preco_unitario in order["items"]:
+            sale_items.append(
+                {
+                    "sale_id": sale_by_order[po_id],
+                    "produto_id": produto_id,
+                    "quantidade": quantidade,
+                    "preco_unitario": preco_unitario,
+                    "preco_total": quantidade * preco_unitario,
+                }
+            )
+            key = (order["user_id"], produto_id)
+            stock_out[key] = stock_out.get(key, 0) + quantidade
+
+    if sale_items:
+        db.execute(insert(models.SaleItem), sale_items)
+        _apply_stock_out(db, stock_out)
+    return sale_by_order
+
+
+def _apply_stock_out(db: Session, stock_out: dict):
+    """Decrease stock of sold products in one executemany: {(user_id, produto_id): quantidade}."""
+    products = models.Product.__table__
+    db.execute(
+        update(products)
+        .where(
+            products.c.id == bindparam("produto_id"),
+            products.c.user_id == bindparam("dono_id"),
         )
-        sale_items.append(sale_item_data)
-        total_value += sale_item_data.preco_total
+        .values(
+            # Estoque nunca fica negativo
+            quantidade=case(
+                (
+                    products.c.quantidade > bindparam("baixa"),
+                    products.c.quantidade - bindparam("baixa"),
+                ),
+                else_=0,
+            ),
+            last_sale_date=func.now(),
+        ),
+        [
+            {"produto_id": produto_id, "dono_id": owner_id, "baixa": baixa}
+            for (owner_id, produto_id), baixa in stock_out.items()
+        ],
+    )
 
-    # Create the sale
-    sale_data = schemas.SaleCreate(
-        total_value=total_value,
-        status=schemas.SaleStatus.COMPLETED,
-        items=sale_items
+
+def create_sale_from_purchase_order(db: Session, po_id: int, user_id: int) -> models.Sale:
+    """Create a sale from an approved purchase order."""
+    status = (
+        db.query(models.PurchaseOrder.status)
+        .filter(models.PurchaseOrder.id == po_id, models.PurchaseOrder.user_id == user_id)
+        .scalar()
     )
+    if status is None:
+        raise HTTPException(status_code=404, detail="Purchase order não encontrada.")
 
-    return create_sale(db, sale_data, user_id)
+    if status != models.PurchaseOrderStatus.APPROVED:
+        raise HTTPException(status_code=400, detail="Purchase order deve estar aprovada para criar venda.")
+
+    sale_id = create_sales_from_purchase_orders(db, [po_id])[po_id]
+    db.commit()
+    return db.get(models.Sale, sale_id)
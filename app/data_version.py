@@ -0,0 +1,154 @@
+"""
+Versão dos dados de cada usuário (tenant), base dos ETags do GET condicional.
+
+Todo commit de uma Session que escreveu dados incrementa, na mesma transação,
+o contador do dono desses dados na tabela `data_versions`. O dono vem de:
+
+- `user_id` dos objetos ORM gravados no flush (o próprio `id` para User);
+- o usuário da requisição em andamento (`tenant`, definido pelo
+  ConditionalGetMiddleware a partir do token) para objetos sem `user_id` e
+  para INSERT/UPDATE/DELETE em massa via `Session.execute`;
+- `with tenant(user_ids):` em workers e scripts (um lote da outbox, por
+  exemplo, atribui as escritas a todos os usuários dos seus jobs).
+
+Tabelas operacionais (outbox, execuções do simulador) não contam.
+
+Sem nenhum deles a escrita incrementa a versão global (`GLOBAL_TENANT`), que
+entra em todo ETag: invalida o cache de todos, mas nunca valida dado velho.
+SQL cru (`connection.exec_driver_sql`) não passa pelos eventos: chame
+`mark_changed` depois dele.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import chain
+from typing import FrozenSet, Iterable, Optional, Tuple, Union
+
+from sqlalchemy import bindparam, event, insert, select, update
+from sqlalchemy.orm import Session
+
+GLOBAL_TENANT = 0
+_GLOBAL_ONLY = frozenset((GLOBAL_TENANT,))
+_CHANGED = "data_version_changed"
+
+_current_tenants: ContextVar[FrozenSet[int]] = ContextVar(
+    "data_version_tenants", default=frozenset()
+)
+
+
+def _table():
+    from .models import DataVersion
+
+    return DataVersion.__table__
+
+
+def _unversioned() -> tuple:
+    from .models import DataVersion, OutboxJob, SimulationRun
+
+    return (DataVersion, OutboxJob, SimulationRun)
+
+
+@contextmanager
+def tenant(user_ids: Union[int, Iterable[int]]):
+    """Attribute writes without an owning user_id to `user_ids` inside the block."""
+    ids = frozenset((user_ids,) if isinstance(user_ids, int) else user_ids)
+    token = _current_tenants.set(ids)
+    try:
+        yield
+    finally:
+        _current_tenants.reset(token)
+
+
+def mark_changed(session: Session, user_id: Optional[int] = None):
+    """Bump `user_id` (default: the current tenants) when the session commits."""
+    changed = session.info.setdefault(_CHANGED, set())
+    if user_id is not None:
+        changed.add(user_id)
+    else:
+        changed.update(_current_tenants.get() or _GLOBAL_ONLY)
+
+
+def _after_flush(session, flush_context):
+    from .models import User
+
+    unversioned = _unversioned()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, unversioned):
+            continue
+        mark_changed(session, obj.id if isinstance(obj, User) else getattr(obj, "user_id", None))
+
+
+def _do_orm_execute(orm_execute_state):
+    if not (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, _unversioned()):
+        return
+    mark_changed(orm_execute_state.session)
+
+
+def _before_commit(session):
+    # O flush final do commit acontece depois deste evento: antecipa para capturar tudo
+    session.flush()
+    changed = session.info.pop(_CHANGED, None)
+    if changed:
+        bump(session.connection(), changed)
+
+
+def _after_rollback(session):
+    session.info.pop(_CHANGED, None)
+
+
+def bump(connection, tenants: Iterable[int]):
+    """Increment the versions of `tenants` on `connection` (inside its transaction)."""
+    from .database import dialect_insert
+
+    table = _table()
+    try:
+        upsert = dialect_insert(connection)
+    except RuntimeError:
+        upsert = None
+    # Ordem fixa: duas transações nunca travam as mesmas linhas em ordem inversa
+    tenant_ids = sorted(tenants)
+    if upsert is not None:
+        # Um único executemany, qualquer que seja o número de tenants
+        connection.execute(
+            upsert(table)
+            .values(tenant_id=bindparam("tenant_id"), version=1)
+            .on_conflict_do_update(
+                index_elements=[table.c.tenant_id], set_={"version": table.c.version + 1}
+            ),
+            [{"tenant_id": tenant_id} for tenant_id in tenant_ids],
+        )
+        return
+    for tenant_id in tenant_ids:
+        result = connection.execute(
+            update(table).where(table.c.tenant_id == tenant_id).values(version=table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(tenant_id=tenant_id, version=1))
+
+
+def read_versions(connection, user_id: int) -> Tuple[int, int]:
+    """(user version, global version); 0 for tenants that never wrote."""
+    table = _table()
+    rows = connection.execute(
+        select(table.c.tenant_id, table.c.version).where(
+            table.c.tenant_id.in_((user_id, GLOBAL_TENANT))
+        )
+    )
+    versions = dict(rows.all())
+    return versions.get(user_id, 0), versions.get(GLOBAL_TENANT, 0)
+
+
+def install_data_versioning():
+    for name, listener in (
+        ("after_flush", _after_flush),
+        ("do_orm_execute", _do_orm_execute),
+        ("before_commit", _before_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
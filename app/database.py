@@ -1,22 +1,56 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./inventory.db"
+from .data_version import install_data_versioning
+from .slow_query_log import install_slow_query_log
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={
+# DATABASE_URL (ex.: docker-compose.prod.yml ou Postgres) sobrepõe o SQLite local
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./inventory.db")
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    connect_args = {
         "check_same_thread": False,  # necessário para SQLite com threads
         "timeout": 30,  # Timeout de 30 segundos para operações
-    },
+    }
+else:
+    connect_args = {}
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args=connect_args,
     echo=False,  # Desabilita logs SQL em produção
     future=True,  # Usa SQLAlchemy 2.0 style
 )
+# Consultas acima de SLOW_QUERY_MS vão para data/logs/slow_queries.jsonl e /admin/slow-queries
+install_slow_query_log(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Commits que escrevem dados incrementam data_versions (ETags do GET condicional)
+install_data_versioning()
 
 Base = declarative_base()
 
 
+def dialect_insert(bind):
+    """Return the dialect `insert` construct that supports ON CONFLICT (SQLite/Postgres)."""
+    dialect = bind.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise RuntimeError(f"Upsert não suportado para o banco {dialect}")
+    return insert
+
+
+def ensure_indexes():
+    """Create indexes declared on tables that already existed (create_all skips them)."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
 def get_db():
     db = SessionLocal()
     try:
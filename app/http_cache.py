@@ -0,0 +1,133 @@
+"""
+GET condicional (ETag / If-None-Match) para as rotas consultadas em polling.
+
+Rotas marcadas com `@conditional_get` respondem com um ETag fraco derivado da
+versão dos dados do usuário (data_version.py), da versão global, do dia
+corrente (análises com janelas de datas) e da URL. Quando o navegador
+revalida com `If-None-Match` e nada mudou, o middleware responde
+`304 Not Modified` direto, antes de autenticação, dependências e consultas do
+endpoint: o único acesso ao banco é a leitura das versões por chave primária
+(feita fora das estatísticas da requisição, então não entra no Server-Timing
+nem no orçamento de consultas da rota).
+
+O usuário vem do claim "uid" do token (verificado com a chave da aplicação);
+tokens sem ele seguem o caminho normal. `Cache-Control: private, no-cache`
+faz o navegador guardar a resposta e revalidar a cada polling, de forma
+transparente para o axios.
+"""
+
+import zlib
+from datetime import date
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import Match
+
+from . import instrumentation
+from .auth import token_user_id
+from .data_version import read_versions, tenant
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def conditional_get(endpoint):
+    """Mark a GET endpoint whose response depends only on the user's data (and the day)."""
+    endpoint.__conditional_get__ = True
+    return endpoint
+
+
+def _bearer_user_id(headers: Headers) -> Optional[int]:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token_user_id(token)
+
+
+def _load_versions(user_id: int):
+    from .database import engine
+
+    # Fora das estatísticas da requisição: não conta no orçamento de consultas da rota
+    with instrumentation.suspended(), engine.connect() as connection:
+        return read_versions(connection, user_id)
+
+
+def make_etag(user_id: int, versions, scope) -> str:
+    url = scope["path"].encode() + b"?" + scope.get("query_string", b"")
+    user_version, global_version = versions
+    return (
+        f'W/"{user_id}.{user_version}.{global_version}.'
+        f'{date.today():%Y%m%d}.{zlib.crc32(url):08x}"'
+    )
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110): W/ prefixes are ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(",")
+    )
+
+
+def _match_route(scope):
+    # Mesma regra do roteador: a primeira rota com casamento completo
+    for route in scope["app"].routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+class ConditionalGetMiddleware:
+    """Pure ASGI middleware: request tenant for data versioning, ETag/304 on marked routes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        user_id = _bearer_user_id(headers)
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        # Escritas desta requisição sem user_id no objeto contam para este usuário
+        with tenant(user_id):
+            await self._call_with_user(scope, receive, send, headers, user_id)
+
+    async def _call_with_user(self, scope, receive, send, headers, user_id: int):
+        route = _match_route(scope) if scope["method"] == "GET" else None
+        if route is None or not getattr(route.endpoint, "__conditional_get__", False):
+            await self.app(scope, receive, send)
+            return
+
+        versions = await run_in_threadpool(_load_versions, user_id)
+        etag = make_etag(user_id, versions, scope)
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            scope["route"] = route  # métricas por rota também contam os 304
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [
+                        (b"etag", etag.encode("latin-1")),
+                        (b"cache-control", CACHE_CONTROL.encode("latin-1")),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                response_headers = MutableHeaders(scope=message)
+                response_headers["etag"] = etag
+                response_headers["cache-control"] = CACHE_CONTROL
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
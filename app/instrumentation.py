@@ -0,0 +1,326 @@
+"""
+Instrumentação de desempenho por requisição.
+
+`InstrumentationMiddleware` (ASGI puro, não bufferiza streaming) cria um
+`RequestStats` em uma contextvar no início de cada requisição. Os hooks
+instalados por `install_sql_hooks` somam nele:
+
+- tempo e número de instruções SQL (`before_cursor_execute`/`after_cursor_execute`);
+- linhas devolvidas por SELECTs via ORM (`do_orm_execute`; consultas com
+  `yield_per`/`stream_results` não são contadas para não bufferizar o stream).
+
+`instrument_routes` marca o fim do endpoint; o tempo entre ele e o envio dos
+cabeçalhos é a serialização/renderização da resposta. Os números saem no
+cabeçalho `Server-Timing`, são agregados por rota em `route_metrics` e
+alimentam as métricas Prometheus (ver metrics.py).
+Fora de uma requisição (workers, scripts) os hooks não fazem nada.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute, request_response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import metrics, profiler, query_budget
+
+# Limites superiores (ms) do histograma de latência por rota
+LATENCY_BUCKETS_MS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, float("inf"),
+)
+
+
+class RequestStats:
+    __slots__ = (
+        "started", "sql_seconds", "sql_statements", "rows", "endpoint_done", "headers_at",
+        "shapes", "scope", "sampler",
+    )
+
+    def __init__(self, scope: Optional[dict] = None, track_shapes: bool = False):
+        self.started = time.perf_counter()
+        self.scope = scope
+        self.sql_seconds = 0.0
+        self.sql_statements = 0
+        self.rows = 0
+        self.endpoint_done: Optional[float] = None
+        self.headers_at: Optional[float] = None
+        # Formas das instruções, só com o orçamento de consultas ligado (ver query_budget.py)
+        self.shapes: Optional[Counter] = Counter() if track_shapes else None
+        # Profiler da requisição (cabeçalho X-Profile, ver profiler.py)
+        self.sampler = None
+
+    def route_key(self) -> str:
+        """"METHOD /route/{template}" (the router fills scope["route"] once it matches)."""
+        if self.scope is None:
+            return "<unknown>"
+        path = getattr(self.scope.get("route"), "path", None) or "<unmatched>"
+        return f"{self.scope.get('method')} {path}"
+
+    @property
+    def render_seconds(self) -> float:
+        if self.endpoint_done is None or self.headers_at is None:
+            return 0.0
+        return max(0.0, self.headers_at - self.endpoint_done)
+
+    def server_timing(self) -> str:
+        app_ms = ((self.headers_at or time.perf_counter()) - self.started) * 1000
+        return (
+            f'app;dur={app_ms:.1f}, '
+            f'db;dur={self.sql_seconds * 1000:.1f};'
+            f'desc="{self.sql_statements} queries, {self.rows} rows", '
+            f"render;dur={self.render_seconds * 1000:.1f}"
+        )
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+@contextmanager
+def suspended():
+    """Run infrastructure queries inside a request without counting them as its SQL."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+# SQL hooks
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("_query_started")
+    if started:
+        stats.sql_seconds += time.perf_counter() - started.pop()
+    stats.sql_statements += 1
+    if stats.shapes is not None:
+        stats.shapes[query_budget.statement_shape(statement)] += 1
+
+
+def _count_orm_rows(orm_execute_state):
+    if _current.get() is None or not orm_execute_state.is_select:
+        return None
+    options = orm_execute_state.execution_options
+    if options.get("yield_per") or options.get("stream_results"):
+        return None
+    frozen = orm_execute_state.invoke_statement().freeze()
+    _current.get().rows += len(frozen.data)
+    return frozen()
+
+
+def install_sql_hooks(engine):
+    """Attach the timing hooks to `engine` and row counting to every ORM Session."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if not event.contains(Session, "do_orm_execute", _count_orm_rows):
+        event.listen(Session, "do_orm_execute", _count_orm_rows)
+
+
+# Rotas
+def _mark_endpoint_done():
+    stats = _current.get()
+    if stats is not None:
+        stats.endpoint_done = time.perf_counter()
+
+
+def _timed_endpoint(call):
+    if hasattr(call, "__wrapped_by_instrumentation__"):
+        return call
+    if asyncio.iscoroutinefunction(call):
+
+        @wraps(call)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                _mark_endpoint_done()
+
+    else:
+
+        @wraps(call)
+        def wrapper(*args, **kwargs):
+            stats = _current.get()
+            if stats is not None and stats.sampler is not None:
+                stats.sampler.add_thread(threading.get_ident())
+            try:
+                return call(*args, **kwargs)
+            finally:
+                _mark_endpoint_done()
+
+    wrapper.__wrapped_by_instrumentation__ = True
+    return wrapper
+
+
+def instrument_routes(app):
+    """Wrap every API endpoint so the middleware can split handler and render time.
+
+    Call after all routers are included: the route handler captures the endpoint
+    when it is built, so it is rebuilt around the wrapped call.
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            route.dependant.call = _timed_endpoint(route.dependant.call)
+            route.app = request_response(route.get_route_handler())
+
+
+# Agregação por rota
+class RouteMetrics:
+    """In-memory per-route aggregates (one lock-protected dict update per request)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict] = {}
+
+    def record(self, key: str, status_code: int, wall_seconds: float, stats: RequestStats):
+        wall_ms = wall_seconds * 1000
+        bucket = next(i for i, limit in enumerate(LATENCY_BUCKETS_MS) if wall_ms <= limit)
+        with self._lock:
+            entry = self._routes.get(key)
+            if entry is None:
+                entry = self._routes[key] = {
+                    "requests": 0,
+                    "errors": 0,
+                    "wall_ms_total": 0.0,
+                    "wall_ms_max": 0.0,
+                    "sql_ms_total": 0.0,
+                    "sql_statements_total": 0,
+                    "sql_statements_max": 0,
+                    "rows_total": 0,
+                    "render_ms_total": 0.0,
+                    "histogram": [0] * len(LATENCY_BUCKETS_MS),
+                }
+            entry["requests"] += 1
+            if status_code >= 500:
+                entry["errors"] += 1
+            entry["wall_ms_total"] += wall_ms
+            entry["wall_ms_max"] = max(entry["wall_ms_max"], wall_ms)
+            entry["sql_ms_total"] += stats.sql_seconds * 1000
+            entry["sql_statements_total"] += stats.sql_statements
+            entry["sql_statements_max"] = max(entry["sql_statements_max"], stats.sql_statements)
+            entry["rows_total"] += stats.rows
+            entry["render_ms_total"] += stats.render_seconds * 1000
+            entry["histogram"][bucket] += 1
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def snapshot(self) -> List[Dict]:
+        """Per-route averages and approximate percentiles, slowest total time first."""
+        with self._lock:
+            routes = {key: dict(entry, histogram=list(entry["histogram"]))
+                      for key, entry in self._routes.items()}
+        result = []
+        for key, entry in routes.items():
+            n, histogram, max_ms = entry["requests"], entry["histogram"], entry["wall_ms_max"]
+            result.append(
+                {
+                    "route": key,
+                    "requests": n,
+                    "errors": entry["errors"],
+                    "avg_ms": round(entry["wall_ms_total"] / n, 2),
+                    "p50_ms": _histogram_percentile(histogram, n, 50, max_ms),
+                    "p95_ms": _histogram_percentile(histogram, n, 95, max_ms),
+                    "p99_ms": _histogram_percentile(histogram, n, 99, max_ms),
+                    "max_ms": round(max_ms, 2),
+                    "avg_sql_ms": round(entry["sql_ms_total"] / n, 2),
+                    "sql_share": (
+                        round(entry["sql_ms_total"] / entry["wall_ms_total"], 3)
+                        if entry["wall_ms_total"] else 0.0
+                    ),
+                    "avg_sql_statements": round(entry["sql_statements_total"] / n, 2),
+                    "max_sql_statements": entry["sql_statements_max"],
+                    "avg_rows": round(entry["rows_total"] / n, 1),
+                    "avg_render_ms": round(entry["render_ms_total"] / n, 2),
+                    "total_ms": round(entry["wall_ms_total"], 1),
+                }
+            )
+        result.sort(key=lambda r: r["total_ms"], reverse=True)
+        return result
+
+
+def _histogram_percentile(histogram: List[int], count: int, pct: float, max_ms: float) -> float:
+    """Upper bound (ms) of the bucket that contains the percentile, capped at the maximum."""
+    target = pct / 100 * count
+    seen = 0
+    for limit, bucket_count in zip(LATENCY_BUCKETS_MS, histogram):
+        seen += bucket_count
+        if seen >= target:
+            return round(min(limit, max_ms), 2)
+    return round(max_ms, 2)
+
+
+route_metrics = RouteMetrics()
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI middleware: Server-Timing header and per-route aggregation."""
+
+    def __init__(self, app, metrics: RouteMetrics = route_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope, track_shapes=query_budget.enabled())
+        status_code = 500
+        profile_id = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                stats.headers_at = time.perf_counter()
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                if profile_id is not None:
+                    headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        # Tudo que pode falhar fica dentro do try: a contextvar e o gauge de requisições
+        # em andamento são sempre restaurados
+        metrics.request_started()
+        token = _current.set(stats)
+        try:
+            if profiler.PROFILE_TOKEN:
+                header = dict(scope["headers"]).get(b"x-profile")
+                if profiler.request_profiling_allowed(header):
+                    profile_id, stats.sampler = profiler.start_request_profile()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            metrics.request_finished()
+            elapsed = time.perf_counter() - stats.started
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<unmatched>"
+            key = stats.route_key()
+            if stats.sampler is not None:
+                profiler.store_request_profile(profile_id, key, stats.sampler.stop())
+            self.metrics.record(key, status_code, elapsed, stats)
+            metrics.observe_request(scope["method"], path, status_code, elapsed, stats)
+            if stats.shapes is not None and route is not None:
+                query_budget.check_request(
+                    key, getattr(route, "endpoint", None), stats.sql_statements, stats.shapes
+                )
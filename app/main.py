@@ -13,14 +13,23 @@ PROPRIEDADE INTELECTUAL - NÃO COPIAR PARA TRABALHOS ACADÊMICOS
 Trabalho acadêmico original - Uso apenas para referência e estudo
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
-from .database import Base, engine
+from .database import Base, engine, ensure_indexes
+from . import metrics
+from .http_cache import ConditionalGetMiddleware
+from .instrumentation import InstrumentationMiddleware, install_sql_hooks, instrument_routes
+from .responses import DefaultJSONResponse
 from .routers import (
+    admin,
     alerts,
     auth,
     auto_restock,
+    export,
     insights,
     products,
     purchase_orders,
@@ -29,9 +38,30 @@ from .routers import (
     stock,
     suppliers,
 )
+from .services.outbox import OUTBOX_WORKER_ENABLED, outbox_worker
+from .services.sales_simulator import simulation_registry
+
+GZIP_MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6  # o padrão (9) custa bem mais CPU para quase nenhum ganho em JSON
 
 # cria as tabelas no primeiro run
 Base.metadata.create_all(bind=engine)
+ensure_indexes()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Worker da outbox (efeitos colaterais das aprovações) vive junto com a aplicação;
+    # simulações deste processo são paradas no desligamento
+    if OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
+    try:
+        yield
+    finally:
+        simulation_registry.shutdown()
+        outbox_worker.stop()
+        metrics.mark_process_dead()
+
 
 app = FastAPI(
     title="PC Express API",
@@ -41,8 +71,14 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    # orjson na codificação de todas as respostas JSON (ver responses.py)
+    default_response_class=DefaultJSONResponse,
+    lifespan=lifespan,
 )
 
+# ETag/304 nas rotas de polling; dentro do CORS para que os 304 levem os cabeçalhos CORS
+app.add_middleware(ConditionalGetMiddleware)
+
 # Configuração CORS
 app.add_middleware(
     CORSMiddleware,
@@ -57,7 +93,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "ETag"],
 )
+# Compressão das respostas JSON maiores (listagens, análises)
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_LEVEL)
+# Tempo total/SQL/serialização por requisição (cabeçalho Server-Timing e /admin/routes)
+app.add_middleware(InstrumentationMiddleware)
+install_sql_hooks(engine)
+metrics.install_pool_timer(engine)
 
 app.include_router(auth.router)
 app.include_router(suppliers.router)
@@ -69,6 +112,8 @@ app.include_router(sales.router)
 app.include_router(insights.router)
 app.include_router(auto_restock.router)
 app.include_router(simulation.router)
+app.include_router(export.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -79,3 +124,21 @@ def root():
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(authorization: str = Header("")):
+    """Prometheus exposition (aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set)."""
+    if not metrics.scrape_allowed(authorization):
+        raise HTTPException(
+            status_code=401,
+            detail="Token de coleta de métricas inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not metrics.PROMETHEUS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="prometheus_client não está instalado")
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
+# Depois de registrar todas as rotas
+instrument_routes(app)
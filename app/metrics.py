@@ -0,0 +1,168 @@
+"""
+Métricas no formato Prometheus (`GET /metrics`).
+
+Alimentadas pelo `InstrumentationMiddleware` (latência, SQL por rota e
+requisições em andamento), pelo pool de conexões (espera no checkout), pelo
+`MLPredictor` (fit/predict por tipo de modelo) e pelo cache de resultados de ML.
+
+Com vários workers do uvicorn, defina `PROMETHEUS_MULTIPROC_DIR` (diretório
+vazio, limpo a cada deploy) antes de iniciar o servidor: cada processo grava
+suas séries em arquivos mmap e `/metrics` agrega todos eles, em qualquer worker.
+
+Sem `prometheus_client` instalado tudo vira no-op e `/metrics` responde 503.
+
+Com `METRICS_TOKEN` definido, `/metrics` exige `Authorization: Bearer <token>`
+(`authorization.credentials` no scrape_config do Prometheus); sem ele fica
+aberto, então só exponha a porta do backend na rede interna (o nginx.conf já
+bloqueia `/api/metrics`).
+"""
+
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+SQL_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+ML_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+if PROMETHEUS_AVAILABLE:
+    REQUEST_DURATION = Histogram(
+        "http_request_duration_seconds",
+        "Request latency by route template.",
+        ["method", "route"],
+    )
+    REQUESTS = Counter(
+        "http_requests_total",
+        "Requests by route template and status.",
+        ["method", "route", "status"],
+    )
+    IN_PROGRESS = Gauge(
+        "http_requests_in_progress", "Requests being handled.", multiprocess_mode="livesum"
+    )
+    SQL_DURATION = Histogram(
+        "http_request_sql_duration_seconds", "SQL time per request.", ["method", "route"]
+    )
+    SQL_STATEMENTS = Histogram(
+        "http_request_sql_statements",
+        "SQL statements per request.",
+        ["method", "route"],
+        buckets=SQL_STATEMENT_BUCKETS,
+    )
+    POOL_CHECKOUT_WAIT = Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time waiting for a connection from the pool.",
+        buckets=POOL_WAIT_BUCKETS,
+    )
+    ML_DURATION = Histogram(
+        "ml_model_duration_seconds",
+        "MLPredictor fit/predict time by model kind.",
+        ["model", "phase"],
+        buckets=ML_BUCKETS,
+    )
+    ML_CACHE = Counter(
+        "ml_cache_requests_total",
+        "ML result cache lookups (hit, miss, coalesced).",
+        ["endpoint", "result"],
+    )
+
+
+def observe_request(method: str, route: str, status_code: int, seconds: float, stats):
+    if not PROMETHEUS_AVAILABLE:
+        return
+    REQUEST_DURATION.labels(method, route).observe(seconds)
+    REQUESTS.labels(method, route, str(status_code)).inc()
+    SQL_DURATION.labels(method, route).observe(stats.sql_seconds)
+    SQL_STATEMENTS.labels(method, route).observe(stats.sql_statements)
+
+
+def request_started():
+    if PROMETHEUS_AVAILABLE:
+        IN_PROGRESS.inc()
+
+
+def request_finished():
+    if PROMETHEUS_AVAILABLE:
+        IN_PROGRESS.dec()
+
+
+def observe_ml_cache(endpoint: str, result: str):
+    if PROMETHEUS_AVAILABLE:
+        ML_CACHE.labels(endpoint, result).inc()
+
+
+@contextmanager
+def ml_timer(model: str, phase: str):
+    """Time one model fit/predict call (`model` is the kind: demand, price, anomaly)."""
+    if not PROMETHEUS_AVAILABLE:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ML_DURATION.labels(model, phase).observe(time.perf_counter() - start)
+
+
+def install_pool_timer(engine):
+    """Time connection checkouts, including the wait when the pool is exhausted."""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    pool = engine.pool
+    if getattr(pool, "_checkout_timed", False):
+        return
+    do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+    pool._do_get = timed_do_get
+    pool._checkout_timed = True
+
+
+def render_latest() -> bytes:
+    """Exposition text for this process, or for every worker in multiprocess mode."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the shared directory on shutdown."""
+    if PROMETHEUS_AVAILABLE and MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def scrape_allowed(authorization: str) -> bool:
+    """True when no METRICS_TOKEN is configured or the Bearer token matches it."""
+    if not METRICS_TOKEN:
+        return True
+    scheme, _, token = (authorization or "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(
+        token.encode("utf-8"), METRICS_TOKEN.encode("utf-8")
+    )
@@ -18,13 +18,16 @@ import enum
 from sqlalchemy import (
     Boolean,
     Column,
+    Date,
     DateTime,
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -51,6 +54,21 @@ class SaleStatus(str, enum.Enum):
     REFUNDED = "REFUNDED"
 
 
+class OutboxJobStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class SimulationRunStatus(str, enum.Enum):
+    RUNNING = "RUNNING"
+    STOPPING = "STOPPING"
+    STOPPED = "STOPPED"
+    FINISHED = "FINISHED"
+    FAILED = "FAILED"
+
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -123,6 +141,15 @@ class Product(Base):
     )
     purchase_order_items = relationship("PurchaseOrderItem", back_populates="produto")
     sales = relationship("SaleItem", back_populates="produto")
+    snapshots = relationship(
+        "StockSnapshot", back_populates="produto", cascade="all, delete-orphan"
+    )
+    resumos_movimentos = relationship(
+        "StockMovementSummary", back_populates="produto", cascade="all, delete-orphan"
+    )
+    previsao_demanda = relationship(
+        "DemandForecast", back_populates="produto", uselist=False, cascade="all, delete-orphan"
+    )
 
     @property
     def em_estoque_baixo(self):
@@ -143,6 +170,89 @@ class StockMovement(Base):
 
     produto = relationship("Product", back_populates="movimentos")
 
+    # Histórico paginado por produto: keyset em (criado_em, id)
+    __table_args__ = (
+        Index("ix_stock_movements_produto_criado_em", "produto_id", "criado_em", "id"),
+    )
+
+
+class StockSnapshot(Base):
+    """Checkpoint diário do estoque de um produto (quantidade no fim do dia)."""
+
+    __tablename__ = "stock_snapshots"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    produto_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    data = Column(Date, nullable=False)
+    quantidade = Column(Integer, nullable=False)
+    # Último movimento já refletido na quantidade; o delta começa depois dele
+    ultimo_movimento_id = Column(Integer, nullable=True)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+
+    produto = relationship("Product", back_populates="snapshots")
+
+    __table_args__ = (
+        UniqueConstraint("produto_id", "data", name="uq_stock_snapshots_produto_data"),
+    )
+
+
+class StockMovementSummary(Base):
+    """Resumo diário por produto dos movimentos já arquivados (ver services/archiver.py)."""
+
+    __tablename__ = "stock_movement_daily"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    produto_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    data = Column(Date, nullable=False)
+    entradas = Column(Integer, nullable=False, default=0)
+    saidas = Column(Integer, nullable=False, default=0)
+    ajustes = Column(Integer, nullable=False, default=0)
+    movimentos = Column(Integer, nullable=False, default=0)
+    quantidade_final = Column(Integer, nullable=True)
+
+    produto = relationship("Product", back_populates="resumos_movimentos")
+
+    __table_args__ = (
+        UniqueConstraint("produto_id", "data", name="uq_stock_movement_daily_produto_data"),
+    )
+
+
+class SaleItemSummary(Base):
+    """Resumo diário por produto/status/preço dos itens de venda já arquivados."""
+
+    __tablename__ = "sale_item_daily"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    produto_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    data = Column(Date, nullable=False)
+    status = Column(Enum(SaleStatus), nullable=False)
+    preco_unitario = Column(Float, nullable=False)
+    quantidade = Column(Integer, nullable=False, default=0)
+    preco_total = Column(Float, nullable=False, default=0.0)
+    itens = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "produto_id", "data", "status", "preco_unitario", name="uq_sale_item_daily_chave"
+        ),
+    )
+
+
+class DemandForecast(Base):
+    """Previsão de demanda diária por produto, recalculada pelo motor de reposição."""
+
+    __tablename__ = "demand_forecasts"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    produto_id = Column(Integer, ForeignKey("products.id"), nullable=False, unique=True)
+    demanda_diaria = Column(Float, nullable=False, default=0.0)
+    desvio_diario = Column(Float, nullable=False, default=0.0)
+    dias_com_venda = Column(Integer, nullable=False, default=0)
+    janela_dias = Column(Integer, nullable=False)
+    atualizado_em = Column(DateTime(timezone=True), server_default=func.now())
+
+    produto = relationship("Product", back_populates="previsao_demanda")
+
 
 class Sale(Base):
     __tablename__ = "sales"
@@ -210,3 +320,60 @@ class PurchaseOrderItem(Base):
 
     purchase_order = relationship("PurchaseOrder", back_populates="items")
     produto = relationship("Product", back_populates="purchase_order_items")
+
+
+class OutboxJob(Base):
+    """Efeito colateral pendente, processado em segundo plano (ver services/outbox.py)."""
+
+    __tablename__ = "outbox_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    tipo = Column(String(50), nullable=False)
+    referencia_id = Column(Integer, nullable=False)
+    status = Column(
+        Enum(OutboxJobStatus), nullable=False, default=OutboxJobStatus.PENDING
+    )
+    tentativas = Column(Integer, nullable=False, default=0)
+    # Horário local (datetime.now()) a partir do qual o job pode ser reivindicado
+    disponivel_em = Column(DateTime(timezone=True), nullable=False)
+    reivindicado_em = Column(DateTime(timezone=True), nullable=True)
+    erro = Column(Text, nullable=True)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+    processado_em = Column(DateTime(timezone=True), nullable=True)
+
+    # Um job por efeito: reaprovar/reenfileirar o mesmo pedido não duplica a venda
+    __table_args__ = (
+        UniqueConstraint("tipo", "referencia_id", name="uq_outbox_jobs_tipo_referencia"),
+        Index("ix_outbox_jobs_status_disponivel_em", "status", "disponivel_em"),
+    )
+
+
+class SimulationRun(Base):
+    """Execução do simulador de vendas; estado compartilhado entre os workers da API."""
+
+    __tablename__ = "simulation_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(
+        Enum(SimulationRunStatus), nullable=False, default=SimulationRunStatus.RUNNING
+    )
+    duracao_minutos = Column(Integer, nullable=False)
+    max_pedidos_pendentes = Column(Integer, nullable=False)
+    pedidos_criados = Column(Integer, nullable=False, default=0)
+    # Processo que executa a simulação (host:pid)
+    executor = Column(String(255), nullable=True)
+    # Horários locais (datetime.now())
+    iniciado_em = Column(DateTime(timezone=True), nullable=False)
+    termina_em = Column(DateTime(timezone=True), nullable=False)
+    heartbeat_em = Column(DateTime(timezone=True), nullable=True)
+    finalizado_em = Column(DateTime(timezone=True), nullable=True)
+    erro = Column(Text, nullable=True)
+
+
+class DataVersion(Base):
+    """Contador de escritas por usuário (tenant_id 0 = global), base dos ETags (data_version.py)."""
+
+    __tablename__ = "data_versions"
+    # Sem FK: o tenant global (0) não é um usuário
+    tenant_id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
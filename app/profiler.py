@@ -0,0 +1,315 @@
+"""
+Profiler por amostragem de pilhas para o worker em execução.
+
+Uma thread amostra `sys._current_frames()` a cada `interval` segundos (sem
+trace/setprofile, então o custo é só o da amostragem) e conta as pilhas por
+thread. O resultado sai como:
+
+- `collapsed`: uma linha "thread;frame;frame N" por pilha (flamegraph.pl,
+  inferno, speedscope);
+- `speedscope`: JSON no formato "sampled" do https://www.speedscope.app;
+- `summary`: amostras por componente (SQLAlchemy, pandas, sklearn, Pydantic,
+  app...) atribuídas ao frame mais interno reconhecido, e as pilhas mais comuns.
+
+`/admin/profile` perfila o worker inteiro por N segundos. Com `PROFILE_TOKEN`
+definido, uma requisição com o cabeçalho `X-Profile: <token>` é perfilada
+sozinha (thread do event loop + thread que executa o endpoint) e o resultado
+fica em `/admin/profile/requests/<X-Profile-Id>`.
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_INTERVAL = 0.005
+MAX_PROFILE_SECONDS = 60
+REQUEST_PROFILE_INTERVAL = 0.001
+REQUEST_PROFILES_KEPT = 20
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Frame mais interno de uma thread parada esperando trabalho (arquivo, função)
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("runners.py", "run"),  # event loop do uvloop parado (o laço roda em C)
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+# Componentes do resumo, pelo diretório do pacote no caminho do arquivo
+COMPONENTS = (
+    "sqlalchemy",
+    "pandas",
+    "sklearn",
+    "numpy",
+    "scipy",
+    "pydantic",
+    "pydantic_core",
+    "fastapi",
+    "starlette",
+    "anyio",
+    "uvicorn",
+    "passlib",
+    "jose",
+)
+
+_busy = threading.Lock()
+request_profiles: "OrderedDict[str, Dict]" = OrderedDict()
+_request_profiles_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    marker = f"{os.sep}site-packages{os.sep}"
+    if marker in filename:
+        filename = filename.split(marker, 1)[1]
+    elif filename.startswith(APP_DIR):
+        filename = "app" + filename[len(APP_DIR):]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _component(code) -> Optional[str]:
+    path = code.co_filename
+    if path.startswith(APP_DIR):
+        return "app"
+    for name in COMPONENTS:
+        if f"{os.sep}{name}{os.sep}" in path:
+            return "pydantic" if name == "pydantic_core" else name
+    return None
+
+
+class Profile:
+    """Stack counts collected by a sampler."""
+
+    def __init__(self, samples: Counter, ticks: int, interval: float, duration: float):
+        self.samples = samples  # {(thread_name, (code, ...)): count}, pilhas da raiz à folha
+        self.ticks = ticks
+        self.interval = interval
+        self.duration = duration
+
+    def collapsed(self) -> str:
+        lines = []
+        for (thread_name, stack), count in self.samples.most_common():
+            frames = ";".join(_frame_label(code).replace(";", ",") for code in stack)
+            lines.append(f"{thread_name};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "pc-express") -> Dict:
+        frames: List[Dict] = []
+        index: Dict = {}
+        by_thread: Dict[str, Tuple[List, List]] = {}
+        for (thread_name, stack), count in self.samples.items():
+            indices = []
+            for code in stack:
+                i = index.get(code)
+                if i is None:
+                    i = index[code] = len(frames)
+                    frames.append(
+                        {
+                            "name": code.co_name,
+                            "file": code.co_filename,
+                            "line": code.co_firstlineno,
+                        }
+                    )
+                indices.append(i)
+            samples, weights = by_thread.setdefault(thread_name, ([], []))
+            samples.append(indices)
+            weights.append(round(count * self.interval, 6))
+        profiles = [
+            {
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            }
+            for thread_name, (samples, weights) in by_thread.items()
+        ]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "pc-express sampling profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+    def summary(self, top: int = 20) -> Dict:
+        components: Counter = Counter()
+        total = 0
+        for (_, stack), count in self.samples.items():
+            total += count
+            component = next(
+                (c for c in map(_component, reversed(stack)) if c is not None), "other"
+            )
+            components[component] += count
+        return {
+            "duration_seconds": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "ticks": self.ticks,
+            "samples": total,
+            "by_component": {
+                name: {"samples": count, "share": round(count / total, 3)}
+                for name, count in components.most_common()
+            },
+            "top_stacks": [
+                {
+                    "thread": thread_name,
+                    "samples": count,
+                    "leaf": [_frame_label(code) for code in stack[-8:]],
+                }
+                for (thread_name, stack), count in self.samples.most_common(top)
+            ],
+        }
+
+    def render(self, fmt: str):
+        if fmt == "collapsed":
+            return self.collapsed()
+        if fmt == "speedscope":
+            return self.speedscope()
+        return self.summary()
+
+
+class StackSampler:
+    """Background thread sampling the stacks of the other threads of this process."""
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        thread_ids: Optional[Iterable[int]] = None,
+        include_idle: bool = False,
+    ):
+        self.interval = interval
+        # None = todas as threads; um conjunto pode crescer durante a amostragem
+        self.thread_ids: Optional[Set[int]] = set(thread_ids) if thread_ids is not None else None
+        self.include_idle = include_idle
+        self.samples: Counter = Counter()
+        self.ticks = 0
+        self._names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def add_thread(self, ident: int):
+        if self.thread_ids is not None:
+            self.thread_ids.add(ident)
+
+    def _thread_name(self, ident: int) -> str:
+        name = self._names.get(ident)
+        if name is None:
+            self._names = {t.ident: t.name for t in threading.enumerate()}
+            name = self._names.setdefault(ident, f"thread-{ident}")
+        return name
+
+    def _sample(self, own: int):
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            leaf = stack[0]
+            if (
+                not self.include_idle
+                and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES
+            ):
+                continue
+            stack.reverse()
+            self.samples[(self._thread_name(ident), tuple(stack))] += 1
+        self.ticks += 1
+
+    def _loop(self):
+        own = threading.get_ident()
+        while not self._stop.is_set():
+            self._sample(own)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return Profile(
+            self.samples, self.ticks, self.interval, time.perf_counter() - self._started
+        )
+
+
+def start_worker_profile(interval: float, include_idle: bool) -> StackSampler:
+    """Start a whole-worker sampler; only one runs at a time per process."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("Já existe um profiling em andamento neste worker")
+    try:
+        sampler = StackSampler(interval, include_idle=include_idle)
+        sampler.start()
+    except Exception:
+        _busy.release()
+        raise
+    return sampler
+
+
+def finish_worker_profile(sampler: StackSampler) -> Profile:
+    try:
+        return sampler.stop()
+    finally:
+        _busy.release()
+
+
+# Perfil de uma requisição (X-Profile)
+def request_profiling_allowed(header_value: Optional[bytes]) -> bool:
+    # Compara bytes: compare_digest recusa str com caracteres não ASCII (TypeError)
+    return bool(PROFILE_TOKEN and header_value) and hmac.compare_digest(
+        header_value, PROFILE_TOKEN.encode("utf-8")
+    )
+
+
+def start_request_profile() -> Tuple[str, StackSampler]:
+    sampler = StackSampler(REQUEST_PROFILE_INTERVAL, thread_ids=[threading.get_ident()])
+    sampler.start()
+    return uuid.uuid4().hex, sampler
+
+
+def store_request_profile(profile_id: str, route: str, profile: Profile):
+    with _request_profiles_lock:
+        request_profiles[profile_id] = {"route": route, "profile": profile}
+        while len(request_profiles) > REQUEST_PROFILES_KEPT:
+            request_profiles.popitem(last=False)
+
+
+def list_request_profiles() -> List[Dict]:
+    with _request_profiles_lock:
+        items = list(request_profiles.items())
+    return [
+        {
+            "id": profile_id,
+            "route": entry["route"],
+            "duration_ms": round(entry["profile"].duration * 1000, 2),
+            "samples": sum(entry["profile"].samples.values()),
+        }
+        for profile_id, entry in reversed(items)
+    ]
+
+
+def get_request_profile(profile_id: str) -> Optional[Dict]:
+    with _request_profiles_lock:
+        return request_profiles.get(profile_id)
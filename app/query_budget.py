@@ -0,0 +1,192 @@
+"""
+Orçamento de consultas SQL (detector de N+1) para desenvolvimento e testes.
+
+- `@query_budget(max_queries, max_repeats)` declara o orçamento de um endpoint
+  (só anota a função, sem custo em produção);
+- com a verificação ligada (`QUERY_BUDGET_CHECK=1` ou `enable()`), o
+  `InstrumentationMiddleware` guarda a forma normalizada de cada instrução da
+  requisição e, ao final, compara com o orçamento da rota. Violações são
+  registradas em `violations` e no log `app.query_budget`; formas repetidas
+  acima de `REPEAT_WARNING_THRESHOLD` em rotas sem orçamento geram só aviso;
+- `count_queries()` / `assert_query_budget()` medem um bloco de código
+  qualquer (ex.: uma função do crud chamada direto num teste);
+- o plugin `app.query_budget_plugin` oferece a fixture pytest
+  `query_budget_guard`, que falha o teste se alguma requisição estourar o orçamento.
+
+"Forma" = SQL com placeholders, listas IN e literais numéricos colapsados,
+então `SELECT ... WHERE id = ?` executado uma vez por item aparece repetido.
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+REPEAT_WARNING_THRESHOLD = 3  # mesma forma mais vezes que isso numa requisição = suspeita de N+1
+MAX_RECORDED_VIOLATIONS = 500
+
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+|(?<!:):\w+|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+_enabled = os.environ.get("QUERY_BUDGET_CHECK", "").lower() in ("1", "true", "yes")
+violations: deque = deque(maxlen=MAX_RECORDED_VIOLATIONS)
+# Total desde o início do processo (o deque descarta as mais antigas ao encher)
+violation_count = 0
+_violations_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL statement so per-row repetitions of the same query compare equal."""
+    shape = _PLACEHOLDER.sub("?", statement)
+    shape = _NUMBER.sub("N", shape)
+    shape = _SPACES.sub(" ", shape).strip()
+    return _IN_LIST.sub("(?)", shape)
+
+
+def repeated_shapes(shapes: Counter, threshold: int) -> Dict[str, int]:
+    return {shape: count for shape, count in shapes.most_common() if count > threshold}
+
+
+def query_budget(max_queries: int, max_repeats: int = 1):
+    """Declare the statement budget of an endpoint (place below the router decorator)."""
+
+    def decorator(endpoint):
+        endpoint.__query_budget__ = (max_queries, max_repeats)
+        return endpoint
+
+    return decorator
+
+
+# Verificação por requisição (usada pelo InstrumentationMiddleware)
+def enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def _format_repeats(repeats: Dict[str, int]) -> str:
+    return "; ".join(f"{count}x {shape[:200]}" for shape, count in repeats.items())
+
+
+def check_request(route_key: str, endpoint, statements: int, shapes: Counter) -> Optional[Dict]:
+    """Compare one request with its endpoint budget; returns the violation, if any."""
+    budget = getattr(endpoint, "__query_budget__", None)
+    if budget is None:
+        repeats = repeated_shapes(shapes, REPEAT_WARNING_THRESHOLD)
+        if repeats:
+            logger.warning("Possível N+1 em %s: %s", route_key, _format_repeats(repeats))
+        return None
+
+    max_queries, max_repeats = budget
+    repeats = repeated_shapes(shapes, max_repeats)
+    if statements <= max_queries and not repeats:
+        return None
+    violation = {
+        "route": route_key,
+        "statements": statements,
+        "max_queries": max_queries,
+        "max_repeats": max_repeats,
+        "repeated": repeats,
+    }
+    global violation_count
+    with _violations_lock:
+        violations.append(violation)
+        violation_count += 1
+    logger.warning(format_violation(violation))
+    return violation
+
+
+def violations_since(mark: int) -> List[Dict]:
+    """Violations recorded after `violation_count` was `mark` (oldest dropped ones excluded)."""
+    with _violations_lock:
+        new = min(violation_count - mark, len(violations))
+        return list(violations)[len(violations) - new :] if new > 0 else []
+
+
+def format_violation(violation: Dict) -> str:
+    message = (
+        f"{violation['route']}: {violation['statements']} instruções SQL "
+        f"(orçamento {violation['max_queries']})"
+    )
+    if violation["repeated"]:
+        message += f"; repetidas: {_format_repeats(violation['repeated'])}"
+    return message
+
+
+# Medição de blocos de código
+class QueryLog:
+    """Statements seen on an engine while a `count_queries` block is active."""
+
+    def __init__(self):
+        self.count = 0
+        self.shapes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.shapes[shape] += 1
+
+    def repeated(self, threshold: int = 1) -> Dict[str, int]:
+        return repeated_shapes(self.shapes, threshold)
+
+    def statements(self) -> List[str]:
+        return list(self.shapes)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Count every statement executed on `engine` (all threads) inside the block.
+
+    The listener is engine-wide on purpose: under TestClient the endpoint runs in
+    another thread, so only use it where nothing else is hitting the same engine.
+    """
+    if engine is None:
+        from .database import engine
+    log = QueryLog()
+    event.listen(engine, "after_cursor_execute", log._record)
+    try:
+        yield log
+    finally:
+        event.remove(engine, "after_cursor_execute", log._record)
+
+
+@contextmanager
+def assert_query_budget(max_queries: int, max_repeats: Optional[int] = None, engine=None):
+    """Raise QueryBudgetExceeded if the block runs more statements (or repeats) than allowed."""
+    with count_queries(engine) as log:
+        yield log
+    repeats = log.repeated(max_repeats) if max_repeats is not None else {}
+    if log.count > max_queries or repeats:
+        raise QueryBudgetExceeded(
+            format_violation(
+                {
+                    "route": "bloco",
+                    "statements": log.count,
+                    "max_queries": max_queries,
+                    "repeated": repeats,
+                }
+            )
+        )
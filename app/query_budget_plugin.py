@@ -0,0 +1,30 @@
+"""
+Plugin pytest do orçamento de consultas.
+
+Ative com `pytest -p app.query_budget_plugin` ou `pytest_plugins = ["app.query_budget_plugin"]`
+no conftest. A fixture `query_budget_guard` liga a verificação por requisição
+e falha o teste se alguma rota com `@query_budget` estourar o orçamento.
+"""
+
+import pytest
+
+from . import query_budget
+
+
+@pytest.fixture
+def query_budget_guard():
+    was_enabled = query_budget.enabled()
+    query_budget.enable()
+    mark = query_budget.violation_count
+    try:
+        yield query_budget.violations
+    finally:
+        if not was_enabled:
+            query_budget.disable()
+    new = query_budget.violations_since(mark)
+    if new:
+        pytest.fail(
+            "Orçamento de consultas excedido:\n"
+            + "\n".join(query_budget.format_violation(v) for v in new),
+            pytrace=False,
+        )
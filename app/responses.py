@@ -0,0 +1,35 @@
+"""
+Respostas JSON rápidas.
+
+`DefaultJSONResponse` (default_response_class da aplicação) serializa com
+orjson quando disponível: as rotas com `response_model` continuam validadas
+pelo Pydantic, só a codificação final fica mais barata.
+
+Para listas grandes de dados internos já confiáveis (linhas projetadas direto
+do SQL), `fast_json` devolve a resposta pronta: o FastAPI não revalida contra
+o `response_model` (que segue documentando o schema no OpenAPI) nem passa o
+conteúdo pelo `jsonable_encoder`.
+"""
+
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+DefaultJSONResponse = ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+
+
+def fast_json(content: Any, status_code: int = 200) -> JSONResponse:
+    """Encode trusted, already response-shaped data without response_model validation."""
+    if ORJSON_AVAILABLE:
+        # orjson codifica datetime, date e Enum nativamente
+        return ORJSONResponse(content, status_code=status_code)
+    return JSONResponse(jsonable_encoder(content), status_code=status_code)
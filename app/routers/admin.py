@@ -0,0 +1,97 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from .. import profiler, slow_query_log
+from ..auth import get_current_admin_user
+from ..instrumentation import route_metrics
+from ..models import User
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/routes")
+def get_route_metrics(current_user: User = Depends(get_current_admin_user)):
+    """Per-route latency, SQL and serialization aggregates since startup (or last reset)."""
+    return {"routes": route_metrics.snapshot()}
+
+
+@router.delete("/routes")
+def reset_route_metrics(current_user: User = Depends(get_current_admin_user)):
+    """Discard the per-route aggregates."""
+    route_metrics.reset()
+    return {"message": "Métricas por rota zeradas"}
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    limit: int = Query(50, ge=1, le=slow_query_log.SLOW_QUERY_BUFFER_SIZE),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Most recent statements above the slow-query threshold, plus a summary by statement."""
+    entries = list(slow_query_log.recent)
+    return {
+        "threshold_ms": slow_query_log.SLOW_QUERY_THRESHOLD_MS,
+        "explain": slow_query_log.SLOW_QUERY_EXPLAIN,
+        "log_file": slow_query_log.SLOW_QUERY_LOG_FILE,
+        "summary": slow_query_log.summary(entries),
+        "recent": entries[-limit:][::-1],
+    }
+
+
+@router.delete("/slow-queries")
+def clear_slow_queries(current_user: User = Depends(get_current_admin_user)):
+    """Discard the in-memory slow-query buffer (the log file is kept)."""
+    slow_query_log.recent.clear()
+    return {"message": "Consultas lentas em memória descartadas"}
+
+
+def _profile_response(profile: profiler.Profile, fmt: str):
+    if fmt == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    if fmt == "speedscope":
+        return JSONResponse(
+            profile.speedscope(),
+            headers={"Content-Disposition": 'attachment; filename="profile.speedscope.json"'},
+        )
+    return profile.summary()
+
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(5, gt=0, le=profiler.MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=100),
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed|summary)$"),
+    include_idle: bool = Query(False, description="Inclui threads paradas esperando trabalho"),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Sample the stacks of every thread of this worker for `seconds` and return the profile."""
+    try:
+        sampler = profiler.start_worker_profile(interval_ms / 1000, include_idle)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile = profiler.finish_worker_profile(sampler)
+    return _profile_response(profile, format)
+
+
+@router.get("/profile/requests")
+def list_request_profiles(current_user: User = Depends(get_current_admin_user)):
+    """Profiles of requests sent with the X-Profile header (most recent first)."""
+    return {"enabled": bool(profiler.PROFILE_TOKEN), "profiles": profiler.list_request_profiles()}
+
+
+@router.get("/profile/requests/{profile_id}")
+def get_request_profile(
+    profile_id: str,
+    format: str = Query("summary", pattern="^(speedscope|collapsed|summary)$"),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """One request profile, by the X-Profile-Id returned with the response."""
+    entry = profiler.get_request_profile(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return _profile_response(entry["profile"], format)
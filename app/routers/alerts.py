@@ -6,12 +6,15 @@ from sqlalchemy.orm import Session
 from .. import crud, schemas
 from ..auth import get_current_active_user
 from ..deps import get_db
+from ..http_cache import conditional_get
 from ..models import User
+from ..responses import fast_json
 
 router = APIRouter(prefix="/alerts", tags=["Alerts"])
 
 
 @router.get("/low-stock", response_model=List[schemas.Product])
+@conditional_get
 def low_stock(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    products = crud.list_products(db, current_user.id, low_stock=True)
-    return products
+    products = crud.list_products_rows(db, current_user.id, low_stock=True)
+    return fast_json(products)
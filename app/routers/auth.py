@@ -54,5 +54,8 @@ def login_for_access_token(
 
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
+    # "uid" permite ao GET condicional (http_cache.py) achar o usuário sem consultar o banco
+    access_token = create_access_token(
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
+    )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,130 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
+from .. import crud, schemas
 from ..auth import get_current_active_user
 from ..database import get_db
-from ..models import MovementType, Product, StockMovement, Supplier, User
+from ..http_cache import conditional_get
+from ..models import MovementType, Product, StockMovement, User
+from ..query_budget import query_budget
+from ..services import reorder_engine
 
 router = APIRouter(prefix="/auto-restock", tags=["auto-restock"])
 
 
 @router.get("/analysis")
+@query_budget(4)
+@conditional_get
 def get_stock_analysis(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamanho da página"),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
 ):
     """Analyze current stock levels and provide restock recommendations"""
     try:
-        products = db.query(Product).filter(Product.user_id == current_user.id).all()
-
-        restock_items = []
-
-        for product in products:
-            # Calculate recommended stock level (2x minimum stock for safety)
-            recommended_stock = product.estoque_minimo * 2
-            current_stock = product.quantidade
-            restock_needed = max(0, recommended_stock - current_stock)
-
-            # Only include products that actually need restocking
-            # Critical: out of stock (0)
-            # High: below minimum stock
-            # Medium: below recommended stock (2x minimum)
-            if current_stock < recommended_stock:
-                # Get supplier info
-                supplier = None
-                if product.fornecedor_id:
-                    supplier = (
-                        db.query(Supplier)
-                        .filter(
-                            Supplier.id == product.fornecedor_id,
-                            Supplier.user_id == current_user.id,
-                        )
-                        .first()
-                    )
-
-                restock_items.append(
-                    {
-                        "product": {
-                            "id": product.id,
-                            "nome": product.nome,
-                            "codigo": product.codigo,
-                            "categoria": product.categoria,
-                            "quantidade": current_stock,
-                            "estoque_minimo": product.estoque_minimo,
-                            "preco": product.preco,
-                        },
-                        "supplier": (
-                            {
-                                "id": supplier.id if supplier else None,
-                                "nome": (
-                                    supplier.nome
-                                    if supplier
-                                    else "No supplier assigned"
-                                ),
-                            }
-                            if supplier
-                            else None
-                        ),
-                        "restock_info": {
-                            "current_stock": current_stock,
-                            "recommended_stock": recommended_stock,
-                            "restock_needed": restock_needed,
-                            "estimated_cost": restock_needed * product.preco,
-                            "urgency": (
-                                "critical"
-                                if current_stock == 0
-                                else (
-                                    "high"
-                                    if current_stock <= product.estoque_minimo
-                                    else (
-                                        "medium"
-                                        if current_stock < recommended_stock
-                                        else "low"
-                                    )
-                                )
-                            ),
-                        },
-                    }
-                )
-
-        # Sort by urgency (critical first, then high, then medium, then low)
-        urgency_order = {"critical": 0, "high": 1, "medium": 2, "low": 3}
-        restock_items.sort(key=lambda x: urgency_order[x["restock_info"]["urgency"]])
-
-        return {
-            "restock_items": restock_items,
-            "total_items": len(restock_items),
-            "total_cost": sum(
-                item["restock_info"]["estimated_cost"] for item in restock_items
-            ),
-            "critical_count": len(
-                [
-                    item
-                    for item in restock_items
-                    if item["restock_info"]["urgency"] == "critical"
-                ]
-            ),
-            "high_count": len(
-                [
-                    item
-                    for item in restock_items
-                    if item["restock_info"]["urgency"] == "high"
-                ]
-            ),
-            "medium_count": len(
-                [
-                    item
-                    for item in restock_items
-                    if item["restock_info"]["urgency"] == "medium"
-                ]
-            ),
-            "low_count": len(
-                [
-                    item
-                    for item in restock_items
-                    if item["restock_info"]["urgency"] == "low"
-                ]
-            ),
-        }
+        return crud.get_restock_analysis(db, current_user.id, limit, offset)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to analyze stock: {str(e)}"
@@ -137,56 +38,7 @@ def restock_all_products(
 ):
     """Restock all products to recommended levels with one click - Direct stock update"""
     try:
-        products = db.query(Product).filter(Product.user_id == current_user.id).all()
-
-        restocked_products = []
-        total_value = 0
-
-        for product in products:
-            # Calculate recommended stock level
-            recommended_stock = product.estoque_minimo * 2
-            current_stock = product.quantidade
-            restock_needed = max(0, recommended_stock - current_stock)
-
-            # Only restock if needed
-            if current_stock < recommended_stock:
-                # Update stock directly
-                product.quantidade = recommended_stock
-
-                # Create stock movement record
-                movement = StockMovement(
-                    user_id=current_user.id,
-                    produto_id=product.id,
-                    tipo=MovementType.IN,
-                    quantidade_alterada=restock_needed,
-                    quantidade_resultante=recommended_stock,
-                    motivo=f"Auto-restock: Reposição automática para {recommended_stock} unidades",
-                )
-                db.add(movement)
-
-                # Calculate cost
-                restock_cost = restock_needed * product.preco
-                total_value += restock_cost
-
-                restocked_products.append(
-                    {
-                        "product": product.nome,
-                        "product_id": product.id,
-                        "previous_stock": current_stock,
-                        "new_stock": recommended_stock,
-                        "restock_amount": restock_needed,
-                        "cost": restock_cost,
-                    }
-                )
-
-        db.commit()
-
-        return {
-            "message": f"Successfully restocked {len(restocked_products)} products",
-            "restocked_products": restocked_products,
-            "total_value": total_value,
-            "products_restocked": len(restocked_products),
-        }
+        return crud.restock_all(db, current_user.id)
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -251,3 +103,46 @@ def restock_single_product(
         raise HTTPException(
             status_code=500, detail=f"Failed to restock product: {str(e)}"
         )
+
+
+@router.get("/reorder-plan")
+def get_reorder_plan(
+    fornecedor_id: Optional[int] = Query(None),
+    include_all: bool = Query(False, description="Inclui produtos que não precisam de pedido"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Reorder points and EOQ order quantities from the persisted demand forecasts"""
+    if not reorder_engine.ENGINE_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Reorder engine requires pandas and numpy")
+    try:
+        reorder_engine.refresh_forecasts_if_stale(db, current_user.id)
+        plan = reorder_engine.build_reorder_plan(
+            db, current_user.id, [fornecedor_id] if fornecedor_id else None
+        )
+        items = reorder_engine.plan_records(plan, only_orders=not include_all)
+        return {
+            "items": items,
+            "total_items": len(items),
+            "total_cost": sum(item["quantidade_pedido"] * item["preco"] for item in items),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build reorder plan: {str(e)}")
+
+
+@router.post("/reorder", response_model=List[schemas.PurchaseOrder])
+def generate_reorder_drafts(
+    fornecedor_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Create or refresh one draft purchase order per supplier from the reorder plan"""
+    if not reorder_engine.ENGINE_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Reorder engine requires pandas and numpy")
+    try:
+        return reorder_engine.generate_draft_orders(
+            db, current_user.id, [fornecedor_id] if fornecedor_id else None
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to generate purchase orders: {str(e)}")
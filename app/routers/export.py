@@ -0,0 +1,68 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
+
+from .. import schemas
+from ..auth import get_current_active_user
+from ..deps import get_db
+from ..models import User
+from ..services.archiver import ARCHIVE_RETENTION_DAYS, archive_tenant
+from ..services.exporter import iter_export
+from ..services.ml_cache import ml_result_cache
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+MEDIA_TYPES = {
+    schemas.ExportFormat.CSV: "text/csv; charset=utf-8",
+    schemas.ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+@router.post("/archive")
+def archive_history(
+    retention_days: int = Query(ARCHIVE_RETENTION_DAYS, ge=30),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Move movements and sale items older than the retention horizon to the archive."""
+    try:
+        result = archive_tenant(db, current_user.id, retention_days)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to archive history: {str(e)}")
+    # Resumos substituem as linhas detalhadas nas análises de ML
+    ml_result_cache.clear()
+    return result
+
+
+@router.get("/{entity}")
+def export_entity(
+    entity: schemas.ExportEntity,
+    formato: schemas.ExportFormat = Query(schemas.ExportFormat.CSV),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    include_archive: bool = Query(False, description="Inclui linhas já arquivadas"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Stream sales, stock movements or products as CSV or NDJSON."""
+    # O streaming continua depois que a dependência fecha a sessão da requisição,
+    # então o gerador abre uma sessão própria no mesmo engine
+    session_factory = sessionmaker(bind=db.get_bind())
+    filename = f"{entity.value}_{date.today().isoformat()}.{formato.value}"
+    return StreamingResponse(
+        iter_export(
+            session_factory,
+            entity.value,
+            formato.value,
+            current_user.id,
+            date_from,
+            date_to,
+            include_archive=include_archive,
+        ),
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
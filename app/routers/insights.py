@@ -9,6 +9,7 @@ from ..auth import get_current_active_user
 from ..database import get_db
 from ..models import MovementType, Product, Sale, SaleItem, StockMovement, User
 from ..services.cash_flow_simulator import CashFlowSimulator
+from ..services.ml_cache import ml_result_cache
 from ..services.ml_predictor import MLPredictor
 from ..services.model_registry import list_models, load_model, save_uploaded_model
 
@@ -36,6 +37,8 @@ async def upload_model(
         model = load_model(name)
         if model is None:
             raise HTTPException(status_code=400, detail="Invalid model file or unsupported format")
+        # Previsões em cache podem ter sido geradas com o modelo anterior
+        ml_result_cache.clear()
         return {"message": "Model uploaded", "name": name, "path": path}
     except HTTPException:
         raise
@@ -339,6 +342,12 @@ def get_stock_optimization(
         raise HTTPException(status_code=500, detail=f"Failed to get stock optimization: {str(e)}")
 
 
+@router.get("/ml/cache/stats")
+def get_ml_cache_stats(current_user: User = Depends(get_current_active_user)):
+    """Hit rate and compute time of the ML result cache (current worker)"""
+    return ml_result_cache.stats()
+
+
 @router.get("/ml/product-insights/{product_id}")
 def get_ml_product_insights(
     product_id: int,
@@ -1,12 +1,17 @@
+import io
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
 
 from .. import crud, schemas
 from ..auth import get_current_active_user
 from ..deps import get_db
+from ..http_cache import conditional_get
 from ..models import Product, User
+from ..query_budget import query_budget
+from ..responses import fast_json
+from ..services.product_import import detect_format, import_products
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -22,6 +27,8 @@ def create_product(
 
 
 @router.get("", response_model=List[schemas.Product])
+@query_budget(3)
+@conditional_get
 def list_products(
     nome: Optional[str] = Query(None),
     categoria: Optional[str] = Query(None),
@@ -30,16 +37,40 @@ def list_products(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    products = crud.list_products(
+    # Linhas projetadas do SQL: sem revalidação pelo response_model
+    products = crud.list_products_rows(
         db, current_user.id, nome, categoria, fornecedor_id, em_estoque_baixo
     )
-    return products
+    return fast_json(products)
+
+
+@router.post("/import", response_model=schemas.ProductImportResult)
+def import_products_file(
+    file: UploadFile = File(...),
+    formato: Optional[str] = Query(None, description="csv ou ndjson"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Bulk upsert products by codigo from a CSV or NDJSON upload."""
+    try:
+        fmt = detect_format(file.filename, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return import_products(db, current_user.id, stream, fmt)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="O arquivo deve estar em UTF-8.")
+    finally:
+        stream.detach()
 
 
 @router.get("/low-stock", response_model=List[schemas.Product])
+@conditional_get
 def low_stock(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    products = crud.list_products(db, current_user.id, low_stock=True)
-    return products
+    products = crud.list_products_rows(db, current_user.id, low_stock=True)
+    return fast_json(products)
 
 
 @router.get("/{product_id}", response_model=schemas.Product)
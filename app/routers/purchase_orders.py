@@ -6,12 +6,16 @@ from sqlalchemy.orm import Session
 from .. import crud, schemas
 from ..auth import get_current_active_user
 from ..database import get_db
+from ..http_cache import conditional_get
 from ..models import User
+from ..query_budget import query_budget
+from ..responses import fast_json
 
 router = APIRouter(prefix="/purchase-orders", tags=["Purchase Orders"])
 
 
 @router.post("", response_model=schemas.PurchaseOrder)
+@query_budget(8)
 def create_purchase_order(
     payload: schemas.PurchaseOrderCreate,
     db: Session = Depends(get_db),
@@ -22,6 +26,8 @@ def create_purchase_order(
 
 
 @router.get("", response_model=List[schemas.PurchaseOrder])
+@query_budget(3)
+@conditional_get
 def list_purchase_orders(
     status: Optional[schemas.PurchaseOrderStatus] = Query(None),
     fornecedor_id: Optional[int] = Query(None),
@@ -29,13 +35,14 @@ def list_purchase_orders(
     current_user: User = Depends(get_current_active_user),
 ):
     """List all purchase orders with optional filtering."""
-    purchase_orders = crud.list_purchase_orders(
+    purchase_orders = crud.list_purchase_orders_rows(
         db, current_user.id, status, fornecedor_id
     )
-    return purchase_orders
+    return fast_json(purchase_orders)
 
 
 @router.get("/statistics")
+@conditional_get
 def get_purchase_orders_statistics(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
@@ -45,6 +52,7 @@ def get_purchase_orders_statistics(
 
 
 @router.get("/{po_id}", response_model=schemas.PurchaseOrderOut)
+@query_budget(3)
 def get_purchase_order(
     po_id: int,
     db: Session = Depends(get_db),
@@ -56,6 +64,7 @@ def get_purchase_order(
 
 
 @router.put("/{po_id}", response_model=schemas.PurchaseOrder)
+@query_budget(5)
 def update_purchase_order(
     po_id: int,
     payload: schemas.PurchaseOrderUpdate,
@@ -79,6 +88,7 @@ def delete_purchase_order(
 
 
 @router.post("/{po_id}/approve", response_model=schemas.PurchaseOrder)
+@query_budget(6)
 def approve_purchase_order(
     po_id: int,
     db: Session = Depends(get_db),
@@ -101,16 +111,19 @@ def reject_purchase_order(
     return po
 
 
-@router.post("/{po_id}/receive")
+@router.post("/{po_id}/receive", response_model=schemas.PurchaseOrderReceiptResult)
+@query_budget(7)
 def receive_purchase_order_items(
     po_id: int,
-    item_receipts: List[dict],
+    item_receipts: List[schemas.PurchaseOrderReceiptItem],
+    allow_over_receipt: bool = Query(True, description="Aceita receber mais que o solicitado"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Receive items from a purchase order and update stock."""
-    crud.receive_purchase_order_items(db, po_id, item_receipts, current_user.id)
-    return {"message": "Items received successfully", "purchase_order_id": po_id}
+    return crud.receive_purchase_order_items(
+        db, po_id, item_receipts, current_user.id, allow_over_receipt
+    )
 
 
 @router.post("/auto-generate", response_model=schemas.PurchaseOrder)
@@ -125,3 +138,13 @@ def auto_generate_purchase_order(
         raise HTTPException(status_code=400, detail="Supplier ID is required")
 
     return crud.auto_generate_purchase_order(db, fornecedor_id, current_user.id)
+
+
+@router.post("/auto-generate/batch", response_model=schemas.PurchaseOrderBatchSummary)
+def batch_generate_purchase_orders(
+    payload: schemas.PurchaseOrderBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Generate draft purchase orders for several (or all) suppliers in one transaction."""
+    return crud.batch_generate_purchase_orders(db, current_user.id, payload.fornecedor_ids)
@@ -6,20 +6,25 @@ from sqlalchemy.orm import Session
 from .. import crud, schemas
 from ..auth import get_current_active_user
 from ..database import get_db
+from ..http_cache import conditional_get
 from ..models import User
+from ..query_budget import query_budget
+from ..responses import fast_json
 
 router = APIRouter(prefix="/sales", tags=["Sales"])
 
 
 @router.get("", response_model=List[schemas.SaleOut])
+@query_budget(3)
+@conditional_get
 def list_sales(
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """List all sales for the current user."""
-    sales = crud.get_sales(db, current_user.id, limit)
-    return sales
+    sales = crud.get_sales_rows(db, current_user.id, limit)
+    return fast_json(sales)
 
 
 @router.get("/{sale_id}", response_model=schemas.SaleOut)
@@ -34,6 +39,7 @@ def get_sale(
 
 
 @router.get("/analytics/top-products")
+@conditional_get
 def get_top_selling_products(
     limit: int = 5,
     db: Session = Depends(get_db),
@@ -1,66 +1,94 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
 
 from ..auth import get_current_active_user
 from ..database import get_db
-from ..models import PurchaseOrder, PurchaseOrderStatus, User
+from ..models import PurchaseOrder, PurchaseOrderStatus, SimulationRun, User
+from ..schemas import SimulationStartRequest
+from ..services import bulk_orders, sales_simulator
 
 router = APIRouter(prefix="/simulation", tags=["simulation"])
 
-# Instância global do simulador
-simulator_instance = None
+
+def _run_payload(run: SimulationRun) -> dict:
+    return {
+        "id": run.id,
+        "status": run.status,
+        "duration_minutes": run.duracao_minutos,
+        "max_pending_orders": run.max_pedidos_pendentes,
+        "orders_created": run.pedidos_criados,
+        "executor": run.executor,
+        "started_at": run.iniciado_em,
+        "ends_at": run.termina_em,
+        "heartbeat_at": run.heartbeat_em,
+        "finished_at": run.finalizado_em,
+        "error": run.erro,
+    }
 
 
 @router.post("/start")
 def start_sales_simulation(
-    duration_minutes: int = 10,
-    max_pending_orders: int = 5,
-    background_tasks: BackgroundTasks = None,
+    duration_minutes: int = Query(10, ge=1, le=24 * 60),
+    max_pending_orders: int = Query(5, ge=1),
+    payload: Optional[SimulationStartRequest] = Body(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Inicia a simulação de vendas aleatórias"""
-    global simulator_instance
-
-    if simulator_instance and simulator_instance.is_running:
-        raise HTTPException(status_code=400, detail="Simulação já está em execução")
-
-    # Importa aqui para evitar import circular
-    import sys
-    from pathlib import Path
+    """Inicia uma simulação de vendas aleatórias em segundo plano"""
+    if payload is not None:
+        duration_minutes = payload.duration_minutes
+        max_pending_orders = payload.max_pending_orders
 
-    # Adiciona o diretório raiz ao path
-    root_dir = Path(__file__).parent.parent.parent
-    sys.path.append(str(root_dir))
-    from scripts.sales_simulator import SalesSimulator
-
-    simulator_instance = SalesSimulator(user_id=current_user.id)
-    simulator_instance.max_pending_orders = max_pending_orders
+    limit = sales_simulator.MAX_RUNS_PER_USER
+    if len(sales_simulator.active_runs(db, current_user.id)) >= limit:
+        raise HTTPException(
+            status_code=400, detail=f"Limite de {limit} simulações simultâneas atingido"
+        )
 
-    # Inicia a simulação em background
-    if background_tasks:
-        background_tasks.add_task(simulator_instance.run_simulation, duration_minutes)
+    run = sales_simulator.start_run(db, current_user.id, duration_minutes, max_pending_orders)
 
     return {
         "message": f"Simulação iniciada por {duration_minutes} minutos",
         "max_pending_orders": max_pending_orders,
         "duration_minutes": duration_minutes,
+        "run": _run_payload(run),
     }
 
 
 @router.post("/stop")
 def stop_sales_simulation(
+    run_id: Optional[int] = Query(None, description="Para apenas esta simulação"),
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Para a simulação de vendas"""
-    global simulator_instance
-
-    if not simulator_instance or not simulator_instance.is_running:
+    """Para as simulações de vendas em execução (em qualquer worker)"""
+    sales_simulator.mark_stale_runs(db, current_user.id)
+    stopped = sales_simulator.request_stop(db, current_user.id, run_id)
+    if not stopped:
         raise HTTPException(status_code=400, detail="Nenhuma simulação em execução")
 
-    simulator_instance.stop_simulation()
+    return {"message": "Simulação parada com sucesso", "run_ids": stopped}
+
 
-    return {"message": "Simulação parada com sucesso"}
+@router.get("/runs")
+def list_simulation_runs(
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Lista as simulações do usuário, mais recentes primeiro"""
+    sales_simulator.mark_stale_runs(db, current_user.id)
+    runs = (
+        db.query(SimulationRun)
+        .filter(SimulationRun.user_id == current_user.id)
+        .order_by(SimulationRun.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [_run_payload(run) for run in runs]
 
 
 @router.get("/status")
@@ -69,7 +97,7 @@ def get_simulation_status(
     current_user: User = Depends(get_current_active_user),
 ):
     """Retorna o status da simulação e estatísticas"""
-    global simulator_instance
+    runs = sales_simulator.active_runs(db, current_user.id)
 
     # Conta purchase orders por status
     total_orders = (
@@ -117,7 +145,8 @@ def get_simulation_status(
     )
 
     return {
-        "is_running": simulator_instance.is_running if simulator_instance else False,
+        "is_running": bool(runs),
+        "runs": [_run_payload(run) for run in runs],
         "statistics": {
             "total_orders": total_orders,
             "pending_orders": pending_orders,
@@ -130,72 +159,65 @@ def get_simulation_status(
 
 @router.post("/approve-all")
 def approve_all_pending_orders(
+    stream: bool = Query(False, description="Reporta o progresso em NDJSON, lote a lote"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Aprova todas as purchase orders pendentes"""
-    pending_orders = (
-        db.query(PurchaseOrder)
-        .filter(
-            PurchaseOrder.user_id == current_user.id,
-            PurchaseOrder.status == PurchaseOrderStatus.PENDING_APPROVAL,
-        )
-        .all()
-    )
-
-    if not pending_orders:
+    """Aprova todas as purchase orders pendentes (em lotes; vendas geradas em segundo plano)"""
+    pending_count, _ = bulk_orders.approval_backlog(db, current_user.id)
+    if not pending_count:
         raise HTTPException(
             status_code=404, detail="Nenhuma purchase order pendente encontrada"
         )
 
-    approved_count = 0
-    total_value = 0
-
-    for po in pending_orders:
-        po.status = PurchaseOrderStatus.APPROVED
-        approved_count += 1
-        total_value += po.total_value
-
-    db.commit()
-
-    return {
-        "message": f"{approved_count} purchase orders aprovadas",
-        "approved_count": approved_count,
-        "total_value": total_value,
-    }
+    def summarize(progress):
+        return {
+            "message": f"{progress['processados']} purchase orders aprovadas",
+            "approved_count": progress["processados"],
+            "total_value": progress["valor"],
+        }
+
+    if stream:
+        return StreamingResponse(
+            bulk_orders.ndjson_progress(
+                sessionmaker(bind=db.get_bind()),
+                bulk_orders.iter_approve_all,
+                current_user.id,
+                summarize,
+            ),
+            media_type="application/x-ndjson",
+        )
+    return summarize(bulk_orders.run_to_end(bulk_orders.iter_approve_all(db, current_user.id)))
 
 
 @router.post("/clear-approved")
 def clear_approved_orders(
+    stream: bool = Query(False, description="Reporta o progresso em NDJSON, lote a lote"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Remove todas as purchase orders aprovadas (simula recebimento)"""
-    approved_orders = (
-        db.query(PurchaseOrder)
-        .filter(
-            PurchaseOrder.user_id == current_user.id,
-            PurchaseOrder.status == PurchaseOrderStatus.APPROVED,
-        )
-        .all()
-    )
-
-    if not approved_orders:
+    clearable_count, _ = bulk_orders.clearable_backlog(db, current_user.id)
+    if not clearable_count:
         raise HTTPException(
             status_code=404, detail="Nenhuma purchase order aprovada encontrada"
         )
 
-    cleared_count = len(approved_orders)
-    total_value = sum(po.total_value for po in approved_orders)
-
-    # Remove as purchase orders aprovadas
-    for po in approved_orders:
-        db.delete(po)
-
-    db.commit()
-
-    return {
-        "message": f"{cleared_count} purchase orders aprovadas removidas",
-        "cleared_count": cleared_count,
-        "total_value": total_value,
-    }
+    def summarize(progress):
+        return {
+            "message": f"{progress['processados']} purchase orders aprovadas removidas",
+            "cleared_count": progress["processados"],
+            "total_value": progress["valor"],
+        }
+
+    if stream:
+        return StreamingResponse(
+            bulk_orders.ndjson_progress(
+                sessionmaker(bind=db.get_bind()),
+                bulk_orders.iter_clear_approved,
+                current_user.id,
+                summarize,
+            ),
+            media_type="application/x-ndjson",
+        )
+    return summarize(bulk_orders.run_to_end(bulk_orders.iter_clear_approved(db, current_user.id)))
@@ -1,16 +1,32 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 
 from .. import crud, schemas
 from ..auth import get_current_active_user
 from ..deps import get_db
 from ..models import User
+from ..services import stock_snapshots
 
 router = APIRouter(prefix="/products", tags=["Stock"])
 
 
+@router.post("/stock-snapshots")
+def write_stock_snapshots(
+    data: Optional[date] = Query(None, description="Dia do snapshot (padrão: hoje)"),
+    backfill_days: int = Query(0, ge=0, le=366),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Write end-of-day stock checkpoints for the current user's products"""
+    if backfill_days:
+        written = stock_snapshots.backfill_snapshots(db, backfill_days, current_user.id)
+        return {"snapshots": sum(written.values()), "dias": len(written)}
+    return {"snapshots": stock_snapshots.write_snapshots(db, data, current_user.id), "dias": 1}
+
+
 @router.post("/{product_id}/stock/add", response_model=schemas.Product)
 def add_stock(
     product_id: int,
@@ -47,7 +63,50 @@ def set_stock(
 @router.get("/{product_id}/movements", response_model=List[schemas.StockMovement])
 def list_movements(
     product_id: int,
+    response: Response,
+    limit: int = Query(crud.MOVEMENTS_PAGE_SIZE, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    tipo: Optional[schemas.MovementType] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    movements, next_cursor = crud.list_movements(
+        db, product_id, current_user.id, limit, cursor, date_from, date_to, tipo
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return movements
+
+
+@router.get("/{product_id}/movements/daily", response_model=List[schemas.StockMovementDaily])
+def daily_movements(
+    product_id: int,
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    return crud.daily_movement_totals(db, product_id, current_user.id, date_from, date_to)
+
+
+@router.get("/{product_id}/stock/at", response_model=schemas.StockLevel)
+def stock_at(
+    product_id: int,
+    data: date = Query(..., description="Estoque no fim deste dia"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    return stock_snapshots.stock_at(db, product_id, current_user.id, data)
+
+
+@router.get("/{product_id}/stock/history", response_model=List[schemas.StockLevelPoint])
+def stock_history(
+    product_id: int,
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    return crud.list_movements(db, product_id, current_user.id)
+    return stock_snapshots.stock_history(db, product_id, current_user.id, date_from, date_to)
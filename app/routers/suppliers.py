@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from .. import crud, schemas
 from ..auth import get_current_active_user
 from ..deps import get_db
+from ..http_cache import conditional_get
 from ..models import User
 
 router = APIRouter(prefix="/suppliers", tags=["Suppliers"])
@@ -21,6 +22,7 @@ def create_supplier(
 
 
 @router.get("", response_model=List[schemas.Supplier])
+@conditional_get
 def list_suppliers(
     db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
 ):
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from enum import Enum
 from typing import List, Optional
 
@@ -57,6 +57,17 @@ class SaleStatus(str, Enum):
     REFUNDED = "REFUNDED"
 
 
+class ExportEntity(str, Enum):
+    SALES = "sales"
+    MOVEMENTS = "movements"
+    PRODUCTS = "products"
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
 # Supplier
 class SupplierBase(BaseModel):
     nome: str = Field(..., min_length=1)
@@ -158,6 +169,24 @@ class Product(ProductBase):
         from_attributes = True
 
 
+class ProductImportError(BaseModel):
+    linha: int
+    codigo: Optional[str] = None
+    erro: str
+
+
+class ProductImportResult(BaseModel):
+    total_rows: int
+    inserted: int
+    updated: int
+    failed: int
+    # Linhas com código repetido no mesmo lote, mescladas na última ocorrência
+    duplicates: int = 0
+    errors: List[ProductImportError]
+    errors_truncated: bool
+    elapsed_seconds: float
+
+
 # Sales
 class SaleItemBase(BaseModel):
     produto_id: int
@@ -254,6 +283,28 @@ class StockMovement(StockMovementBase):
         from_attributes = True
 
 
+class StockMovementDaily(BaseModel):
+    data: date
+    entradas: int
+    saidas: int
+    ajustes: int
+    liquido: int
+    movimentos: int
+
+
+class StockLevel(BaseModel):
+    produto_id: int
+    data: date
+    quantidade: Optional[int] = None
+    fonte: str
+    snapshot_data: Optional[date] = None
+
+
+class StockLevelPoint(BaseModel):
+    data: date
+    quantidade: Optional[int] = None
+
+
 # Purchase Orders
 class PurchaseOrderItemBase(BaseModel):
     produto_id: int
@@ -279,6 +330,30 @@ class PurchaseOrderItemOut(BaseModel):
         from_attributes = True
 
 
+class PurchaseOrderReceiptItem(BaseModel):
+    item_id: int
+    quantidade_recebida: NonNegativeInt  # quantidade chegando agora (incremental)
+
+
+class PurchaseOrderReceiptLine(BaseModel):
+    item_id: int
+    produto_id: int
+    quantidade_solicitada: int
+    quantidade_recebida: int
+    recebido_agora: int
+    pendente: int
+    excedente: int
+
+
+class PurchaseOrderReceiptResult(BaseModel):
+    message: str
+    purchase_order_id: int
+    itens_recebidos: int
+    quantidade_total: int
+    completo: bool
+    linhas: List[PurchaseOrderReceiptLine]
+
+
 class PurchaseOrderItem(PurchaseOrderItemBase):
     id: int
     purchase_order_id: int
@@ -329,3 +404,30 @@ class PurchaseOrder(PurchaseOrderBase):
 
     class Config:
         from_attributes = True
+
+
+class PurchaseOrderBatchRequest(BaseModel):
+    fornecedor_ids: Optional[List[int]] = None  # None: todos os fornecedores
+
+
+class PurchaseOrderBatchItem(BaseModel):
+    id: int
+    fornecedor_id: int
+    fornecedor_nome: str
+    itens: int
+    total_value: float
+
+
+class PurchaseOrderBatchSummary(BaseModel):
+    pedidos: int
+    itens: int
+    valor_total: float
+    fornecedores_sem_itens: List[int]
+    purchase_orders: List[PurchaseOrderBatchItem]
+    elapsed_seconds: float
+
+
+# Simulation
+class SimulationStartRequest(BaseModel):
+    duration_minutes: int = Field(10, ge=1, le=24 * 60)
+    max_pending_orders: PositiveInt = 5
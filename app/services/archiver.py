@@ -0,0 +1,247 @@
+"""
+Retenção e arquivamento de movimentos de estoque e itens de venda.
+
+Linhas mais antigas que o horizonte de retenção são:
+
+1. gravadas em arquivos NDJSON compactados (gzip), um por tenant/entidade/mês,
+   em `ARCHIVE_DIR/<user_id>/<entidade>/<AAAA-MM>.ndjson.gz`, com as mesmas
+   colunas da exportação (`services/exporter.py`);
+2. resumidas por dia/produto em `stock_movement_daily` e `sale_item_daily`;
+3. removidas das tabelas quentes.
+
+O arquivo é gravado antes do DELETE: se o processo cair no meio de um mês,
+a nova execução pode duplicar linhas no arquivo, mas nunca perde dados.
+Os cabeçalhos de venda (`sales`) continuam no banco (os totais seguem valendo
+para relatórios); vendas cujos itens foram todos arquivados saem da listagem
+`GET /sales` (`crud.get_sales_rows`).
+
+`ARCHIVE_DIR` (variável de ambiente, padrão `data/archive`) fica dentro do
+volume persistente `/app/data` dos containers: os arquivos são a única cópia
+das linhas removidas.
+"""
+
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from ..database import dialect_insert
+from ..models import (
+    MovementType,
+    Sale,
+    SaleItem,
+    SaleItemSummary,
+    StockMovement,
+    StockMovementSummary,
+)
+from .exporter import EXPORT_QUERIES, _plain
+
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join("data", "archive"))
+ARCHIVE_RETENTION_DAYS = 365
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_ENTITIES = ("movements", "sales")
+
+# SQLite limita o número de parâmetros por instrução
+_DELETE_CHUNK = 500
+
+
+def archive_path(user_id: int, entity: str, month: date) -> str:
+    return os.path.join(ARCHIVE_DIR, str(user_id), entity, f"{month:%Y-%m}.ndjson.gz")
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _oldest_row(db: Session, user_id: int, entity: str) -> Optional[datetime]:
+    if entity == "movements":
+        stmt = select(func.min(StockMovement.criado_em)).where(StockMovement.user_id == user_id)
+    else:
+        stmt = (
+            select(func.min(Sale.criado_em))
+            .join(SaleItem, SaleItem.sale_id == Sale.id)
+            .where(Sale.user_id == user_id)
+        )
+    return db.scalar(stmt)
+
+
+class _MonthArchive:
+    """Accumulates the daily summaries and row ids of one archived month."""
+
+    def __init__(self, entity: str, user_id: int):
+        self.entity = entity
+        self.user_id = user_id
+        self.ids: List[int] = []
+        self.summaries: Dict[Tuple, Dict] = {}
+        self._last_seen: Dict[Tuple, Tuple[str, int]] = {}
+
+    def add(self, record: Dict):
+        dia = date.fromisoformat(record["criado_em"][:10])
+        if self.entity == "movements":
+            self._add_movement(record, dia)
+        else:
+            self._add_sale_item(record, dia)
+
+    def _add_movement(self, record: Dict, dia: date):
+        self.ids.append(record["id"])
+        key = (record["produto_id"], dia)
+        summary = self.summaries.setdefault(
+            key,
+            {
+                "user_id": self.user_id,
+                "produto_id": record["produto_id"],
+                "data": dia,
+                "entradas": 0,
+                "saidas": 0,
+                "ajustes": 0,
+                "movimentos": 0,
+                "quantidade_final": None,
+            },
+        )
+        quantidade = abs(record["quantidade_alterada"])
+        if record["tipo"] == MovementType.IN.value:
+            summary["entradas"] += quantidade
+        elif record["tipo"] == MovementType.OUT.value:
+            summary["saidas"] += quantidade
+        else:
+            summary["ajustes"] += 1
+        summary["movimentos"] += 1
+        ordem = (record["criado_em"], record["id"])
+        if key not in self._last_seen or ordem > self._last_seen[key]:
+            self._last_seen[key] = ordem
+            summary["quantidade_final"] = record["quantidade_resultante"]
+
+    def _add_sale_item(self, record: Dict, dia: date):
+        self.ids.append(record["item_id"])
+        key = (record["produto_id"], dia, record["status"], record["preco_unitario"])
+        summary = self.summaries.setdefault(
+            key,
+            {
+                "user_id": self.user_id,
+                "produto_id": record["produto_id"],
+                "data": dia,
+                "status": record["status"],
+                "preco_unitario": record["preco_unitario"],
+                "quantidade": 0,
+                "preco_total": 0.0,
+                "itens": 0,
+            },
+        )
+        summary["quantidade"] += record["quantidade"]
+        summary["preco_total"] += record["preco_total"]
+        summary["itens"] += 1
+
+    def flush(self, db: Session):
+        if self.entity == "movements":
+            model, table = StockMovementSummary, StockMovement
+            additive = ("entradas", "saidas", "ajustes", "movimentos")
+            index_elements = ["produto_id", "data"]
+        else:
+            model, table = SaleItemSummary, SaleItem
+            additive = ("quantidade", "preco_total", "itens")
+            index_elements = ["produto_id", "data", "status", "preco_unitario"]
+
+        if self.summaries:
+            stmt = dialect_insert(db.get_bind())(model)
+            # Linhas atrasadas de um dia já arquivado somam ao resumo existente
+            set_ = {name: getattr(model, name) + stmt.excluded[name] for name in additive}
+            if self.entity == "movements":
+                set_["quantidade_final"] = stmt.excluded.quantidade_final
+            db.execute(
+                stmt.on_conflict_do_update(index_elements=index_elements, set_=set_),
+                list(self.summaries.values()),
+            )
+        for i in range(0, len(self.ids), _DELETE_CHUNK):
+            db.execute(delete(table).where(table.id.in_(self.ids[i : i + _DELETE_CHUNK])))
+        db.commit()
+
+
+def archive_entity(db: Session, user_id: int, entity: str, cutoff: date) -> Dict:
+    """Archive one entity's rows older than `cutoff`, one month (and commit) at a time."""
+    oldest = _oldest_row(db, user_id, entity)
+    result = {"linhas": 0, "resumos": 0, "arquivos": []}
+    if oldest is None or oldest.date() >= cutoff:
+        return result
+
+    month = oldest.date().replace(day=1)
+    while month < cutoff:
+        date_to = min(_next_month(month), cutoff) - timedelta(days=1)
+        stmt = EXPORT_QUERIES[entity](user_id, month, date_to)
+        columns = [c.name for c in stmt.selected_columns]
+        archive = _MonthArchive(entity, user_id)
+
+        path = archive_path(user_id, entity, month)
+        f = None
+        try:
+            rows = db.execute(stmt.execution_options(yield_per=ARCHIVE_BATCH_SIZE))
+            for partition in rows.partitions():
+                for row in partition:
+                    record = {name: _plain(value) for name, value in zip(columns, row)}
+                    if entity == "sales" and record["item_id"] is None:
+                        continue  # venda sem itens: só o cabeçalho, que fica no banco
+                    if f is None:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        # Modo append: o gzip aceita vários membros concatenados
+                        f = gzip.open(path, "at", encoding="utf-8")
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    archive.add(record)
+        finally:
+            if f is not None:
+                f.close()
+
+        if archive.ids:
+            archive.flush(db)
+            result["linhas"] += len(archive.ids)
+            result["resumos"] += len(archive.summaries)
+            result["arquivos"].append(path)
+        month = _next_month(month)
+    return result
+
+
+def archive_tenant(
+    db: Session, user_id: int, retention_days: int = ARCHIVE_RETENTION_DAYS
+) -> Dict:
+    """Archive movements and sale items older than the retention horizon for one user."""
+    cutoff = date.today() - timedelta(days=retention_days)
+    return {
+        "corte": cutoff,
+        **{entity: archive_entity(db, user_id, entity, cutoff) for entity in ARCHIVE_ENTITIES},
+    }
+
+
+def archived_until(db: Session, user_id: int, entity: str) -> Optional[date]:
+    """First day that is not covered by the archive (None when nothing was archived)."""
+    model = StockMovementSummary if entity == "movements" else SaleItemSummary
+    last_day = db.scalar(select(func.max(model.data)).where(model.user_id == user_id))
+    return last_day + timedelta(days=1) if last_day else None
+
+
+def iter_archived(
+    user_id: int,
+    entity: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Iterator[Dict]:
+    """Yield archived records (export layout) for a user, oldest month first."""
+    directory = os.path.join(ARCHIVE_DIR, str(user_id), entity)
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".ndjson.gz"):
+            continue
+        month = date.fromisoformat(name[:7] + "-01")
+        if date_to and month > date_to:
+            break
+        if date_from and _next_month(month) <= date_from:
+            continue
+        with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                dia = date.fromisoformat(record["criado_em"][:10])
+                if (date_from and dia < date_from) or (date_to and dia > date_to):
+                    continue
+                yield record
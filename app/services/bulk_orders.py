@@ -0,0 +1,157 @@
+"""
+Operações em massa sobre pedidos de compra (aprovar todos / limpar aprovados).
+
+Cada lote de `BULK_CHUNK_SIZE` pedidos é tratado com instruções set-based e
+confirmado em sua própria transação, então backlogs muito grandes não seguram
+uma transação longa e o progresso pode ser reportado lote a lote:
+
+- aprovar: um UPDATE ... RETURNING por lote + enfileiramento em massa na outbox
+  (as vendas são geradas em lote pelo worker, ver services/outbox.py);
+- limpar: DELETE explícito dos itens e depois dos pedidos, sem carregar objetos.
+  Pedidos cuja venda ainda está na fila são mantidos para a próxima limpeza.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Iterator, Tuple
+
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from ..models import (
+    OutboxJob,
+    OutboxJobStatus,
+    PurchaseOrder,
+    PurchaseOrderItem,
+    PurchaseOrderStatus,
+)
+from . import outbox
+
+BULK_CHUNK_SIZE = 500
+
+
+def _sale_job_pending():
+    """Approved orders whose sale is still queued in the outbox."""
+    return select(OutboxJob.referencia_id).where(
+        OutboxJob.tipo == outbox.JOB_SALE_FROM_PURCHASE_ORDER,
+        OutboxJob.status.in_([OutboxJobStatus.PENDING, OutboxJobStatus.PROCESSING]),
+    )
+
+
+def _pending_filter(user_id: int):
+    return and_(
+        PurchaseOrder.user_id == user_id,
+        PurchaseOrder.status == PurchaseOrderStatus.PENDING_APPROVAL,
+    )
+
+
+def _clearable_filter(user_id: int):
+    return and_(
+        PurchaseOrder.user_id == user_id,
+        PurchaseOrder.status == PurchaseOrderStatus.APPROVED,
+        PurchaseOrder.id.not_in(_sale_job_pending()),
+    )
+
+
+def _backlog(db: Session, criteria) -> Tuple[int, float]:
+    count, value = db.execute(
+        select(func.count(PurchaseOrder.id), func.coalesce(func.sum(PurchaseOrder.total_value), 0))
+        .where(criteria)
+    ).one()
+    return count, float(value)
+
+
+def approval_backlog(db: Session, user_id: int) -> Tuple[int, float]:
+    """Number and total value of orders waiting for approval."""
+    return _backlog(db, _pending_filter(user_id))
+
+
+def clearable_backlog(db: Session, user_id: int) -> Tuple[int, float]:
+    """Number and total value of approved orders that can be cleared now."""
+    return _backlog(db, _clearable_filter(user_id))
+
+
+def iter_approve_all(
+    db: Session, user_id: int, chunk_size: int = BULK_CHUNK_SIZE
+) -> Iterator[Dict]:
+    """Approve every pending order chunk by chunk, yielding progress after each commit."""
+    total, _ = approval_backlog(db, user_id)
+    approved, value = 0, 0.0
+    while True:
+        chunk = (
+            select(PurchaseOrder.id)
+            .where(_pending_filter(user_id))
+            .order_by(PurchaseOrder.id)
+            .limit(chunk_size)
+            .scalar_subquery()
+        )
+        rows = db.execute(
+            update(PurchaseOrder)
+            .where(PurchaseOrder.id.in_(chunk))
+            .values(status=PurchaseOrderStatus.APPROVED, aprovado_em=datetime.now())
+            .returning(PurchaseOrder.id, PurchaseOrder.total_value)
+        ).all()
+        if not rows:
+            break
+        outbox.enqueue(db, user_id, outbox.JOB_SALE_FROM_PURCHASE_ORDER, [r.id for r in rows])
+        db.commit()
+        outbox.wake_worker()
+
+        approved += len(rows)
+        value += sum(r.total_value for r in rows)
+        yield {"processados": approved, "total": max(total, approved), "valor": value}
+
+
+def iter_clear_approved(
+    db: Session, user_id: int, chunk_size: int = BULK_CHUNK_SIZE
+) -> Iterator[Dict]:
+    """Delete approved orders (items first) chunk by chunk, yielding progress after each commit."""
+    total, _ = clearable_backlog(db, user_id)
+    cleared, value = 0, 0.0
+    while True:
+        rows = db.execute(
+            select(PurchaseOrder.id, PurchaseOrder.total_value)
+            .where(_clearable_filter(user_id))
+            .order_by(PurchaseOrder.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        ids = [r.id for r in rows]
+        db.execute(delete(PurchaseOrderItem).where(PurchaseOrderItem.purchase_order_id.in_(ids)))
+        db.execute(delete(PurchaseOrder).where(PurchaseOrder.id.in_(ids)))
+        # O SQLite pode reutilizar ids apagados: jobs antigos bloqueariam a venda de um novo pedido
+        db.execute(
+            delete(OutboxJob).where(
+                OutboxJob.tipo == outbox.JOB_SALE_FROM_PURCHASE_ORDER,
+                OutboxJob.referencia_id.in_(ids),
+            )
+        )
+        db.commit()
+
+        cleared += len(rows)
+        value += sum(r.total_value for r in rows)
+        yield {"processados": cleared, "total": max(total, cleared), "valor": value}
+
+
+def run_to_end(progress: Iterator[Dict]) -> Dict:
+    """Consume a progress iterator and return its last event."""
+    last = {"processados": 0, "total": 0, "valor": 0.0}
+    for last in progress:
+        pass
+    return last
+
+
+def ndjson_progress(session_factory, operation, user_id: int, summarize) -> Iterator[str]:
+    """Stream one NDJSON line per chunk plus a final summary, using its own session."""
+    db = session_factory()
+    try:
+        last = {"processados": 0, "total": 0, "valor": 0.0}
+        for last in operation(db, user_id):
+            yield json.dumps({"etapa": "progresso", **last}) + "\n"
+        yield json.dumps({"etapa": "concluido", **summarize(last)}) + "\n"
+    except Exception as e:
+        db.rollback()
+        yield json.dumps({"etapa": "erro", "detail": str(e)}) + "\n"
+    finally:
+        db.close()
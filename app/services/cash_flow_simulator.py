@@ -1,11 +1,75 @@
 import random
-from datetime import datetime, timedelta
-from typing import List
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
 
+try:
+    import numpy as np
+
+    BULK_AVAILABLE = True
+except ImportError:
+    BULK_AVAILABLE = False
+
+from sqlalchemy import bindparam, func, or_, select, text
 from sqlalchemy.orm import Session
 
+from ..data_version import mark_changed
 from ..models import MovementType, Product, Sale, SaleItem, StockMovement
 
+# Fatores de demanda (compartilhados pelo gerador inicial e pelo gerador em massa)
+CATEGORY_DEMAND = {
+    "processador": 0.8,  # High demand
+    "memoria": 1.2,  # Very high demand
+    "armazenamento": 1.0,  # Medium demand
+    "placa de video": 0.6,  # Lower demand
+    "monitor": 0.4,  # Lower demand
+    "teclado": 1.5,  # Very high demand
+    "mouse": 1.5,  # Very high demand
+    "headset": 0.9,  # Medium-high demand
+}
+WEEKEND_FACTOR = 1.5
+HOLIDAY_MONTHS = (11, 12)
+HOLIDAY_FACTOR = 1.2
+BASE_DEMAND_MULTIPLIER = 0.5
+MAX_UNITS_PER_SALE = 3
+
+# Gerador em massa
+BULK_BATCH_SIZE = 50_000  # linhas por executemany
+BULK_MAX_CELLS = 2_000_000  # produtos x dias amostrados por vez (limita a memória)
+BULK_MOTIVO = "Histórico sintético"
+SALE_HOURS = (8, 22)  # vendas distribuídas entre 8h e 22h
+
+
+def _day_factor(day: date) -> float:
+    """Weekday and seasonal factor for a day (weekends and the holiday season sell more)."""
+    day_factor = WEEKEND_FACTOR if day.weekday() >= 5 else 1.0
+    month_factor = HOLIDAY_FACTOR if day.month in HOLIDAY_MONTHS else 1.0
+    return day_factor * month_factor
+
+
+def _base_demand_vector(prices, categories: List[Optional[str]], stock):
+    """Vectorised `CashFlowSimulator._calculate_base_demand` for the whole catalogue."""
+    price_factor = np.maximum(0.1, 1.0 - prices / 1000)
+    category_factor = np.array(
+        [CATEGORY_DEMAND.get((c or "").lower(), 1.0) for c in categories], dtype=float
+    )
+    stock_factor = np.where(stock > 0, np.minimum(2.0, stock / 10), 0.0)
+    return price_factor * category_factor * stock_factor * BASE_DEMAND_MULTIPLIER
+
+
+def _timestamps(start: datetime, seconds, dialect_name: str) -> List:
+    """Driver-level timestamps for `start + seconds` (SQLite stores text, like SQLAlchemy)."""
+    values = np.datetime64(start, "us") + seconds.astype("timedelta64[s]")
+    if dialect_name == "sqlite":
+        return np.char.replace(np.datetime_as_string(values, unit="us"), "T", " ").tolist()
+    return values.astype(datetime).tolist()
+
+
+def _insert_sql(table: str, columns, paramstyle: str) -> str:
+    marker = "?" if paramstyle == "qmark" else "%s"
+    placeholders = ", ".join([marker] * len(columns))
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
 
 class CashFlowSimulator:
     def __init__(self, db: Session):
@@ -42,19 +106,15 @@ class CashFlowSimulator:
                     # Calculate daily demand based on product price and category
                     base_demand = self._calculate_base_demand(product)
 
-                    # Apply day-of-week patterns (weekends have more sales)
-                    day_factor = 1.5 if date.weekday() >= 5 else 1.0  # Weekend boost
-
-                    # Apply seasonal patterns (more sales in certain months)
-                    month_factor = 1.2 if date.month in [11, 12] else 1.0  # Holiday season
-
-                    daily_demand = base_demand * day_factor * month_factor
+                    # Apply day-of-week and seasonal patterns
+                    # (weekends and the holiday season have more sales)
+                    daily_demand = base_demand * _day_factor(date)
 
                     # Generate sale if demand threshold is met
                     if daily_demand >= 0.3:  # 30% chance of sale for high-demand products
                         quantity = min(
-                            int(daily_demand), product.quantidade, 3
-                        )  # Max 3 units per sale
+                            int(daily_demand), product.quantidade, MAX_UNITS_PER_SALE
+                        )
 
                         if quantity > 0:
                             total_value = quantity * product.preco
@@ -106,20 +166,179 @@ class CashFlowSimulator:
         price_factor = max(0.1, 1.0 - (product.preco / 1000))  # Higher price = lower demand
 
         # Category-based demand
-        category_demand = {
-            "processador": 0.8,  # High demand
-            "memoria": 1.2,  # Very high demand
-            "armazenamento": 1.0,  # Medium demand
-            "placa de video": 0.6,  # Lower demand
-            "monitor": 0.4,  # Lower demand
-            "teclado": 1.5,  # Very high demand
-            "mouse": 1.5,  # Very high demand
-            "headset": 0.9,  # Medium-high demand
-        }
-
-        category_factor = category_demand.get(product.categoria.lower(), 1.0)
+        category_factor = CATEGORY_DEMAND.get((product.categoria or "").lower(), 1.0)
 
         # Stock level factor (more stock = more visibility = more sales)
         stock_factor = min(2.0, product.quantidade / 10) if product.quantidade > 0 else 0
 
-        return price_factor * category_factor * stock_factor * 0.5  # Base multiplier
+        return price_factor * category_factor * stock_factor * BASE_DEMAND_MULTIPLIER
+
+    def generate_bulk_history(
+        self,
+        days_back: int = 365,
+        user_id: Optional[int] = None,
+        seed: Optional[int] = None,
+        batch_size: int = BULK_BATCH_SIZE,
+    ) -> Dict:
+        """
+        Generate a synthetic sales history for every product and day in one NumPy pass.
+
+        Daily units per product are drawn from a Poisson distribution whose mean is the
+        same demand model as `_calculate_base_demand` times the weekday/seasonal factor,
+        capped at MAX_UNITS_PER_SALE. Each sale (one item and one OUT movement) is written
+        with executemany in chronological id order. Movements are rebuilt backwards so
+        the history ends at today's stock; product quantities are left untouched.
+        The same seed over the same catalogue produces the same history.
+        """
+        if not BULK_AVAILABLE:
+            raise RuntimeError("numpy não instalado: gerador em massa indisponível")
+        started = time.perf_counter()
+
+        query = select(
+            Product.id, Product.user_id, Product.preco, Product.categoria, Product.quantidade
+        ).order_by(Product.id)
+        if user_id is not None:
+            query = query.where(Product.user_id == user_id)
+        products = self.db.execute(query).all()
+        result = {"produtos": len(products), "dias": days_back, "vendas": 0, "segundos": 0.0}
+        if not products or days_back <= 0:
+            return result
+
+        product_ids = np.array([p.id for p in products], dtype=np.int64)
+        owners = np.array([p.user_id for p in products], dtype=np.int64)
+        prices = np.array([p.preco for p in products], dtype=float)
+        stock = np.array([p.quantidade for p in products], dtype=np.int64)
+        base = _base_demand_vector(prices, [p.categoria for p in products], stock)
+
+        first_day = date.today() - timedelta(days=days_back)
+        day_start = datetime.combine(first_day, datetime.min.time())
+        day_factors = np.array(
+            [_day_factor(first_day + timedelta(days=i)) for i in range(days_back)]
+        )
+
+        # Amostra produtos x dias em blocos de produtos para limitar a memória
+        rng = np.random.default_rng(seed)
+        chunk = max(1, BULK_MAX_CELLS // days_back)
+        parts = []
+        for lo in range(0, len(products), chunk):
+            units = np.minimum(
+                rng.poisson(np.outer(base[lo : lo + chunk], day_factors)), MAX_UNITS_PER_SALE
+            )
+            rows, cols = np.nonzero(units)
+            parts.append((rows + lo, cols, units[rows, cols]))
+        product_idx = np.concatenate([p[0] for p in parts])
+        day_idx = np.concatenate([p[1] for p in parts])
+        quantities = np.concatenate([p[2] for p in parts]).astype(np.int64)
+        n = len(quantities)
+        if n == 0:
+            result["segundos"] = round(time.perf_counter() - started, 3)
+            return result
+
+        # Horário de cada venda; a ordem cronológica define os ids
+        seconds = day_idx.astype(np.int64) * 86400 + rng.integers(
+            SALE_HOURS[0] * 3600, SALE_HOURS[1] * 3600, size=n
+        )
+        order = np.lexsort((product_idx, seconds))
+        product_idx, quantities, seconds = product_idx[order], quantities[order], seconds[order]
+
+        # Estoque após cada venda = estoque atual + unidades vendidas depois dela (por produto)
+        by_product = np.argsort(product_idx, kind="stable")
+        grouped = product_idx[by_product]
+        sold = np.cumsum(quantities[by_product])
+        new_group = np.r_[True, grouped[1:] != grouped[:-1]]
+        group_total = sold[np.r_[new_group[1:], True]]
+        sold_after = group_total[np.cumsum(new_group) - 1] - sold
+        resulting = np.empty(n, dtype=np.int64)
+        resulting[by_product] = stock[grouped] + sold_after
+
+        sale_ids = (self.db.scalar(select(func.max(Sale.id))) or 0) + 1 + np.arange(n)
+        unit_prices = prices[product_idx]
+        dialect = self.db.get_bind().dialect
+        timestamps = _timestamps(day_start, seconds, dialect.name)
+
+        columns = {
+            Sale.__tablename__: ("id", "user_id", "total_value", "status", "criado_em"),
+            SaleItem.__tablename__: (
+                "sale_id", "produto_id", "quantidade", "preco_unitario", "preco_total",
+                "criado_em",
+            ),
+            StockMovement.__tablename__: (
+                "user_id", "produto_id", "tipo", "quantidade_alterada",
+                "quantidade_resultante", "motivo", "criado_em",
+            ),
+        }
+        statements = {
+            table: _insert_sql(table, names, dialect.paramstyle)
+            for table, names in columns.items()
+        }
+
+        sale_ids_l = sale_ids.tolist()
+        owners_l = owners[product_idx].tolist()
+        produto_l = product_ids[product_idx].tolist()
+        qty_l = quantities.tolist()
+        price_l = unit_prices.tolist()
+        total_l = (quantities * unit_prices).tolist()
+        resulting_l = resulting.tolist()
+        connection = self.db.connection()
+        for lo in range(0, n, batch_size):
+            window = range(lo, min(lo + batch_size, n))
+            connection.exec_driver_sql(
+                statements[Sale.__tablename__],
+                [
+                    (sale_ids_l[i], owners_l[i], total_l[i], "COMPLETED", timestamps[i])
+                    for i in window
+                ],
+            )
+            connection.exec_driver_sql(
+                statements[SaleItem.__tablename__],
+                [
+                    (sale_ids_l[i], produto_l[i], qty_l[i], price_l[i], total_l[i], timestamps[i])
+                    for i in window
+                ],
+            )
+            connection.exec_driver_sql(
+                statements[StockMovement.__tablename__],
+                [
+                    (
+                        owners_l[i], produto_l[i], MovementType.OUT.value, -qty_l[i],
+                        resulting_l[i], BULK_MOTIVO, timestamps[i],
+                    )
+                    for i in window
+                ],
+            )
+
+        # Última venda de cada produto (o último índice de cada grupo é o mais recente)
+        last_sale = by_product[np.r_[new_group[1:], True]]
+        self.db.execute(
+            Product.__table__.update()
+            .where(Product.__table__.c.id == bindparam("produto_id"))
+            .where(
+                or_(
+                    Product.__table__.c.last_sale_date.is_(None),
+                    Product.__table__.c.last_sale_date < bindparam("vendido_em"),
+                )
+            )
+            .values(last_sale_date=bindparam("vendido_em")),
+            [
+                {
+                    "produto_id": produto_l[i],
+                    "vendido_em": day_start + timedelta(seconds=int(seconds[i])),
+                }
+                for i in last_sale.tolist()
+            ],
+        )
+        if dialect.name == "postgresql":
+            # Ids atribuídos aqui: a sequência precisa acompanhar
+            self.db.execute(
+                text("SELECT setval(pg_get_serial_sequence('sales', 'id'), :last)"),
+                {"last": int(sale_ids[-1])},
+            )
+        # INSERTs crus acima não passam pelos eventos da Session
+        for owner in np.unique(owners).tolist():
+            mark_changed(self.db, owner)
+        self.db.commit()
+
+        result["vendas"] = n
+        result["unidades"] = int(quantities.sum())
+        result["segundos"] = round(time.perf_counter() - started, 3)
+        return result
@@ -0,0 +1,189 @@
+"""
+Exportação em streaming de vendas, movimentos de estoque e produtos.
+
+As linhas são lidas com `yield_per` (cursor incremental) e serializadas em
+blocos de CSV ou NDJSON, de modo que a memória usada não depende do tamanho
+do histórico.
+"""
+
+import csv
+import enum
+import io
+import itertools
+import json
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import Product, Sale, SaleItem, StockMovement
+
+EXPORT_CHUNK_ROWS = 1000
+
+
+def _date_range(column, date_from: Optional[date], date_to: Optional[date]) -> List:
+    conditions = []
+    if date_from:
+        conditions.append(column >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        # date_to é inclusivo: até o fim do dia
+        conditions.append(
+            column < datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+        )
+    return conditions
+
+
+def _sales_query(user_id: int, date_from: Optional[date], date_to: Optional[date]):
+    return (
+        select(
+            Sale.id.label("sale_id"),
+            Sale.criado_em,
+            Sale.status,
+            Sale.total_value,
+            SaleItem.id.label("item_id"),
+            SaleItem.produto_id,
+            Product.codigo.label("produto_codigo"),
+            Product.nome.label("produto_nome"),
+            SaleItem.quantidade,
+            SaleItem.preco_unitario,
+            SaleItem.preco_total,
+        )
+        .outerjoin(SaleItem, SaleItem.sale_id == Sale.id)
+        .outerjoin(Product, SaleItem.produto_id == Product.id)
+        .where(Sale.user_id == user_id, *_date_range(Sale.criado_em, date_from, date_to))
+        .order_by(Sale.id, SaleItem.id)
+    )
+
+
+def _movements_query(user_id: int, date_from: Optional[date], date_to: Optional[date]):
+    return (
+        select(
+            StockMovement.id,
+            StockMovement.criado_em,
+            StockMovement.produto_id,
+            Product.codigo.label("produto_codigo"),
+            StockMovement.tipo,
+            StockMovement.quantidade_alterada,
+            StockMovement.quantidade_resultante,
+            StockMovement.motivo,
+        )
+        .join(Product, StockMovement.produto_id == Product.id)
+        .where(
+            StockMovement.user_id == user_id,
+            *_date_range(StockMovement.criado_em, date_from, date_to),
+        )
+        .order_by(StockMovement.id)
+    )
+
+
+def _products_query(user_id: int, date_from: Optional[date], date_to: Optional[date]):
+    return (
+        select(
+            Product.id,
+            Product.codigo,
+            Product.nome,
+            Product.categoria,
+            Product.quantidade,
+            Product.preco,
+            Product.fornecedor_id,
+            Product.estoque_minimo,
+            Product.lead_time_days,
+            Product.safety_stock,
+            Product.last_sale_date,
+            Product.criado_em,
+            Product.atualizado_em,
+        )
+        .where(Product.user_id == user_id, *_date_range(Product.criado_em, date_from, date_to))
+        .order_by(Product.id)
+    )
+
+
+EXPORT_QUERIES: Dict[str, Callable] = {
+    "sales": _sales_query,
+    "movements": _movements_query,
+    "products": _products_query,
+}
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(columns: List[str], partitions: Iterator[List[Tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows(
+            ["" if value is None else _plain(value) for value in row] for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(columns: List[str], partitions: Iterator[List[Tuple]]) -> Iterator[str]:
+    for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(columns, (_plain(value) for value in row))), ensure_ascii=False)
+            + "\n"
+            for row in rows
+        )
+
+
+def iter_export(
+    session_factory: Callable[[], Session],
+    entity: str,
+    formato: str,
+    user_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+    include_archive: bool = False,
+) -> Iterator[str]:
+    """Yield CSV/NDJSON text chunks for an entity; owns its session while streaming."""
+    from .archiver import ARCHIVE_ENTITIES, archived_until
+
+    db = session_factory()
+    try:
+        partitions = []
+        db_date_from = date_from
+        if include_archive and entity in ARCHIVE_ENTITIES:
+            cutoff = archived_until(db, user_id, entity)
+            if cutoff:
+                partitions.append(_archived_partitions(user_id, entity, date_from, date_to))
+                # Do banco, só o que não está no arquivo (evita cabeçalhos de venda sem itens)
+                db_date_from = max(date_from, cutoff) if date_from else cutoff
+
+        stmt = EXPORT_QUERIES[entity](user_id, db_date_from, date_to)
+        columns = [c.name for c in stmt.selected_columns]
+        serialize = _ndjson_chunks if formato == "ndjson" else _csv_chunks
+        result = db.execute(stmt.execution_options(yield_per=chunk_rows))
+        partitions.append(result.partitions())
+        yield from serialize(columns, itertools.chain.from_iterable(partitions))
+    finally:
+        db.close()
+
+
+def _archived_partitions(
+    user_id: int,
+    entity: str,
+    date_from: Optional[date],
+    date_to: Optional[date],
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[List[Tuple]]:
+    from .archiver import iter_archived
+
+    records = iter_archived(user_id, entity, date_from, date_to)
+    while True:
+        chunk = [tuple(record.values()) for record in itertools.islice(records, chunk_rows)]
+        if not chunk:
+            return
+        yield chunk
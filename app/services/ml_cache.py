@@ -0,0 +1,169 @@
+"""
+Cache de resultados do MLPredictor.
+
+Os resultados são indexados por (tenant, produto, endpoint, parâmetros) e
+invalidados por um watermark dos dados do produto (último item de venda,
+último movimento de estoque e última atualização do cadastro). Requisições
+concorrentes para a mesma chave são coalescidas: apenas uma calcula o
+resultado e as demais aguardam por ele.
+"""
+
+import copy
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from ..metrics import observe_ml_cache
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL_SECONDS = 15 * 60  # limita a idade de previsões que dependem da data atual
+
+
+class _InFlight:
+    def __init__(self, watermark: Hashable):
+        self.watermark = watermark
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class MLResultCache:
+    def __init__(
+        self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[Hashable, float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _endpoint_stats(self, endpoint: str) -> Dict[str, float]:
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = {"hits": 0, "misses": 0, "coalesced": 0, "compute_seconds": 0.0}
+            self._stats[endpoint] = stats
+        return stats
+
+    def get_or_compute(
+        self, key: Tuple, watermark: Hashable, compute: Callable[[], Any]
+    ) -> Any:
+        """Return the cached value for key/watermark or compute it exactly once."""
+        endpoint = key[2]
+        with self._lock:
+            stats = self._endpoint_stats(endpoint)
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and entry[0] == watermark
+                and time.monotonic() - entry[1] < self.ttl_seconds
+            ):
+                self._entries.move_to_end(key)
+                stats["hits"] += 1
+                observe_ml_cache(endpoint, "hit")
+                return copy.deepcopy(entry[2])
+
+            inflight = self._inflight.get(key)
+            if inflight is not None and inflight.watermark == watermark:
+                stats["coalesced"] += 1
+                leader = False
+            else:
+                inflight = _InFlight(watermark)
+                self._inflight[key] = inflight
+                stats["misses"] += 1
+                leader = True
+        observe_ml_cache(endpoint, "miss" if leader else "coalesced")
+
+        if not leader:
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return copy.deepcopy(inflight.result)
+
+        start = time.perf_counter()
+        try:
+            result = compute()
+        except BaseException as e:
+            inflight.error = e
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.event.set()
+            raise
+
+        elapsed = time.perf_counter() - start
+        inflight.result = result
+        with self._lock:
+            self._endpoint_stats(endpoint)["compute_seconds"] += elapsed
+            self._entries[key] = (watermark, time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self._inflight.get(key) is inflight:
+                del self._inflight[key]
+        inflight.event.set()
+        return copy.deepcopy(result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit rate and compute time, overall and per endpoint."""
+        with self._lock:
+            by_endpoint = {}
+            totals = {"hits": 0, "misses": 0, "coalesced": 0, "compute_seconds": 0.0}
+            for endpoint, stats in self._stats.items():
+                for k in totals:
+                    totals[k] += stats[k]
+                by_endpoint[endpoint] = _summarize(stats)
+            summary = _summarize(totals)
+            summary["entries"] = len(self._entries)
+            summary["in_flight"] = len(self._inflight)
+            summary["by_endpoint"] = by_endpoint
+            return summary
+
+
+def _summarize(stats: Dict[str, float]) -> Dict:
+    requests = stats["hits"] + stats["misses"] + stats["coalesced"]
+    return {
+        "requests": requests,
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "coalesced": stats["coalesced"],
+        "hit_rate": round((stats["hits"] + stats["coalesced"]) / requests, 3) if requests else 0,
+        "compute_seconds_total": round(stats["compute_seconds"], 3),
+        "avg_compute_ms": (
+            round(stats["compute_seconds"] / stats["misses"] * 1000, 2) if stats["misses"] else 0
+        ),
+    }
+
+
+ml_result_cache = MLResultCache()
+
+
+def cached_result(endpoint: str):
+    """Cache an MLPredictor method; the instance must provide `_data_watermark(product_id)`."""
+
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = tuple(
+                (name, value) for name, value in bound.arguments.items() if name != "self"
+            )
+            product_id = bound.arguments.get("product_id")
+            key = (self.user_id, product_id, endpoint, params)
+            watermark = self._data_watermark(product_id)
+            return ml_result_cache.get_or_compute(
+                key, watermark, lambda: method(self, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
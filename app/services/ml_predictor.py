@@ -16,10 +16,21 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, func, text
+from sqlalchemy import and_, func, select, text
 from sqlalchemy.orm import Session
 
-from ..models import MovementType, Product, Sale, SaleItem, StockMovement
+from ..metrics import ml_timer
+from ..models import (
+    MovementType,
+    Product,
+    Sale,
+    SaleItem,
+    SaleItemSummary,
+    StockMovement,
+    StockMovementSummary,
+)
+from .ml_cache import cached_result
+from .stock_snapshots import stock_history
 
 
 class MLPredictor:
@@ -27,6 +38,7 @@ class MLPredictor:
         self.db = db
         self.user_id = user_id
         self.models_dir = "ml_models"
+        self._watermarks: Dict[Optional[int], Tuple] = {}
         self._ensure_models_directory()
 
     def _ensure_models_directory(self):
@@ -34,6 +46,39 @@ class MLPredictor:
         if not os.path.exists(self.models_dir):
             os.makedirs(self.models_dir)
 
+    def _data_watermark(self, product_id: Optional[int]) -> Tuple:
+        """Last sale item / stock movement / product update seen for the cache key"""
+        if product_id in self._watermarks:
+            return self._watermarks[product_id]
+
+        last_sale_item = (
+            select(func.max(SaleItem.id))
+            .join(Sale, SaleItem.sale_id == Sale.id)
+            .where(Sale.user_id == self.user_id)
+        )
+        if product_id is None:
+            watermark = (self.db.execute(last_sale_item).scalar(),)
+        else:
+            last_sale_item = last_sale_item.where(SaleItem.produto_id == product_id)
+            last_movement = select(func.max(StockMovement.id)).where(
+                StockMovement.user_id == self.user_id, StockMovement.produto_id == product_id
+            )
+            product_updated = select(Product.atualizado_em).where(
+                Product.id == product_id, Product.user_id == self.user_id
+            )
+            watermark = tuple(
+                self.db.execute(
+                    select(
+                        last_sale_item.scalar_subquery(),
+                        last_movement.scalar_subquery(),
+                        product_updated.scalar_subquery(),
+                    )
+                ).one()
+            )
+
+        self._watermarks[product_id] = watermark
+        return watermark
+
     def _get_sales_data(self, product_id: Optional[int] = None, days: int = 90):
         """Get real sales data from SQLite database"""
         if not ML_AVAILABLE:
@@ -65,7 +110,7 @@ class MLPredictor:
         if product_id:
             query = query.filter(SaleItem.produto_id == product_id)
 
-        sales_data = query.all()
+        sales_data = query.all() + self._get_archived_sales(product_id, start_date)
 
         if not sales_data:
             return pd.DataFrame()
@@ -93,6 +138,67 @@ class MLPredictor:
 
         return df
 
+    def _get_archived_sales(self, product_id: Optional[int], start_date: datetime) -> List[Tuple]:
+        """Archived sale items as one row per day/price (see services/archiver.py)"""
+        query = (
+            self.db.query(
+                SaleItemSummary.produto_id,
+                SaleItemSummary.quantidade,
+                SaleItemSummary.preco_unitario,
+                SaleItemSummary.preco_total,
+                SaleItemSummary.data,
+                Product.nome,
+                Product.categoria,
+            )
+            .join(Product, SaleItemSummary.produto_id == Product.id)
+            .filter(
+                SaleItemSummary.user_id == self.user_id,
+                SaleItemSummary.data > start_date.date(),
+                SaleItemSummary.status == "COMPLETED",
+            )
+        )
+        if product_id:
+            query = query.filter(SaleItemSummary.produto_id == product_id)
+        return [
+            (*row[:4], datetime.combine(row.data, datetime.min.time()), *row[5:])
+            for row in query.all()
+        ]
+
+    def _get_archived_movements(
+        self, product_id: Optional[int], start_date: datetime
+    ) -> List[Tuple]:
+        """Archived stock movements as daily IN/OUT rows (see services/archiver.py)"""
+        query = (
+            self.db.query(StockMovementSummary, Product.nome)
+            .join(Product, StockMovementSummary.produto_id == Product.id)
+            .filter(
+                StockMovementSummary.user_id == self.user_id,
+                StockMovementSummary.data > start_date.date(),
+            )
+        )
+        if product_id:
+            query = query.filter(StockMovementSummary.produto_id == product_id)
+        rows = []
+        for summary, nome in query.all():
+            criado_em = datetime.combine(summary.data, datetime.min.time())
+            for tipo, quantidade in (
+                (MovementType.IN, summary.entradas),
+                (MovementType.OUT, summary.saidas),
+            ):
+                if quantidade:
+                    rows.append(
+                        (
+                            summary.produto_id,
+                            tipo,
+                            quantidade,
+                            summary.quantidade_final,
+                            "Resumo diário arquivado",
+                            criado_em,
+                            nome,
+                        )
+                    )
+        return rows
+
     def _get_stock_movements(self, product_id: Optional[int] = None, days: int = 90):
         """Get real stock movement data from SQLite database"""
         if not ML_AVAILABLE:
@@ -118,7 +224,7 @@ class MLPredictor:
         if product_id:
             query = query.filter(StockMovement.produto_id == product_id)
 
-        movements_data = query.all()
+        movements_data = query.all() + self._get_archived_movements(product_id, start_date)
 
         if not movements_data:
             return pd.DataFrame()
@@ -141,6 +247,22 @@ class MLPredictor:
 
         return df
 
+    def _get_stock_levels(self, product_id: int, days: int = 30):
+        """Daily end-of-day stock series from snapshots, without replaying all movements"""
+        if not ML_AVAILABLE:
+            return None
+        today = datetime.now().date()
+        history = stock_history(
+            self.db, product_id, self.user_id, today - timedelta(days=days - 1), today
+        )
+        series = pd.Series(
+            [point["quantidade"] for point in history],
+            index=pd.to_datetime([point["data"] for point in history]),
+            dtype="float",
+        )
+        return series.dropna()
+
+    @cached_result("demand_prediction")
     def predict_demand(self, product_id: int, days_ahead: int = 30) -> Dict:
         """Predict future demand using real historical data"""
         if not ML_AVAILABLE:
@@ -229,7 +351,8 @@ class MLPredictor:
                 model = external
             else:
                 model = LinearRegression()
-                model.fit(X, y)
+                with ml_timer("demand", "fit"):
+                    model.fit(X, y)
 
             # Generate future dates
             last_date = daily_sales["data"].max()
@@ -269,7 +392,8 @@ class MLPredictor:
                     current_rolling_std_7,
                 ]
 
-                prediction = max(0, model.predict([features])[0])  # Ensure non-negative
+                with ml_timer("demand", "predict"):
+                    prediction = max(0, model.predict([features])[0])  # Ensure non-negative
 
                 future_predictions.append(
                     {
@@ -315,6 +439,7 @@ class MLPredictor:
                 "predictions": [],
             }
 
+    @cached_result("price_optimization")
     def optimize_price(self, product_id: int) -> Dict:
         """Optimize product price using real sales data"""
         if not ML_AVAILABLE:
@@ -372,7 +497,8 @@ class MLPredictor:
 
             # Train price-demand model
             model = LinearRegression()
-            model.fit(X, y)
+            with ml_timer("price", "fit"):
+                model.fit(X, y)
 
             # Generate price scenarios
             min_price = max(0.1, current_price * 0.7)
@@ -381,7 +507,8 @@ class MLPredictor:
             revenue_scenarios = []
 
             for price in price_scenarios:
-                predicted_quantity = max(0, model.predict([[price]])[0])
+                with ml_timer("price", "predict"):
+                    predicted_quantity = max(0, model.predict([[price]])[0])
                 revenue = price * predicted_quantity
                 revenue_scenarios.append(
                     {
@@ -421,6 +548,7 @@ class MLPredictor:
         except Exception as e:
             return {"success": False, "message": f"Error in price optimization: {str(e)}"}
 
+    @cached_result("anomaly_detection")
     def detect_anomalies(self, product_id: Optional[int] = None) -> Dict:
         """Detect anomalies in real sales patterns"""
         if not ML_AVAILABLE:
@@ -475,11 +603,13 @@ class MLPredictor:
             # Train isolation forest
             contamination = min(0.1, max(0.05, 1.0 / len(daily_features)))  # Adaptive contamination
             iso_forest = IsolationForest(contamination=contamination, random_state=42)
-            anomalies = iso_forest.fit_predict(X_scaled)
+            with ml_timer("anomaly", "fit"):
+                anomalies = iso_forest.fit_predict(X_scaled)
 
             # Get anomaly dates
             anomaly_dates = daily_features[anomalies == -1]["data"].tolist()
-            anomaly_scores = iso_forest.decision_function(X_scaled)
+            with ml_timer("anomaly", "predict"):
+                anomaly_scores = iso_forest.decision_function(X_scaled)
 
             # Get detailed anomaly information
             anomaly_details = []
@@ -507,6 +637,7 @@ class MLPredictor:
         except Exception as e:
             return {"success": False, "message": f"Error in anomaly detection: {str(e)}"}
 
+    @cached_result("stock_optimization")
     def get_stock_optimization(self, product_id: int) -> Dict:
         """Get stock optimization recommendations based on real data"""
         if not ML_AVAILABLE:
@@ -552,6 +683,11 @@ class MLPredictor:
             movements_df = self._get_stock_movements(product_id, days=30)
             recent_movements = len(movements_df) if not movements_df.empty else 0
 
+            # Stock level over the last 30 days (snapshots + movements)
+            stock_levels = self._get_stock_levels(product_id, days=30)
+            avg_stock_level = float(stock_levels.mean()) if not stock_levels.empty else None
+            stockout_days = int((stock_levels <= 0).sum())
+
             return {
                 "success": True,
                 "current_stock": current_stock,
@@ -562,6 +698,10 @@ class MLPredictor:
                 "lead_time_days": lead_time_days,
                 "safety_stock": safety_stock,
                 "recent_movements": recent_movements,
+                "avg_stock_level_30d": (
+                    round(avg_stock_level, 2) if avg_stock_level is not None else None
+                ),
+                "stockout_days_30d": stockout_days,
                 "recommendations": self._generate_stock_recommendations(
                     current_stock, reorder_point, stock_cover_days, avg_daily_demand
                 ),
@@ -621,6 +761,7 @@ class MLPredictor:
 
         return recommendations
 
+    @cached_result("product_insights")
     def get_product_insights_summary(self, product_id: int) -> Dict:
         """Get comprehensive ML insights for a product using real data"""
         demand_prediction = self.predict_demand(product_id, days_ahead=30)
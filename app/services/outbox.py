@@ -0,0 +1,237 @@
+"""
+Fila local (outbox) para efeitos colaterais das requisições.
+
+Em vez de executar o efeito dentro da requisição, o endpoint grava um job em
+`outbox_jobs` na mesma transação da mudança de estado (ex.: aprovar o pedido).
+Um worker em segundo plano:
+
+1. reivindica um lote de jobs com um único UPDATE ... RETURNING (seguro com
+   vários processos: o SQLite serializa as escritas e no Postgres a subconsulta
+   usa FOR UPDATE SKIP LOCKED);
+2. processa os jobs de cada tipo de uma vez, com o handler registrado em
+   `HANDLERS`, e marca-os como DONE na mesma transação;
+3. se o lote falhar, reprocessa job a job para isolar o culpado, que volta para
+   a fila com espera exponencial até `OUTBOX_MAX_ATTEMPTS` (depois, FAILED).
+
+Jobs presos em PROCESSING (processo que caiu) voltam a ser elegíveis após
+`OUTBOX_CLAIM_TIMEOUT`.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..data_version import tenant
+from ..database import SessionLocal, dialect_insert
+from ..models import OutboxJob, OutboxJobStatus
+
+OUTBOX_WORKER_ENABLED = True
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_POLL_INTERVAL = 2.0  # segundos entre consultas quando a fila está vazia
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE = timedelta(seconds=5)
+OUTBOX_RETRY_MAX = timedelta(minutes=10)
+OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+JOB_SALE_FROM_PURCHASE_ORDER = "sale_from_purchase_order"
+
+
+def _create_sales(db: Session, jobs: List) -> Dict[int, str]:
+    sales = crud.create_sales_from_purchase_orders(db, [job.referencia_id for job in jobs])
+    return {
+        job.id: "Pedido não encontrado ou não aprovado; venda não criada."
+        for job in jobs
+        if job.referencia_id not in sales
+    }
+
+
+# Handler: recebe os jobs reivindicados de um tipo e aplica o efeito sem commit.
+# Devolve {job_id: observação} dos jobs concluídos sem efeito.
+HANDLERS: Dict[str, Callable[[Session, List], Dict[int, str]]] = {
+    JOB_SALE_FROM_PURCHASE_ORDER: _create_sales,
+}
+
+
+def enqueue(db: Session, user_id: int, tipo: str, referencia_ids: Iterable[int]):
+    """Add jobs to the caller's transaction (no commit); existing (tipo, referencia) are kept."""
+    now = datetime.now()
+    rows = [
+        {
+            "user_id": user_id,
+            "tipo": tipo,
+            "referencia_id": referencia_id,
+            "status": OutboxJobStatus.PENDING,
+            "tentativas": 0,
+            "disponivel_em": now,
+        }
+        for referencia_id in referencia_ids
+    ]
+    if rows:
+        stmt = dialect_insert(db.get_bind())(OutboxJob)
+        db.execute(stmt.on_conflict_do_nothing(index_elements=["tipo", "referencia_id"]), rows)
+
+
+def claim_batch(db: Session, limit: int = OUTBOX_BATCH_SIZE) -> List:
+    """Atomically move up to `limit` due jobs to PROCESSING and return them."""
+    now = datetime.now()
+    due = (
+        select(OutboxJob.id)
+        .where(
+            or_(
+                and_(
+                    OutboxJob.status == OutboxJobStatus.PENDING,
+                    OutboxJob.disponivel_em <= now,
+                ),
+                and_(
+                    OutboxJob.status == OutboxJobStatus.PROCESSING,
+                    OutboxJob.reivindicado_em < now - OUTBOX_CLAIM_TIMEOUT,
+                ),
+            )
+        )
+        .order_by(OutboxJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    jobs = db.execute(
+        update(OutboxJob)
+        .where(OutboxJob.id.in_(due))
+        .values(
+            status=OutboxJobStatus.PROCESSING,
+            reivindicado_em=now,
+            tentativas=OutboxJob.tentativas + 1,
+        )
+        .returning(
+            OutboxJob.id,
+            OutboxJob.user_id,
+            OutboxJob.tipo,
+            OutboxJob.referencia_id,
+            OutboxJob.tentativas,
+        )
+    ).all()
+    db.commit()
+    return sorted(jobs, key=lambda job: job.id)
+
+
+def _mark_done(db: Session, jobs: List, notes: Dict[int, str]):
+    now = datetime.now()
+    db.execute(
+        update(OutboxJob),
+        [
+            {
+                "id": job.id,
+                "status": OutboxJobStatus.DONE,
+                "processado_em": now,
+                "erro": notes.get(job.id),
+            }
+            for job in jobs
+        ],
+    )
+
+
+def _mark_failed(db: Session, job, error: Exception):
+    if job.tentativas >= OUTBOX_MAX_ATTEMPTS:
+        status, disponivel_em = OutboxJobStatus.FAILED, None
+    else:
+        delay = min(OUTBOX_RETRY_BASE * 2 ** (job.tentativas - 1), OUTBOX_RETRY_MAX)
+        status, disponivel_em = OutboxJobStatus.PENDING, datetime.now() + delay
+    values = {"status": status, "erro": f"{type(error).__name__}: {error}"[:1000]}
+    if disponivel_em is not None:
+        values["disponivel_em"] = disponivel_em
+    db.execute(update(OutboxJob).where(OutboxJob.id == job.id).values(**values))
+    db.commit()
+
+
+def _run(db: Session, tipo: str, jobs: List):
+    handler = HANDLERS.get(tipo)
+    if handler is None:
+        raise RuntimeError(f"Tipo de job desconhecido: {tipo}")
+    # Escritas do lote contam para os usuários dos jobs, não para a versão global
+    with tenant({job.user_id for job in jobs}):
+        notes = handler(db, jobs)
+        _mark_done(db, jobs, notes)
+        db.commit()
+
+
+def process_batch(db: Session, limit: int = OUTBOX_BATCH_SIZE) -> int:
+    """Claim and process one batch of due jobs; returns how many were claimed."""
+    jobs = claim_batch(db, limit)
+    by_type: Dict[str, List] = {}
+    for job in jobs:
+        by_type.setdefault(job.tipo, []).append(job)
+
+    for tipo, group in by_type.items():
+        try:
+            _run(db, tipo, group)
+            continue
+        except Exception as e:
+            db.rollback()
+            if len(group) == 1:
+                _mark_failed(db, group[0], e)
+                continue
+        # Lote falhou: isola o job com problema processando um a um
+        for job in group:
+            try:
+                _run(db, tipo, [job])
+            except Exception as e:
+                db.rollback()
+                _mark_failed(db, job, e)
+    return len(jobs)
+
+
+class OutboxWorker:
+    """Background thread that drains the outbox; `wake()` skips the poll wait."""
+
+    def __init__(self, session_factory=SessionLocal, poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="outbox-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self):
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            claimed = 0
+            db = self.session_factory()
+            try:
+                claimed = process_batch(db)
+            except Exception as e:
+                print(f"❌ Erro no worker da outbox: {e}")
+            finally:
+                db.close()
+            # Lote cheio: provavelmente há mais jobs, segue sem esperar
+            if claimed < OUTBOX_BATCH_SIZE:
+                self._wake.wait(self.poll_interval)
+
+
+outbox_worker = OutboxWorker()
+
+
+def wake_worker():
+    outbox_worker.wake()
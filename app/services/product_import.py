@@ -0,0 +1,231 @@
+"""
+Importação em massa de produtos (CSV ou NDJSON).
+
+O arquivo é lido linha a linha, cada registro é validado com
+`schemas.ProductCreate` e os produtos são gravados em lotes com
+`INSERT ... ON CONFLICT (codigo) DO UPDATE` (upsert por código).
+
+Produtos novos recebem os valores padrão do schema nas colunas ausentes; em
+produtos existentes o upsert só atualiza as colunas presentes no registro
+(reimportar um arquivo parcial nunca zera o que ele não traz).
+"""
+
+import csv
+import json
+import time
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..database import dialect_insert
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+# (linha, registro, erro de parsing)
+ParsedRecord = Tuple[int, Optional[dict], Optional[str]]
+# (linha, valores com os padrões do schema, colunas presentes no registro)
+BatchEntry = Tuple[int, dict, FrozenSet[str]]
+
+
+def detect_format(filename: Optional[str], formato: Optional[str] = None) -> str:
+    """Resolve the import format from an explicit value or the file extension."""
+    if formato:
+        formato = formato.lower()
+    elif filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        formato = "ndjson"
+    else:
+        formato = "csv"
+    if formato not in SUPPORTED_FORMATS:
+        raise ValueError(f"Formato não suportado: {formato}")
+    return formato
+
+
+def iter_csv_records(stream: TextIO) -> Iterator[ParsedRecord]:
+    reader = csv.DictReader(stream)
+    for row in reader:
+        # Colunas vazias usam o valor padrão do schema
+        record = {
+            k.strip(): v.strip()
+            for k, v in row.items()
+            if k is not None and v is not None and v.strip() != ""
+        }
+        yield reader.line_num, record, None
+
+
+def iter_ndjson_records(stream: TextIO) -> Iterator[ParsedRecord]:
+    for line_num, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_num, None, f"JSON inválido: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_num, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield line_num, record, None
+
+
+def iter_records(stream: TextIO, formato: str) -> Iterator[ParsedRecord]:
+    if formato == "ndjson":
+        return iter_ndjson_records(stream)
+    return iter_csv_records(stream)
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'registro'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+def _upsert_statement(db: Session, columns: FrozenSet[str]):
+    stmt = dialect_insert(db.get_bind())(models.Product)
+    update_columns = {
+        name: stmt.excluded[name]
+        for name in schemas.ProductCreate.model_fields
+        if name in columns and name != "codigo"
+    }
+    update_columns["atualizado_em"] = func.now()
+    # Nunca sobrescreve produto de outro usuário (codigo é único globalmente)
+    return stmt.on_conflict_do_update(
+        index_elements=[models.Product.codigo],
+        set_=update_columns,
+        where=models.Product.user_id == stmt.excluded.user_id,
+    )
+
+
+class ProductImporter:
+    def __init__(self, db: Session, user_id: int, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self._upserts: Dict[FrozenSet[str], object] = {}
+        self.total_rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.errors: List[Dict] = []
+
+    def _error(self, line: int, codigo: Optional[str], message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"linha": line, "codigo": codigo, "erro": message})
+
+    def _upsert(self, columns: FrozenSet[str]):
+        if columns not in self._upserts:
+            self._upserts[columns] = _upsert_statement(self.db, columns)
+        return self._upserts[columns]
+
+    def _flush(self, batch: Dict[str, BatchEntry]):
+        if not batch:
+            return
+        existing = {
+            row.codigo: row
+            for row in self.db.execute(
+                select(
+                    models.Product.id,
+                    models.Product.codigo,
+                    models.Product.user_id,
+                    models.Product.quantidade,
+                ).where(models.Product.codigo.in_(list(batch)))
+            )
+        }
+
+        # Um executemany por conjunto de colunas presentes
+        groups: Dict[FrozenSet[str], List[dict]] = {}
+        movements = []
+        for codigo, (line, payload, columns) in batch.items():
+            current = existing.get(codigo)
+            if current is None:
+                self.inserted += 1
+            elif current.user_id != self.user_id:
+                self._error(line, codigo, "Código do produto já existe.")
+                continue
+            else:
+                self.updated += 1
+                diff = (
+                    abs(payload["quantidade"] - current.quantidade)
+                    if "quantidade" in columns
+                    else 0
+                )
+                if diff:
+                    movements.append(
+                        {
+                            "user_id": self.user_id,
+                            "produto_id": current.id,
+                            "tipo": models.MovementType.ADJUST,
+                            "quantidade_alterada": diff,
+                            "quantidade_resultante": payload["quantidade"],
+                            "motivo": "Ajuste via importação de produtos",
+                        }
+                    )
+            groups.setdefault(columns, []).append({**payload, "user_id": self.user_id})
+
+        for columns, rows in groups.items():
+            self.db.execute(self._upsert(columns), rows)
+        if movements:
+            self.db.execute(insert(models.StockMovement), movements)
+        self.db.commit()
+
+    def run(self, records: Iterable[ParsedRecord]) -> Dict:
+        start = time.perf_counter()
+        batch: Dict[str, BatchEntry] = {}
+
+        for line, record, parse_error in records:
+            self.total_rows += 1
+            if parse_error:
+                self._error(line, None, parse_error)
+                continue
+            try:
+                product = schemas.ProductCreate.model_validate(record)
+            except ValidationError as e:
+                self._error(line, record.get("codigo"), _format_validation_error(e))
+                continue
+
+            payload = product.model_dump()
+            columns = frozenset(product.model_fields_set)
+            previous = batch.get(product.codigo)
+            if previous is not None:
+                # Código repetido no lote: mescla na última ocorrência, que prevalece
+                # nas colunas que as duas trazem (contado uma vez só no _flush)
+                self.duplicates += 1
+                _, previous_payload, previous_columns = previous
+                payload.update(
+                    {name: previous_payload[name] for name in previous_columns - columns}
+                )
+                columns |= previous_columns
+            batch[product.codigo] = (line, payload, columns)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = {}
+
+        self._flush(batch)
+
+        return {
+            "total_rows": self.total_rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "elapsed_seconds": round(time.perf_counter() - start, 3),
+        }
+
+
+def import_products(db: Session, user_id: int, stream: TextIO, formato: str) -> Dict:
+    """Stream-parse and upsert products for a user; returns per-row errors."""
+    try:
+        return ProductImporter(db, user_id).run(iter_records(stream, formato))
+    except Exception:
+        db.rollback()
+        raise
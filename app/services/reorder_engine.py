@@ -0,0 +1,352 @@
+"""
+Motor de reposição orientado por demanda.
+
+1. `refresh_forecasts` recalcula, para o catálogo inteiro do tenant, a demanda
+   diária média e o desvio padrão das vendas concluídas na janela
+   `FORECAST_WINDOW_DAYS` (uma consulta agregada + pandas) e grava em
+   `demand_forecasts`.
+2. `build_reorder_plan` calcula, de forma vetorizada, o ponto de pedido e a
+   quantidade a pedir de cada produto:
+
+       estoque_seguranca = max(safety_stock, Z * desvio * sqrt(lead_time))
+       ponto_pedido      = max(demanda * lead_time + estoque_seguranca, estoque_minimo)
+       lote_economico    = sqrt(2 * demanda_anual * ORDER_COST / (preco * HOLDING_COST_RATE))
+
+   A posição de estoque considera o que já está em pedidos pendentes/aprovados.
+   Produtos sem histórico de vendas mantêm a regra antiga (repor até 2x o
+   estoque mínimo).
+3. `generate_draft_orders` agrupa as linhas em um pedido DRAFT por fornecedor,
+   reaproveitando o rascunho automático anterior, para poder rodar a cada hora.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+    import pandas as pd
+
+    ENGINE_AVAILABLE = True
+except ImportError:
+    ENGINE_AVAILABLE = False
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from ..database import dialect_insert
+from ..models import (
+    DemandForecast,
+    Product,
+    PurchaseOrder,
+    PurchaseOrderItem,
+    PurchaseOrderStatus,
+    Sale,
+    SaleItem,
+    SaleItemSummary,
+    SaleStatus,
+)
+
+FORECAST_WINDOW_DAYS = 90
+FORECAST_MAX_AGE = timedelta(hours=1)
+SERVICE_LEVEL_Z = 1.65  # ~95% de nível de serviço
+ORDER_COST = 50.0  # custo fixo por pedido (R$)
+HOLDING_COST_RATE = 0.25  # custo anual de manter estoque, fração do preço
+DEFAULT_LEAD_TIME_DAYS = 7
+AUTO_ORDER_NOTE = "Auto-generated purchase order (reorder engine)"
+
+PLAN_COLUMNS = [
+    "produto_id",
+    "codigo",
+    "nome",
+    "fornecedor_id",
+    "quantidade",
+    "preco",
+    "estoque_minimo",
+    "lead_time_days",
+    "safety_stock",
+    "demanda_diaria",
+    "desvio_diario",
+    "em_pedido",
+]
+
+
+def refresh_forecasts(db: Session, user_id: int, window_days: int = FORECAST_WINDOW_DAYS) -> int:
+    """Recompute and upsert the daily demand forecast of every product of a user."""
+    start = datetime.now() - timedelta(days=window_days)
+    dia = func.date(Sale.criado_em)
+    live = (
+        select(SaleItem.produto_id, dia, func.sum(SaleItem.quantidade))
+        .join(Sale, SaleItem.sale_id == Sale.id)
+        .where(
+            Sale.user_id == user_id,
+            Sale.criado_em >= start,
+            Sale.status == SaleStatus.COMPLETED,
+        )
+        .group_by(SaleItem.produto_id, dia)
+    )
+    archived = (
+        select(
+            SaleItemSummary.produto_id, SaleItemSummary.data, func.sum(SaleItemSummary.quantidade)
+        )
+        .where(
+            SaleItemSummary.user_id == user_id,
+            SaleItemSummary.data > start.date(),
+            SaleItemSummary.status == SaleStatus.COMPLETED,
+        )
+        .group_by(SaleItemSummary.produto_id, SaleItemSummary.data)
+    )
+    daily = pd.DataFrame(
+        [*db.execute(live), *db.execute(archived)], columns=["produto_id", "data", "quantidade"]
+    )
+    product_ids = db.scalars(select(Product.id).where(Product.user_id == user_id)).all()
+    if not product_ids:
+        return 0
+
+    daily["data"] = daily["data"].astype(str)
+    daily = daily.groupby(["produto_id", "data"], as_index=False)["quantidade"].sum()
+    daily["quadrado"] = daily["quantidade"].astype(float) ** 2
+    stats = (
+        daily.groupby("produto_id")
+        .agg(total=("quantidade", "sum"), total_sq=("quadrado", "sum"), dias=("data", "count"))
+        .reindex(product_ids, fill_value=0)
+    )
+
+    # Dias sem venda contam como demanda zero
+    mean = stats["total"].astype(float) / window_days
+    variance = (stats["total_sq"].astype(float) / window_days - mean**2).clip(lower=0)
+    std = np.sqrt(variance * window_days / max(window_days - 1, 1))
+
+    # Horário local do Python (func.now() no SQLite é UTC) para comparar com FORECAST_MAX_AGE
+    refreshed_at = datetime.now()
+    rows = [
+        {
+            "user_id": user_id,
+            "produto_id": int(produto_id),
+            "demanda_diaria": float(demanda),
+            "desvio_diario": float(desvio),
+            "dias_com_venda": int(dias),
+            "janela_dias": window_days,
+            "atualizado_em": refreshed_at,
+        }
+        for produto_id, demanda, desvio, dias in zip(stats.index, mean, std, stats["dias"])
+    ]
+    stmt = dialect_insert(db.get_bind())(DemandForecast)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DemandForecast.produto_id],
+        set_={
+            "demanda_diaria": stmt.excluded.demanda_diaria,
+            "desvio_diario": stmt.excluded.desvio_diario,
+            "dias_com_venda": stmt.excluded.dias_com_venda,
+            "janela_dias": stmt.excluded.janela_dias,
+            "atualizado_em": stmt.excluded.atualizado_em,
+        },
+    )
+    for i in range(0, len(rows), 1000):
+        db.execute(stmt, rows[i : i + 1000])
+    db.commit()
+    return len(rows)
+
+
+def refresh_forecasts_if_stale(db: Session, user_id: int) -> bool:
+    """Refresh when a product has no forecast or the oldest one is past FORECAST_MAX_AGE."""
+    oldest, forecasts = db.execute(
+        select(func.min(DemandForecast.atualizado_em), func.count(DemandForecast.id)).where(
+            DemandForecast.user_id == user_id
+        )
+    ).one()
+    products = db.scalar(select(func.count(Product.id)).where(Product.user_id == user_id))
+    if (
+        oldest is not None
+        and forecasts >= products
+        and datetime.now() - oldest.replace(tzinfo=None) < FORECAST_MAX_AGE
+    ):
+        return False
+    refresh_forecasts(db, user_id)
+    return True
+
+
+def _on_order_subquery(user_id: int):
+    """Quantities still to arrive from pending/approved purchase orders, per product."""
+    pendente = PurchaseOrderItem.quantidade_solicitada - func.coalesce(
+        PurchaseOrderItem.quantidade_recebida, 0
+    )
+    return (
+        select(
+            PurchaseOrderItem.produto_id,
+            func.sum(case((pendente > 0, pendente), else_=0)).label("em_pedido"),
+        )
+        .join(PurchaseOrder, PurchaseOrderItem.purchase_order_id == PurchaseOrder.id)
+        .where(
+            PurchaseOrder.user_id == user_id,
+            PurchaseOrder.status.in_(
+                [PurchaseOrderStatus.PENDING_APPROVAL, PurchaseOrderStatus.APPROVED]
+            ),
+        )
+        .group_by(PurchaseOrderItem.produto_id)
+        .subquery()
+    )
+
+
+def build_reorder_plan(
+    db: Session, user_id: int, fornecedor_ids: Optional[Iterable[int]] = None
+) -> "pd.DataFrame":
+    """One row per product with reorder point, EOQ and the quantity to order now."""
+    on_order = _on_order_subquery(user_id)
+    stmt = (
+        select(
+            Product.id,
+            Product.codigo,
+            Product.nome,
+            Product.fornecedor_id,
+            Product.quantidade,
+            Product.preco,
+            Product.estoque_minimo,
+            Product.lead_time_days,
+            Product.safety_stock,
+            DemandForecast.demanda_diaria,
+            DemandForecast.desvio_diario,
+            on_order.c.em_pedido,
+        )
+        .outerjoin(DemandForecast, DemandForecast.produto_id == Product.id)
+        .outerjoin(on_order, on_order.c.produto_id == Product.id)
+        .where(Product.user_id == user_id)
+        .order_by(Product.id)
+    )
+    if fornecedor_ids is not None:
+        stmt = stmt.where(Product.fornecedor_id.in_(list(fornecedor_ids)))
+    plan = pd.DataFrame(db.execute(stmt).all(), columns=PLAN_COLUMNS)
+    if plan.empty:
+        return plan.assign(
+            estoque_seguranca=[], ponto_pedido=[], lote_economico=[], quantidade_pedido=[]
+        )
+
+    # Colunas só com NULL chegam como object
+    numeric = ["demanda_diaria", "desvio_diario", "em_pedido", "lead_time_days", "safety_stock"]
+    plan[numeric] = plan[numeric].apply(pd.to_numeric)
+
+    demanda = plan["demanda_diaria"].fillna(0.0).astype(float)
+    desvio = plan["desvio_diario"].fillna(0.0).astype(float)
+    lead_time = plan["lead_time_days"].fillna(DEFAULT_LEAD_TIME_DAYS).clip(lower=1)
+    estoque_minimo = plan["estoque_minimo"].fillna(0).astype(float)
+    preco = plan["preco"].fillna(0.0).astype(float)
+    posicao = plan["quantidade"] + plan["em_pedido"].fillna(0)
+
+    seguranca = np.maximum(
+        plan["safety_stock"].fillna(0).astype(float), SERVICE_LEVEL_Z * desvio * np.sqrt(lead_time)
+    )
+    com_demanda = demanda > 0
+    ponto_pedido = np.where(
+        com_demanda,
+        np.maximum(demanda * lead_time + seguranca, estoque_minimo),
+        estoque_minimo * 2,  # sem histórico: regra antiga
+    )
+    custo_manter = preco * HOLDING_COST_RATE
+    lote = np.where(
+        com_demanda & (custo_manter > 0),
+        np.sqrt(2 * demanda * 365 * ORDER_COST / custo_manter.where(custo_manter > 0, 1)),
+        0.0,
+    )
+    quantidade_pedido = np.where(
+        posicao < ponto_pedido, np.ceil(np.maximum(lote, ponto_pedido - posicao)), 0
+    )
+
+    plan["estoque_seguranca"] = np.round(seguranca, 2)
+    plan["ponto_pedido"] = np.round(ponto_pedido, 2)
+    plan["lote_economico"] = np.round(lote, 2)
+    plan["quantidade_pedido"] = quantidade_pedido.astype(int)
+    return plan
+
+
+def plan_records(plan: "pd.DataFrame", only_orders: bool = True) -> List[Dict]:
+    if only_orders:
+        plan = plan[plan["quantidade_pedido"] > 0]
+    plan = plan.astype(object).where(plan.notna(), None)
+    return plan.to_dict(orient="records")
+
+
+def generate_draft_orders(
+    db: Session, user_id: int, fornecedor_ids: Optional[Iterable[int]] = None
+) -> List[PurchaseOrder]:
+    """Create or refresh one DRAFT purchase order per supplier in a single transaction."""
+    refresh_forecasts_if_stale(db, user_id)
+    plan = build_reorder_plan(db, user_id, fornecedor_ids)
+    if plan.empty:
+        return []
+    lines = plan[(plan["quantidade_pedido"] > 0) & plan["fornecedor_id"].notna()]
+    if lines.empty:
+        return []
+
+    lines = lines.assign(
+        fornecedor_id=lines["fornecedor_id"].astype(int),
+        valor=lines["quantidade_pedido"] * lines["preco"],
+    )
+    totals = lines.groupby("fornecedor_id")["valor"].sum()
+
+    # Rascunhos automáticos anteriores são reaproveitados (itens substituídos)
+    drafts = dict(
+        db.execute(
+            select(PurchaseOrder.fornecedor_id, PurchaseOrder.id).where(
+                PurchaseOrder.user_id == user_id,
+                PurchaseOrder.status == PurchaseOrderStatus.DRAFT,
+                PurchaseOrder.observacoes == AUTO_ORDER_NOTE,
+                PurchaseOrder.fornecedor_id.in_([int(s) for s in totals.index]),
+            )
+        ).all()
+    )
+    if drafts:
+        db.execute(
+            delete(PurchaseOrderItem).where(
+                PurchaseOrderItem.purchase_order_id.in_(list(drafts.values()))
+            )
+        )
+        db.execute(
+            update(PurchaseOrder),
+            [
+                {"id": po_id, "total_value": float(totals[supplier_id])}
+                for supplier_id, po_id in drafts.items()
+            ],
+        )
+    new_orders = [
+        {
+            "user_id": user_id,
+            "fornecedor_id": int(supplier_id),
+            "status": PurchaseOrderStatus.DRAFT,
+            "total_value": float(total),
+            "observacoes": AUTO_ORDER_NOTE,
+        }
+        for supplier_id, total in totals.items()
+        if supplier_id not in drafts
+    ]
+    if new_orders:
+        created = db.execute(
+            insert(PurchaseOrder).returning(PurchaseOrder.fornecedor_id, PurchaseOrder.id),
+            new_orders,
+        )
+        drafts.update(dict(created.all()))
+
+    db.execute(
+        insert(PurchaseOrderItem),
+        [
+            {
+                "purchase_order_id": drafts[supplier_id],
+                "produto_id": int(produto_id),
+                "quantidade_solicitada": int(quantidade),
+                "preco_unitario": float(preco),
+            }
+            for supplier_id, produto_id, quantidade, preco in zip(
+                lines["fornecedor_id"],
+                lines["produto_id"],
+                lines["quantidade_pedido"],
+                lines["preco"],
+            )
+        ],
+    )
+    db.commit()
+
+    return (
+        db.query(PurchaseOrder)
+        .options(selectinload(PurchaseOrder.items))
+        .filter(PurchaseOrder.id.in_(list(drafts.values())))
+        .order_by(PurchaseOrder.fornecedor_id)
+        .all()
+    )
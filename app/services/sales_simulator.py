@@ -0,0 +1,350 @@
+"""
+Simulador de vendas executado em segundo plano.
+
+Cada execução é uma linha em `simulation_runs` e roda em uma thread própria
+(com sessões próprias) no processo que recebeu o pedido, sem tocar no event
+loop das requisições. A tabela é o estado compartilhado entre os workers do
+uvicorn:
+
+- qualquer worker lista as execuções e o progresso (`pedidos_criados`);
+- parar = marcar STOPPING; a thread dona percebe no próximo heartbeat
+  (imediatamente quando está no mesmo processo);
+- uma execução RUNNING sem heartbeat há mais de `RUN_STALE_AFTER` (processo
+  que morreu) é marcada como FAILED na próxima consulta.
+
+Um tenant pode ter até `MAX_RUNS_PER_USER` simulações simultâneas.
+"""
+
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models import (
+    Product,
+    PurchaseOrder,
+    PurchaseOrderItem,
+    PurchaseOrderStatus,
+    SimulationRun,
+    SimulationRunStatus,
+    Supplier,
+)
+
+HEARTBEAT_SECONDS = 2.0
+RUN_STALE_AFTER = timedelta(seconds=30)
+MAX_RUNS_PER_USER = 5
+CATALOG_TTL_SECONDS = 60.0
+
+ACTIVE_STATUSES = (SimulationRunStatus.RUNNING, SimulationRunStatus.STOPPING)
+
+
+def _executor_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SalesSimulator:
+    def __init__(self, user_id: int = 1):
+        self.user_id = user_id
+        self.max_pending_orders = 5  # Máximo de POs pendentes
+        self.min_interval = 10  # Intervalo mínimo entre vendas (segundos)
+        self.max_interval = 30  # Intervalo máximo entre vendas (segundos)
+        # Catálogo em cache: {fornecedor_id: [(produto_id, preco), ...]}
+        self._catalog: Dict[int, List] = {}
+        self._catalog_loaded_at = 0.0
+
+    def _load_catalog(self, db: Session):
+        if time.monotonic() - self._catalog_loaded_at < CATALOG_TTL_SECONDS:
+            return
+        rows = (
+            db.query(Product.fornecedor_id, Product.id, Product.preco)
+            .join(Supplier, Supplier.id == Product.fornecedor_id)
+            .filter(
+                Product.user_id == self.user_id,
+                Supplier.user_id == self.user_id,
+                Product.quantidade > 0,  # Apenas produtos em estoque
+            )
+            .all()
+        )
+        catalog: Dict[int, List] = {}
+        for fornecedor_id, produto_id, preco in rows:
+            catalog.setdefault(fornecedor_id, []).append((produto_id, preco))
+        self._catalog = catalog
+        self._catalog_loaded_at = time.monotonic()
+
+    def create_random_purchase_order(self, db: Session) -> Optional[PurchaseOrder]:
+        """Cria uma purchase order aleatória (fornecedor e 1-4 produtos em estoque)"""
+        self._load_catalog(db)
+        if not self._catalog:
+            return None
+
+        supplier_id = random.choice(list(self._catalog))
+        products = self._catalog[supplier_id]
+        chosen = random.sample(products, random.randint(1, min(4, len(products))))
+
+        po = PurchaseOrder(
+            user_id=self.user_id,
+            fornecedor_id=supplier_id,
+            status=PurchaseOrderStatus.PENDING_APPROVAL,
+            observacoes=f"Venda simulada - {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+        )
+        total_value = 0
+        for produto_id, preco in chosen:
+            # Quantidade aleatória entre 1 e 5
+            quantity = random.randint(1, 5)
+            po.items.append(
+                PurchaseOrderItem(
+                    produto_id=produto_id, quantidade_solicitada=quantity, preco_unitario=preco
+                )
+            )
+            total_value += quantity * preco
+        po.total_value = total_value
+        db.add(po)
+        return po
+
+    def get_pending_orders_count(self, db: Session) -> int:
+        """Conta quantas purchase orders estão pendentes"""
+        return (
+            db.query(func.count(PurchaseOrder.id))
+            .filter(
+                PurchaseOrder.user_id == self.user_id,
+                PurchaseOrder.status == PurchaseOrderStatus.PENDING_APPROVAL,
+            )
+            .scalar()
+        )
+
+    def tick(self, db: Session) -> bool:
+        """Create one order if below the pending limit; returns True when one was created."""
+        if self.get_pending_orders_count(db) >= self.max_pending_orders:
+            return False
+        po = self.create_random_purchase_order(db)
+        if po is None:
+            return False
+        db.commit()
+        return True
+
+
+class SimulationRunner:
+    """Runs one `simulation_runs` row to completion in the calling thread."""
+
+    def __init__(self, run_id: int, session_factory=SessionLocal, verbose: bool = False):
+        self.run_id = run_id
+        self.session_factory = session_factory
+        self.verbose = verbose
+        self.wake = threading.Event()
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _heartbeat(self, db: Session, created: int) -> Optional[SimulationRunStatus]:
+        """Publish progress and return the run's current status (None if it was deleted)."""
+        row = db.execute(
+            update(SimulationRun)
+            .where(SimulationRun.id == self.run_id)
+            .values(heartbeat_em=datetime.now(), pedidos_criados=created)
+            .returning(SimulationRun.status)
+        ).first()
+        db.commit()
+        return row.status if row else None
+
+    def finish(self, status: SimulationRunStatus, erro: Optional[str] = None):
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(SimulationRun)
+                .where(SimulationRun.id == self.run_id, SimulationRun.status.in_(ACTIVE_STATUSES))
+                .values(status=status, finalizado_em=datetime.now(), erro=erro)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def run(self):
+        db = self.session_factory()
+        try:
+            run = db.get(SimulationRun, self.run_id)
+            simulator = SalesSimulator(user_id=run.user_id)
+            simulator.max_pending_orders = run.max_pedidos_pendentes
+            ends_at = run.termina_em.replace(tzinfo=None)
+            created = run.pedidos_criados
+        finally:
+            db.close()
+
+        self._log(f"🚀 Simulação #{self.run_id} iniciada até {ends_at:%H:%M:%S}")
+        try:
+            next_order_at = time.monotonic()
+            while datetime.now() < ends_at:
+                db = self.session_factory()
+                try:
+                    if time.monotonic() >= next_order_at:
+                        if simulator.tick(db):
+                            created += 1
+                            self._log(f"✅ Simulação #{self.run_id}: pedido {created} criado")
+                        next_order_at = time.monotonic() + random.randint(
+                            simulator.min_interval, simulator.max_interval
+                        )
+                    status = self._heartbeat(db, created)
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+                if status != SimulationRunStatus.RUNNING:
+                    self.finish(SimulationRunStatus.STOPPED)
+                    self._log(f"🛑 Simulação #{self.run_id} parada")
+                    return
+                wait = min(HEARTBEAT_SECONDS, max(0.0, next_order_at - time.monotonic()))
+                if self.wake.wait(wait):
+                    self.wake.clear()
+            self.finish(SimulationRunStatus.FINISHED)
+            self._log(f"🏁 Simulação #{self.run_id} finalizada: {created} pedidos")
+        except Exception as e:
+            self.finish(SimulationRunStatus.FAILED, f"{type(e).__name__}: {e}"[:1000])
+            self._log(f"❌ Simulação #{self.run_id} falhou: {e}")
+
+
+class SimulationRegistry:
+    """Threads of the runs owned by this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._threads: Dict[int, threading.Thread] = {}
+        self._runners: Dict[int, SimulationRunner] = {}
+
+    def start(self, run_id: int, session_factory=SessionLocal):
+        runner = SimulationRunner(run_id, session_factory)
+        thread = threading.Thread(
+            target=self._run, args=(runner,), name=f"simulation-{run_id}", daemon=True
+        )
+        with self._lock:
+            self._threads[run_id] = thread
+            self._runners[run_id] = runner
+        thread.start()
+
+    def _run(self, runner: SimulationRunner):
+        try:
+            runner.run()
+        finally:
+            with self._lock:
+                self._threads.pop(runner.run_id, None)
+                self._runners.pop(runner.run_id, None)
+
+    def wake(self, run_ids: List[int]):
+        with self._lock:
+            for run_id in run_ids:
+                runner = self._runners.get(run_id)
+                if runner is not None:
+                    runner.wake.set()
+
+    def shutdown(self, session_factory=SessionLocal, timeout: float = 5.0):
+        """Stop this process's runs (e.g. on app shutdown)."""
+        with self._lock:
+            run_ids = list(self._threads)
+            threads = list(self._threads.values())
+        if not run_ids:
+            return
+        db = session_factory()
+        try:
+            db.execute(
+                update(SimulationRun)
+                .where(SimulationRun.id.in_(run_ids), SimulationRun.status.in_(ACTIVE_STATUSES))
+                .values(status=SimulationRunStatus.STOPPING)
+            )
+            db.commit()
+        finally:
+            db.close()
+        self.wake(run_ids)
+        for thread in threads:
+            thread.join(timeout)
+
+
+simulation_registry = SimulationRegistry()
+
+
+def mark_stale_runs(db: Session, user_id: Optional[int] = None) -> int:
+    """Fail active runs whose owner stopped sending heartbeats (process died)."""
+    now = datetime.now()
+    stmt = (
+        update(SimulationRun)
+        .where(
+            SimulationRun.status.in_(ACTIVE_STATUSES),
+            func.coalesce(SimulationRun.heartbeat_em, SimulationRun.iniciado_em)
+            < now - RUN_STALE_AFTER,
+        )
+        .values(
+            status=SimulationRunStatus.FAILED,
+            finalizado_em=now,
+            erro="Sem heartbeat: o processo da simulação foi encerrado.",
+        )
+    )
+    if user_id is not None:
+        stmt = stmt.where(SimulationRun.user_id == user_id)
+    count = db.execute(stmt).rowcount
+    db.commit()
+    return count
+
+
+def active_runs(db: Session, user_id: int) -> List[SimulationRun]:
+    mark_stale_runs(db, user_id)
+    return (
+        db.query(SimulationRun)
+        .filter(SimulationRun.user_id == user_id, SimulationRun.status.in_(ACTIVE_STATUSES))
+        .order_by(SimulationRun.id)
+        .all()
+    )
+
+
+def create_run(
+    db: Session, user_id: int, duration_minutes: int, max_pending_orders: int
+) -> SimulationRun:
+    """Insert a RUNNING row owned by this process (the caller starts the thread)."""
+    now = datetime.now()
+    run = SimulationRun(
+        user_id=user_id,
+        status=SimulationRunStatus.RUNNING,
+        duracao_minutos=duration_minutes,
+        max_pedidos_pendentes=max_pending_orders,
+        pedidos_criados=0,
+        executor=_executor_id(),
+        iniciado_em=now,
+        termina_em=now + timedelta(minutes=duration_minutes),
+        heartbeat_em=now,
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def start_run(
+    db: Session, user_id: int, duration_minutes: int, max_pending_orders: int
+) -> SimulationRun:
+    """Create a run and start it in a background thread of this process."""
+    run = create_run(db, user_id, duration_minutes, max_pending_orders)
+    simulation_registry.start(run.id)
+    return run
+
+
+def request_stop(db: Session, user_id: int, run_id: Optional[int] = None) -> List[int]:
+    """Mark the tenant's running simulations (or one of them) as STOPPING."""
+    stmt = update(SimulationRun).where(
+        SimulationRun.user_id == user_id,
+        SimulationRun.status == SimulationRunStatus.RUNNING,
+    )
+    if run_id is not None:
+        stmt = stmt.where(SimulationRun.id == run_id)
+    run_ids = list(
+        db.scalars(
+            stmt.values(status=SimulationRunStatus.STOPPING).returning(SimulationRun.id)
+        )
+    )
+    db.commit()
+    simulation_registry.wake(run_ids)
+    return run_ids
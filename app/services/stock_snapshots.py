@@ -0,0 +1,255 @@
+"""
+Snapshots diários de estoque.
+
+Cada snapshot guarda a quantidade de um produto no fim de um dia e o último
+movimento já refletido nela. O estoque em uma data qualquer é reconstruído a
+partir do snapshot mais próximo (<= data) mais os movimentos posteriores a ele,
+sem reler todo o histórico de movimentos do produto.
+
+Vendas atualizam `Product.quantidade` sem gerar movimento, então o snapshot do
+dia corrente (lido do cadastro) é a fonte mais fiel; o backfill de dias
+passados só consegue usar `quantidade_resultante` dos movimentos.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..database import dialect_insert
+from ..models import Product, StockMovement, StockMovementSummary, StockSnapshot
+
+SNAPSHOT_BATCH_SIZE = 1000
+HISTORY_DEFAULT_DAYS = 30
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def _day_end(day: date) -> datetime:
+    return _day_start(day + timedelta(days=1))
+
+
+def _as_date(value) -> date:
+    # func.date() devolve texto no SQLite e date no Postgres
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _latest_first(partition):
+    """Movements numbered newest first (by criado_em, then id) within each partition."""
+    ordem = func.row_number().over(
+        partition_by=partition,
+        order_by=(StockMovement.criado_em.desc(), StockMovement.id.desc()),
+    )
+    return select(
+        StockMovement.id,
+        StockMovement.produto_id,
+        StockMovement.quantidade_resultante,
+        partition.label("grupo"),
+        ordem.label("ordem"),
+    )
+
+
+def _last_movements(
+    db: Session, before: datetime, user_id: Optional[int]
+) -> Dict[int, Tuple[int, int]]:
+    """produto_id -> (quantidade_resultante, movimento_id) do último movimento."""
+    last = _latest_first(StockMovement.produto_id).where(StockMovement.criado_em < before)
+    if user_id is not None:
+        last = last.where(StockMovement.user_id == user_id)
+    last = last.subquery()
+    rows = db.execute(select(last).where(last.c.ordem == 1))
+    return {row.produto_id: (row.quantidade_resultante, row.id) for row in rows}
+
+
+def write_snapshots(db: Session, day: Optional[date] = None, user_id: Optional[int] = None) -> int:
+    """Upsert the end-of-day stock checkpoint of every product (optionally one tenant)."""
+    today = date.today()
+    day = day or today
+    end = _day_end(day)
+    last_movements = _last_movements(db, end, user_id)
+
+    products = select(Product.id, Product.user_id, Product.quantidade).where(
+        Product.criado_em < end
+    )
+    if user_id is not None:
+        products = products.where(Product.user_id == user_id)
+
+    moved_later = set()
+    if day < today:
+        later = select(StockMovement.produto_id).where(StockMovement.criado_em >= end).distinct()
+        if user_id is not None:
+            later = later.where(StockMovement.user_id == user_id)
+        moved_later = set(db.scalars(later))
+
+    rows = []
+    for product in db.execute(products):
+        quantidade, movimento_id = last_movements.get(product.id, (None, None))
+        if day >= today:
+            quantidade = product.quantidade
+        elif quantidade is None:
+            if product.id in moved_later:
+                # Sem movimento até o dia e com movimentos depois: quantidade desconhecida
+                continue
+            quantidade = product.quantidade
+        rows.append(
+            {
+                "user_id": product.user_id,
+                "produto_id": product.id,
+                "data": day,
+                "quantidade": quantidade,
+                "ultimo_movimento_id": movimento_id,
+            }
+        )
+
+    if rows:
+        stmt = dialect_insert(db.get_bind())(StockSnapshot)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StockSnapshot.produto_id, StockSnapshot.data],
+            set_={
+                "quantidade": stmt.excluded.quantidade,
+                "ultimo_movimento_id": stmt.excluded.ultimo_movimento_id,
+                "criado_em": func.now(),
+            },
+        )
+        for i in range(0, len(rows), SNAPSHOT_BATCH_SIZE):
+            db.execute(stmt, rows[i : i + SNAPSHOT_BATCH_SIZE])
+    db.commit()
+    return len(rows)
+
+
+def backfill_snapshots(db: Session, days: int, user_id: Optional[int] = None) -> Dict[date, int]:
+    """Write checkpoints for the last `days` days (oldest first) up to today."""
+    today = date.today()
+    return {
+        day: write_snapshots(db, day, user_id)
+        for day in (today - timedelta(days=offset) for offset in range(days, -1, -1))
+    }
+
+
+def _latest_summary(db: Session, product_id: int, day: date, after: Optional[date] = None):
+    """Latest archived daily summary with a final quantity in (`after`, `day`]."""
+    query = db.query(StockMovementSummary.quantidade_final).filter(
+        StockMovementSummary.produto_id == product_id,
+        StockMovementSummary.data <= day,
+        StockMovementSummary.quantidade_final.isnot(None),
+    )
+    if after is not None:
+        query = query.filter(StockMovementSummary.data > after)
+    return query.order_by(StockMovementSummary.data.desc()).first()
+
+
+def stock_at(db: Session, product_id: int, user_id: int, day: date) -> Dict:
+    """Stock of a product at the end of `day`: nearest checkpoint plus later movements."""
+    product = crud.get_product(db, product_id, user_id)
+    result = {"produto_id": product_id, "data": day, "snapshot_data": None}
+    if day >= date.today():
+        return {**result, "quantidade": product.quantidade, "fonte": "atual"}
+
+    snapshot = (
+        db.query(StockSnapshot)
+        .filter(StockSnapshot.produto_id == product_id, StockSnapshot.data <= day)
+        .order_by(StockSnapshot.data.desc())
+        .first()
+    )
+    # Delta limitado: só os movimentos entre o snapshot e o fim do dia pedido
+    delta = db.query(StockMovement.quantidade_resultante).filter(
+        StockMovement.produto_id == product_id, StockMovement.criado_em < _day_end(day)
+    )
+    if snapshot:
+        # Snapshot do dia corrente pode ter sido gravado antes de outros movimentos do dia
+        delta = delta.filter(
+            or_(
+                StockMovement.criado_em >= _day_end(snapshot.data),
+                and_(
+                    StockMovement.criado_em >= _day_start(snapshot.data),
+                    StockMovement.id > (snapshot.ultimo_movimento_id or 0),
+                ),
+            )
+        )
+    last = delta.order_by(StockMovement.criado_em.desc(), StockMovement.id.desc()).first()
+
+    if last is not None:
+        return {
+            **result,
+            "quantidade": last.quantidade_resultante,
+            "fonte": "snapshot+movimentos" if snapshot else "movimentos",
+            "snapshot_data": snapshot.data if snapshot else None,
+        }
+
+    # Movimentos antigos podem ter sido arquivados: o resumo diário posterior ao
+    # snapshot (ou o mais recente, sem snapshot) é mais novo que ele
+    archived = _latest_summary(db, product_id, day, after=snapshot.data if snapshot else None)
+    if archived is not None:
+        return {**result, "quantidade": archived.quantidade_final, "fonte": "arquivo"}
+    if snapshot:
+        return {
+            **result,
+            "quantidade": snapshot.quantidade,
+            "fonte": "snapshot",
+            "snapshot_data": snapshot.data,
+        }
+    return {**result, "quantidade": None, "fonte": "indisponivel"}
+
+
+def stock_history(
+    db: Session,
+    product_id: int,
+    user_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[Dict]:
+    """Daily end-of-day stock series (oldest first) from checkpoints and daily last movements."""
+    date_to = min(date_to or date.today(), date.today())
+    date_from = date_from or date_to - timedelta(days=HISTORY_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        return []
+
+    # Ponto de partida: estoque no fim do dia anterior ao intervalo
+    previous = stock_at(db, product_id, user_id, date_from - timedelta(days=1))["quantidade"]
+
+    snapshots = {
+        row.data: (row.quantidade, row.ultimo_movimento_id or 0)
+        for row in db.query(
+            StockSnapshot.data, StockSnapshot.quantidade, StockSnapshot.ultimo_movimento_id
+        ).filter(
+            StockSnapshot.produto_id == product_id,
+            StockSnapshot.data >= date_from,
+            StockSnapshot.data <= date_to,
+        )
+    }
+    last_per_day = (
+        _latest_first(func.date(StockMovement.criado_em))
+        .where(
+            StockMovement.produto_id == product_id,
+            StockMovement.criado_em >= _day_start(date_from),
+            StockMovement.criado_em < _day_end(date_to),
+        )
+        .subquery()
+    )
+    movements = {
+        _as_date(row.grupo): (row.quantidade_resultante, row.id)
+        for row in db.execute(select(last_per_day).where(last_per_day.c.ordem == 1))
+    }
+
+    today = date.today()
+    current = crud.get_product(db, product_id, user_id).quantidade
+    series = []
+    day = date_from
+    while day <= date_to:
+        if day == today:
+            quantidade = current
+        elif day in movements and movements[day][1] > snapshots.get(day, (None, 0))[1]:
+            # Movimento posterior ao snapshot do mesmo dia prevalece
+            quantidade = movements[day][0]
+        elif day in snapshots:
+            quantidade = snapshots[day][0]
+        else:
+            quantidade = previous
+        series.append({"data": day, "quantidade": quantidade})
+        previous = quantidade
+        day += timedelta(days=1)
+    return series
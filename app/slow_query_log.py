@@ -0,0 +1,189 @@
+"""
+Log de consultas lentas.
+
+Os hooks instalados no engine por `install_slow_query_log` (chamado em
+database.py) medem toda instrução, dentro ou fora de requisições. Acima de
+`SLOW_QUERY_THRESHOLD_MS` registram:
+
+- SQL, forma dos parâmetros (tipos, nunca os valores), duração e rota de origem
+  (ou `None` para workers e scripts);
+- opcionalmente o plano: `EXPLAIN QUERY PLAN` no SQLite, `EXPLAIN` no Postgres
+  (sem ANALYZE: a instrução não é executada de novo), num cursor cru da mesma
+  conexão, então os hooks não são disparados outra vez. No Postgres o EXPLAIN
+  roda dentro de um SAVEPOINT: se falhar, só ele é desfeito e a transação da
+  requisição segue válida.
+
+Cada entrada vai como uma linha JSON para `SLOW_QUERY_LOG_FILE` (com rotação)
+e para um buffer em memória exposto em `/admin/slow-queries`.
+
+Variáveis de ambiente: SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN (0/1), SLOW_QUERY_LOG
+(padrão `data/logs/slow_queries.jsonl`, dentro do volume `/app/data` dos containers).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "1").lower() in ("1", "true", "yes")
+SLOW_QUERY_LOG_FILE = os.environ.get(
+    "SLOW_QUERY_LOG", os.path.join("data", "logs", "slow_queries.jsonl")
+)
+SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+SLOW_QUERY_BUFFER_SIZE = 200
+MAX_SQL_CHARS = 4000
+
+_EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+_EXPLAINABLE = ("select", "with", "update", "delete", "insert")
+# Dialetos em que um erro aborta a transação inteira
+_EXPLAIN_SAVEPOINT = {"postgresql": "slow_query_explain"}
+
+recent: deque = deque(maxlen=SLOW_QUERY_BUFFER_SIZE)
+
+_logger = logging.getLogger(__name__)
+_logger_lock = threading.Lock()
+_file_logger: Optional[logging.Logger] = None
+
+
+def _get_file_logger() -> logging.Logger:
+    """Structured logger with its own rotating file, created on the first slow query."""
+    global _file_logger
+    with _logger_lock:
+        if _file_logger is None:
+            logger = logging.getLogger("app.slow_queries.file")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            directory = os.path.dirname(SLOW_QUERY_LOG_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(
+                SLOW_QUERY_LOG_FILE,
+                maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=SLOW_QUERY_LOG_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _file_logger = logger
+        return _file_logger
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Types of the bound parameters (values are left out of the log)."""
+    if executemany:
+        rows = list(parameters or [])
+        first = parameter_shape(rows[0]) if rows else None
+        return {"executemany": len(rows), "row": first}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def _explain(cursor, dialect: str, statement: str, parameters) -> Optional[List[str]]:
+    prefix = _EXPLAIN_PREFIX.get(dialect)
+    if prefix is None or not statement.lstrip().lower().startswith(_EXPLAINABLE):
+        return None
+    savepoint = _EXPLAIN_SAVEPOINT.get(dialect)
+    plan_cursor = cursor.connection.cursor()
+    try:
+        if savepoint:
+            plan_cursor.execute(f"SAVEPOINT {savepoint}")
+        try:
+            plan_cursor.execute(prefix + statement, parameters or ())
+            rows = plan_cursor.fetchall()
+        except Exception as e:
+            if savepoint:
+                plan_cursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            return [f"EXPLAIN falhou: {type(e).__name__}: {e}"]
+        if savepoint:
+            plan_cursor.execute(f"RELEASE SAVEPOINT {savepoint}")
+    except Exception as e:
+        # SAVEPOINT recusado (ex.: conexão em autocommit, sem transação aberta)
+        return [f"EXPLAIN falhou: {type(e).__name__}: {e}"]
+    finally:
+        plan_cursor.close()
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return [str(row[-1]) for row in rows]
+    return [str(row[0]) for row in rows]
+
+
+def _origin_route() -> Optional[str]:
+    from .instrumentation import current_stats
+
+    stats = current_stats()
+    return stats.route_key() if stats is not None else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_slow_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("_slow_query_started")
+    if not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    if elapsed_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+    try:
+        record(conn, cursor, statement, parameters, executemany, elapsed_ms)
+    except Exception as e:  # o log nunca pode derrubar a consulta
+        _logger.warning("Falha ao registrar consulta lenta: %s", e)
+
+
+def record(conn, cursor, statement, parameters, executemany, elapsed_ms):
+    dialect = conn.dialect.name
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+        "duration_ms": round(elapsed_ms, 2),
+        "route": _origin_route(),
+        "dialect": dialect,
+        "sql": statement[:MAX_SQL_CHARS],
+        "parameters": parameter_shape(parameters, executemany),
+        "plan": None,
+    }
+    if SLOW_QUERY_EXPLAIN and not executemany:
+        entry["plan"] = _explain(cursor, dialect, statement, parameters)
+    recent.append(entry)
+    _get_file_logger().info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def install_slow_query_log(engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def summary(entries: List[Dict]) -> List[Dict]:
+    """Group entries by statement shape: count, total and max duration, last route."""
+    from .query_budget import statement_shape
+
+    groups: Dict[str, Dict] = {}
+    for entry in entries:
+        shape = statement_shape(entry["sql"])
+        group = groups.setdefault(
+            shape, {"sql": shape, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set()}
+        )
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+        if entry["route"]:
+            group["routes"].add(entry["route"])
+    result = [
+        dict(group, total_ms=round(group["total_ms"], 2), routes=sorted(group["routes"]))
+        for group in groups.values()
+    ]
+    result.sort(key=lambda g: g["total_ms"], reverse=True)
+    return result
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Arquiva movimentos de estoque e itens de venda antigos de todos os usuários.
+
+Uso (ex.: via cron, uma vez por mês):
+    python scripts/archive_history.py
+    python scripts/archive_history.py --retention-days 180 --email admin@pc-express.com
+
+As linhas mais antigas que o horizonte vão para
+$ARCHIVE_DIR/<user_id>/<entidade>/AAAA-MM.ndjson.gz (padrão data/archive) e ficam resumidas por dia em stock_movement_daily e sale_item_daily.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, SessionLocal, engine
+from app.models import User
+from app.services.archiver import ARCHIVE_ENTITIES, ARCHIVE_RETENTION_DAYS, archive_tenant
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arquivamento de histórico antigo")
+    parser.add_argument(
+        "--retention-days",
+        type=int,
+        default=ARCHIVE_RETENTION_DAYS,
+        help=f"Dias mantidos nas tabelas (padrão: {ARCHIVE_RETENTION_DAYS})",
+    )
+    parser.add_argument("--email", help="Arquiva apenas este usuário")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        query = db.query(User)
+        if args.email:
+            query = query.filter(User.email == args.email)
+        users = query.all()
+        if not users:
+            print("❌ Nenhum usuário encontrado.")
+            sys.exit(1)
+
+        for user in users:
+            start = time.perf_counter()
+            result = archive_tenant(db, user.id, args.retention_days)
+            print(f"🗄️  {user.email} (antes de {result['corte'].isoformat()}):")
+            for entity in ARCHIVE_ENTITIES:
+                print(
+                    f"   - {entity}: {result[entity]['linhas']} linhas, "
+                    f"{result[entity]['resumos']} resumos diários, "
+                    f"{len(result[entity]['arquivos'])} arquivos"
+                )
+            print(f"   ✅ {time.perf_counter() - start:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
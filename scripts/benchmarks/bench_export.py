@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark da exportação em streaming (/export/{entity}).
+
+Gera um banco temporário com N movimentos de estoque e mede o throughput
+(linhas/s) e o pico de memória ao consumir `iter_export` em CSV e NDJSON.
+
+Uso:
+    python scripts/benchmarks/bench_export.py --rows 2000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scripts.benchmarks.common import (  # noqa: E402
+    peak_rss_mb,
+    seed_movements,
+    seed_products,
+    seed_user,
+    temp_database,
+    timed,
+)
+
+from app.services.exporter import iter_export  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da exportação em streaming")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Movimentos a gerar")
+    parser.add_argument("--products", type=int, default=5_000)
+    args = parser.parse_args()
+
+    engine, Session = temp_database()
+    user_id = seed_user(engine)
+    with timed(f"seed {args.products} produtos + {args.rows} movimentos"):
+        seed_products(engine, user_id, args.products)
+        seed_movements(engine, user_id, args.rows)
+
+    baseline_rss = peak_rss_mb()
+    print(f"📦 Pico de memória após seed: {baseline_rss:.1f} MB")
+
+    for formato in ("csv", "ndjson"):
+        start = time.perf_counter()
+        total_bytes = 0
+        for chunk in iter_export(Session, "movements", formato, user_id):
+            total_bytes += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(
+            f"✅ movements/{formato}: {args.rows / elapsed:,.0f} linhas/s "
+            f"({elapsed:.2f}s, {total_bytes / 1024 / 1024:.1f} MB, "
+            f"pico de memória {peak_rss_mb():.1f} MB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark do /auto-restock/restock-all.
+
+Compara, em bancos temporários idênticos, o laço ORM original (um
+StockMovement por produto via unit of work) com `crud.restock_all`
+(INSERT ... SELECT RETURNING + um único UPDATE RETURNING).
+
+Uso:
+    python scripts/benchmarks/bench_restock.py --products 50000
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scripts.benchmarks.common import seed_products, seed_user, temp_database, timed  # noqa: E402
+
+from app import crud  # noqa: E402
+from app.models import MovementType, Product, StockMovement  # noqa: E402
+
+
+def legacy_restock_all(db, user_id: int) -> int:
+    """Implementação anterior (laço ORM), mantida aqui só para comparação."""
+    restocked = 0
+    for product in db.query(Product).filter(Product.user_id == user_id).all():
+        recommended_stock = product.estoque_minimo * 2
+        current_stock = product.quantidade
+        if current_stock < recommended_stock:
+            product.quantidade = recommended_stock
+            db.add(
+                StockMovement(
+                    user_id=user_id,
+                    produto_id=product.id,
+                    tipo=MovementType.IN,
+                    quantidade_alterada=recommended_stock - current_stock,
+                    quantidade_resultante=recommended_stock,
+                    motivo=f"Auto-restock: Reposição automática para {recommended_stock} unidades",
+                )
+            )
+            restocked += 1
+    db.commit()
+    return restocked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do restock-all")
+    parser.add_argument("--products", type=int, default=50_000, help="SKUs do tenant")
+    args = parser.parse_args()
+
+    results = {}
+    restocked = {}
+    for label, run in (("legado (ORM)", legacy_restock_all), ("set-based", None)):
+        engine, Session = temp_database()
+        user_id = seed_user(engine)
+        seed_products(engine, user_id, args.products)
+        db = Session()
+        try:
+            with timed(f"restock-all {label} ({args.products} SKUs)", results):
+                if run is None:
+                    restocked[label] = crud.restock_all(db, user_id)["products_restocked"]
+                else:
+                    restocked[label] = run(db, user_id)
+        finally:
+            db.close()
+            engine.dispose()
+
+    legacy, bulk = results.values()
+    print(f"✅ {restocked['set-based']} produtos repostos; {legacy / bulk:.1f}x mais rápido")
+    if len(set(restocked.values())) != 1:
+        print(f"⚠️  Resultados divergentes: {restocked}")
+
+
+if __name__ == "__main__":
+    main()
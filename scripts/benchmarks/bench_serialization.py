@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização das listagens (/products, /purchase-orders, /sales).
+
+Gera um banco temporário e mede, por entidade, quantos registros por segundo
+cada caminho leva do banco aos bytes da resposta:
+
+    orm + pydantic + json      objetos ORM validados pelo response_model
+                               (from_attributes) e codificados com o json da stdlib
+    projeção + pydantic + orjson
+                               linhas projetadas do SQL, ainda validadas pelo
+                               response_model, codificadas pela DefaultJSONResponse
+    projeção + fast_json       linhas projetadas entregues direto à resposta orjson
+                               (o caminho atual das listagens)
+
+Cada caminho roda numa sessão nova (sem identity map aquecido); o tempo é
+dividido em consulta e serialização.
+
+Uso:
+    python scripts/benchmarks/bench_serialization.py --products 20000 --orders 5000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scripts.benchmarks.common import (  # noqa: E402
+    seed_products,
+    seed_purchase_orders,
+    seed_sales,
+    seed_user,
+    temp_database,
+    timed,
+)
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app import crud, schemas  # noqa: E402
+from app.responses import ORJSON_AVAILABLE, DefaultJSONResponse, fast_json  # noqa: E402
+
+
+def _stdlib_render(content) -> bytes:
+    # Mesma codificação do JSONResponse do Starlette
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _orm_sales(db, user_id: int, limit: int):
+    """ORM path for /sales: SaleOut needs item product name/code, so items are
+    expanded the way get_sale_with_details does it."""
+    sales = crud.get_sales(db, user_id, limit)
+    return [
+        {
+            "id": sale.id,
+            "total_value": sale.total_value,
+            "status": sale.status,
+            "criado_em": sale.criado_em,
+            "items": [
+                {
+                    "id": item.id,
+                    "produto_id": item.produto_id,
+                    "quantidade": item.quantidade,
+                    "preco_unitario": item.preco_unitario,
+                    "preco_total": item.preco_total,
+                    "criado_em": item.criado_em,
+                    "produto_nome": item.produto.nome,
+                    "produto_codigo": item.produto.codigo,
+                }
+                for item in sale.items
+            ],
+        }
+        for sale in sales
+    ]
+
+
+def build_cases(user_id: int, sales_limit: int) -> List[tuple]:
+    """(entity, response_model, orm_fetch, rows_fetch) for each list endpoint."""
+    return [
+        (
+            "products",
+            List[schemas.Product],
+            lambda db: crud.list_products(db, user_id),
+            lambda db: crud.list_products_rows(db, user_id),
+        ),
+        (
+            "purchase_orders",
+            List[schemas.PurchaseOrder],
+            lambda db: crud.list_purchase_orders(db, user_id),
+            lambda db: crud.list_purchase_orders_rows(db, user_id),
+        ),
+        (
+            "sales",
+            List[schemas.SaleOut],
+            lambda db: _orm_sales(db, user_id, sales_limit),
+            lambda db: crud.get_sales_rows(db, user_id, sales_limit),
+        ),
+    ]
+
+
+def measure(Session, fetch, serialize, repeat: int):
+    """Median fetch and serialize seconds plus row and byte counts of the last run."""
+    fetch_times, serialize_times = [], []
+    rows, body = [], b""
+    for _ in range(repeat):
+        db = Session()
+        try:
+            start = time.perf_counter()
+            rows = fetch(db)
+            fetched = time.perf_counter()
+            # Relações lazy (itens das listas ORM) são carregadas durante a validação
+            body = serialize(rows)
+            done = time.perf_counter()
+        finally:
+            db.close()
+        fetch_times.append(fetched - start)
+        serialize_times.append(done - fetched)
+    return statistics.median(fetch_times), statistics.median(serialize_times), len(rows), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da serialização das listagens")
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--orders", type=int, default=5_000, help="Pedidos de compra a gerar")
+    parser.add_argument("--sales", type=int, default=5_000, help="Vendas a gerar")
+    parser.add_argument("--items", type=int, default=3, help="Itens por pedido/venda")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine, Session = temp_database()
+    user_id = seed_user(engine)
+    with timed(f"seed {args.products} produtos, {args.orders} pedidos, {args.sales} vendas"):
+        seed_products(engine, user_id, args.products)
+        seed_purchase_orders(engine, user_id, args.orders, args.items)
+        seed_sales(engine, user_id, args.sales, args.items)
+    if not ORJSON_AVAILABLE:
+        print("⚠️  orjson não instalado: fast_json e DefaultJSONResponse usam o json da stdlib")
+
+    for entity, model, orm_fetch, rows_fetch in build_cases(user_id, args.sales):
+        adapter = TypeAdapter(model)
+        paths = [
+            (
+                "orm + pydantic + json",
+                orm_fetch,
+                lambda rows: _stdlib_render(
+                    adapter.dump_python(
+                        adapter.validate_python(rows, from_attributes=True), mode="json"
+                    )
+                ),
+            ),
+            (
+                "projeção + pydantic + orjson",
+                rows_fetch,
+                lambda rows: DefaultJSONResponse(
+                    adapter.dump_python(adapter.validate_python(rows), mode="json")
+                ).body,
+            ),
+            ("projeção + fast_json", rows_fetch, lambda rows: fast_json(rows).body),
+        ]
+        print(f"\n📦 {entity}")
+        baseline = None
+        for label, fetch, serialize in paths:
+            fetch_s, serialize_s, count, body = measure(Session, fetch, serialize, args.repeat)
+            total = fetch_s + serialize_s
+            baseline = baseline or total
+            print(
+                f"✅ {label:<30} {count / total:>10,.0f} registros/s "
+                f"(consulta {fetch_s * 1000:7.1f} ms, "
+                f"serialização {serialize_s * 1000:7.1f} ms = {count / serialize_s:>10,.0f}/s, "
+                f"{len(body) / 1024 / 1024:5.1f} MB, "
+                f"{baseline / total:4.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
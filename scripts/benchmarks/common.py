@@ -0,0 +1,224 @@
+"""
+Utilitários compartilhados pelos benchmarks.
+
+Cada benchmark roda contra um banco SQLite temporário (nunca o
+inventory.db de desenvolvimento) criado a partir de `app.models`.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import models  # noqa: E402,F401  (registra as tabelas no Base)
+from app.database import Base  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SQLITE_TIMESTAMP = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def temp_database(path: str = None):
+    """Create a fresh SQLite database with the app schema; returns (engine, Session)."""
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="pcexpress-bench-"), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def seed_user(engine, email: str = "bench@pc-express.com") -> int:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (email, hashed_password) VALUES (?, ?)", (email, "x")
+        )
+        return conn.exec_driver_sql("SELECT id FROM users WHERE email = ?", (email,)).scalar()
+
+
+def seed_products(engine, user_id: int, count: int, supplier_count: int = 10) -> None:
+    """Insert suppliers and products with executemany (deterministic values)."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO suppliers (user_id, nome) VALUES (?, ?)",
+            [(user_id, f"Fornecedor {i}") for i in range(supplier_count)],
+        )
+        supplier_ids = [
+            row[0]
+            for row in conn.exec_driver_sql(
+                "SELECT id FROM suppliers WHERE user_id = ? ORDER BY id", (user_id,)
+            )
+        ]
+        categories = ["processador", "memoria", "armazenamento", "monitor", "mouse"]
+        conn.exec_driver_sql(
+            "INSERT INTO products (user_id, codigo, nome, categoria, quantidade, preco, "
+            "fornecedor_id, estoque_minimo, lead_time_days, safety_stock) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    user_id,
+                    f"U{user_id}-SKU-{i:07d}",
+                    f"Produto {i}",
+                    categories[i % len(categories)],
+                    i % 40,
+                    50.0 + (i % 500),
+                    supplier_ids[i % len(supplier_ids)],
+                    5 + i % 10,
+                    7,
+                    2,
+                )
+                for i in range(count)
+            ],
+        )
+
+
+def seed_movements(engine, user_id: int, count: int, days: int = 365, batch: int = 50_000):
+    """Insert `count` stock movements spread over the last `days` days."""
+    with engine.begin() as conn:
+        product_ids = [
+            row[0]
+            for row in conn.exec_driver_sql(
+                "SELECT id FROM products WHERE user_id = ? ORDER BY id", (user_id,)
+            )
+        ]
+    start = datetime.now() - timedelta(days=days)
+    step = timedelta(seconds=days * 86400 / max(count, 1))
+    sql = (
+        "INSERT INTO stock_movements (user_id, produto_id, tipo, quantidade_alterada, "
+        "quantidade_resultante, motivo, criado_em) VALUES (?, ?, ?, ?, ?, ?, ?)"
+    )
+    for offset in range(0, count, batch):
+        rows = [
+            (
+                user_id,
+                product_ids[i % len(product_ids)],
+                "IN" if i % 3 == 0 else "OUT",
+                1 + i % 5,
+                10 + i % 30,
+                "Benchmark",
+                (start + step * i).strftime(SQLITE_TIMESTAMP),
+            )
+            for i in range(offset, min(offset + batch, count))
+        ]
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql, rows)
+
+
+def _products_with_prices(conn, user_id: int) -> list:
+    return conn.exec_driver_sql(
+        "SELECT id, fornecedor_id, preco FROM products WHERE user_id = ? ORDER BY id", (user_id,)
+    ).all()
+
+
+def _next_id(conn, table: str) -> int:
+    return conn.exec_driver_sql(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").scalar()
+
+
+def seed_purchase_orders(
+    engine, user_id: int, count: int, items_per_order: int = 3, days: int = 90
+) -> None:
+    """Insert `count` purchase orders in mixed statuses, each with `items_per_order` lines."""
+    statuses = ["DRAFT", "PENDING_APPROVAL", "APPROVED", "APPROVED"]
+    start = datetime.now() - timedelta(days=days)
+    step = timedelta(seconds=days * 86400 / max(count, 1))
+    with engine.begin() as conn:
+        products = _products_with_prices(conn, user_id)
+        first_id = _next_id(conn, "purchase_orders")
+        orders, items = [], []
+        for i in range(count):
+            created = (start + step * i).strftime(SQLITE_TIMESTAMP)
+            lines = [
+                products[(i * items_per_order + j) % len(products)]
+                for j in range(items_per_order)
+            ]
+            orders.append(
+                (
+                    first_id + i,
+                    user_id,
+                    lines[0][1],
+                    statuses[i % len(statuses)],
+                    sum(5 * preco for _, _, preco in lines),
+                    "Benchmark",
+                    created,
+                )
+            )
+            items.extend(
+                (first_id + i, product_id, 5, 0, preco, created)
+                for product_id, _, preco in lines
+            )
+        conn.exec_driver_sql(
+            "INSERT INTO purchase_orders (id, user_id, fornecedor_id, status, total_value, "
+            "observacoes, criado_em) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            orders,
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO purchase_order_items (purchase_order_id, produto_id, "
+            "quantidade_solicitada, quantidade_recebida, preco_unitario, criado_em) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            items,
+        )
+
+
+def seed_sales(engine, user_id: int, count: int, items_per_sale: int = 3, days: int = 90) -> None:
+    """Insert `count` completed sales, each with `items_per_sale` lines."""
+    start = datetime.now() - timedelta(days=days)
+    step = timedelta(seconds=days * 86400 / max(count, 1))
+    with engine.begin() as conn:
+        products = _products_with_prices(conn, user_id)
+        first_id = _next_id(conn, "sales")
+        sales, items = [], []
+        for i in range(count):
+            created = (start + step * i).strftime(SQLITE_TIMESTAMP)
+            lines = [products[(i * 7 + j) % len(products)] for j in range(items_per_sale)]
+            sales.append((first_id + i, user_id, sum(p for _, _, p in lines), "COMPLETED", created))
+            items.extend(
+                (first_id + i, product_id, 1, preco, preco, created)
+                for product_id, _, preco in lines
+            )
+        conn.exec_driver_sql(
+            "INSERT INTO sales (id, user_id, total_value, status, criado_em) "
+            "VALUES (?, ?, ?, ?, ?)",
+            sales,
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO sale_items (sale_id, produto_id, quantidade, preco_unitario, "
+            "preco_total, criado_em) VALUES (?, ?, ?, ?, ?, ?)",
+            items,
+        )
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB (0 when unavailable)."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 if sys.platform != "darwin" else usage / (1024 * 1024)
+
+
+@contextmanager
+def timed(label: str, results: dict = None):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    if results is not None:
+        results[label] = elapsed
+    print(f"⏱️  {label}: {elapsed:.3f}s")
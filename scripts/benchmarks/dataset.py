@@ -0,0 +1,74 @@
+"""
+Conjuntos de dados determinísticos para a suíte de benchmarks.
+
+Cada escala gera, num banco SQLite novo com o schema de `app.models`, sempre
+os mesmos fornecedores, produtos e movimentos (common.py) e o mesmo histórico
+de vendas (`CashFlowSimulator.generate_bulk_history` com semente fixa). As
+datas são relativas ao dia da execução.
+
+Com `cache_dir`, o banco de cada (escala, semente) é gerado uma vez e copiado
+para o caminho de trabalho nas execuções seguintes.
+"""
+
+import os
+import shutil
+import time
+
+from scripts.benchmarks.common import seed_movements, seed_products, seed_user, temp_database
+
+from app.services.cash_flow_simulator import CashFlowSimulator
+
+BENCH_EMAIL = "bench@pc-express.com"
+
+SCALES = {
+    "small": {"products": 200, "suppliers": 5, "days": 90, "movements": 5_000},
+    "medium": {"products": 2_000, "suppliers": 20, "days": 180, "movements": 100_000},
+    "large": {"products": 20_000, "suppliers": 50, "days": 365, "movements": 1_000_000},
+}
+
+
+def _generate(path: str, scale: str, seed: int) -> dict:
+    spec = SCALES[scale]
+    started = time.perf_counter()
+    engine, Session = temp_database(path)
+    try:
+        user_id = seed_user(engine, BENCH_EMAIL)
+        seed_products(engine, user_id, spec["products"], spec["suppliers"])
+        seed_movements(engine, user_id, spec["movements"], spec["days"])
+        db = Session()
+        try:
+            history = CashFlowSimulator(db).generate_bulk_history(
+                days_back=spec["days"], user_id=user_id, seed=seed
+            )
+        finally:
+            db.close()
+    finally:
+        engine.dispose()
+    return {
+        "scale": scale,
+        "seed": seed,
+        **spec,
+        "sales": history["vendas"],
+        "generated_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def build_dataset(path: str, scale: str, seed: int = 42, cache_dir: str = None) -> dict:
+    """Create the dataset at `path` (reusing a cached copy when available)."""
+    if scale not in SCALES:
+        raise ValueError(f"Escala desconhecida: {scale} (use {', '.join(SCALES)})")
+    if cache_dir is None:
+        return _generate(path, scale, seed)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cached = os.path.join(cache_dir, f"{scale}-{seed}.db")
+    info = {"scale": scale, "seed": seed, **SCALES[scale], "cached": True}
+    if not os.path.exists(cached):
+        info = _generate(cached, scale, seed)
+        # Consolida o WAL no arquivo principal antes de copiar
+        engine, _ = temp_database(cached)
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        engine.dispose()
+    shutil.copyfile(cached, path)
+    return info
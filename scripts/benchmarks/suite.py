@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Suíte de benchmarks dos caminhos quentes da API.
+
+Gera (ou reaproveita) um conjunto de dados determinístico (dataset.py) e
+executa cada caso contra a aplicação real num banco temporário
+(`DATABASE_URL`): endpoints via TestClient, incluindo validação e
+serialização, e os métodos do `MLPredictor` chamados direto com o cache de
+resultados limpo a cada execução. Cada caso registra min/mediana/p95/média e
+o número de instruções SQL da última execução.
+
+Uso:
+    python scripts/benchmarks/suite.py --scale small --output baseline.json
+    python scripts/benchmarks/suite.py --scale small --compare baseline.json
+    python scripts/benchmarks/suite.py --scale medium --only ml. --cache-dir .bench-cache
+
+No modo --compare, um caso regride quando a mediana piora mais que
+--threshold (relativo) e --min-delta-ms (absoluto), ou quando passa a
+executar mais instruções SQL; o código de saída é 1 se houver regressão.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT_DIR)
+
+# O engine da aplicação é criado na importação: aponte-o para o banco temporário antes
+BENCH_DIR = tempfile.mkdtemp(prefix="pcexpress-suite-")
+BENCH_DB = os.path.join(BENCH_DIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{BENCH_DB}"
+os.environ.setdefault("SLOW_QUERY_LOG", os.path.join(BENCH_DIR, "slow_queries.jsonl"))
+
+from scripts.benchmarks.dataset import BENCH_EMAIL, SCALES, build_dataset  # noqa: E402
+
+DEFAULT_REPEAT = 15
+DEFAULT_WARMUP = 2
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_MIN_DELTA_MS = 1.0
+ML_REPEAT_DIVISOR = 3  # métodos de ML são bem mais lentos: menos repetições
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Context:
+    """Application objects and deterministic fixtures shared by the cases."""
+
+    def __init__(self, seed: int):
+        from fastapi.testclient import TestClient
+        from sqlalchemy import func
+
+        from app.auth import create_access_token
+        from app.database import SessionLocal, engine
+        from app.main import app
+        from app.models import Product, SaleItem, Supplier, User
+
+        self.engine = engine
+        self.Session = SessionLocal
+        self.client = TestClient(app)
+        self.client.headers["Authorization"] = "Bearer " + create_access_token(
+            {"sub": BENCH_EMAIL}, timedelta(hours=12)
+        )
+        self.counter = seed  # usado para variar quantidades de forma reprodutível
+
+        db = SessionLocal()
+        try:
+            self.user_id = db.query(User.id).filter(User.email == BENCH_EMAIL).scalar()
+            self.supplier_id = (
+                db.query(Supplier.id).filter(Supplier.user_id == self.user_id)
+                .order_by(Supplier.id).first()[0]
+            )
+            self.supplier_products = [
+                (product_id, preco)
+                for product_id, preco in db.query(Product.id, Product.preco)
+                .filter(Product.fornecedor_id == self.supplier_id)
+                .order_by(Product.id)
+                .limit(3)
+            ]
+            # Produto mais vendido: os métodos de ML têm histórico de verdade para processar
+            self.top_product_id = (
+                db.query(SaleItem.produto_id)
+                .group_by(SaleItem.produto_id)
+                .order_by(func.sum(SaleItem.quantidade).desc(), SaleItem.produto_id)
+                .first()[0]
+            )
+        finally:
+            db.close()
+
+    def next(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+def _ok(response, expected=200):
+    if response.status_code != expected:
+        raise RuntimeError(
+            f"{response.request.method} {response.request.url.path}: "
+            f"{response.status_code} {response.text[:200]}"
+        )
+    return response
+
+
+# Casos: (nome, função(ctx)); nomes com prefixo "ml." usam menos repetições
+def case_products_list(ctx):
+    _ok(ctx.client.get("/products"))
+
+
+def case_products_search(ctx):
+    _ok(ctx.client.get("/products", params={"nome": "Produto 12", "categoria": "memoria"}))
+
+
+def case_stock_add_remove(ctx):
+    product_id = ctx.top_product_id
+    quantity = 1 + ctx.next() % 5
+    _ok(ctx.client.post(f"/products/{product_id}/stock/add", json={"quantidade": quantity}))
+    _ok(ctx.client.post(f"/products/{product_id}/stock/remove", json={"quantidade": quantity}))
+
+
+def case_sales_create(ctx):
+    from app import crud, schemas
+
+    items = [
+        {"produto_id": product_id, "quantidade": 1, "preco_unitario": preco, "preco_total": preco}
+        for product_id, preco in ctx.supplier_products
+    ]
+    sale = schemas.SaleCreate(total_value=sum(i["preco_total"] for i in items), items=items)
+    db = ctx.Session()
+    try:
+        crud.create_sale(db, sale, ctx.user_id)
+    finally:
+        db.close()
+
+
+def case_purchase_order_lifecycle(ctx):
+    items = [
+        {"produto_id": product_id, "quantidade_solicitada": 2, "preco_unitario": preco}
+        for product_id, preco in ctx.supplier_products
+    ]
+    po = _ok(
+        ctx.client.post(
+            "/purchase-orders", json={"fornecedor_id": ctx.supplier_id, "items": items}
+        )
+    ).json()
+    _ok(ctx.client.put(f"/purchase-orders/{po['id']}", json={"status": "PENDING_APPROVAL"}))
+    _ok(ctx.client.post(f"/purchase-orders/{po['id']}/approve"))
+    receipt = [{"item_id": item["id"], "quantidade_recebida": 2} for item in po["items"]]
+    _ok(ctx.client.post(f"/purchase-orders/{po['id']}/receive", json=receipt))
+
+
+def case_insights_overview(ctx):
+    _ok(ctx.client.get("/insights/overview"))
+
+
+def case_auto_restock_analysis(ctx):
+    _ok(ctx.client.get("/auto-restock/analysis"))
+
+
+def _ml_case(method: str, with_product: bool = True):
+    def run(ctx):
+        from app.services.ml_cache import ml_result_cache
+        from app.services.ml_predictor import MLPredictor
+
+        ml_result_cache.clear()
+        db = ctx.Session()
+        try:
+            predictor = MLPredictor(db, ctx.user_id)
+            args = (ctx.top_product_id,) if with_product else ()
+            result = getattr(predictor, method)(*args)
+        finally:
+            db.close()
+        # Saída antecipada (dados insuficientes) não é erro, mas fica registrada no resultado
+        if isinstance(result, dict) and result.get("success") is False:
+            return result.get("message")
+
+    return run
+
+
+CASES = [
+    ("products.list", case_products_list),
+    ("products.search", case_products_search),
+    ("stock.add_remove", case_stock_add_remove),
+    ("sales.create", case_sales_create),
+    ("purchase_orders.lifecycle", case_purchase_order_lifecycle),
+    ("insights.overview", case_insights_overview),
+    ("auto_restock.analysis", case_auto_restock_analysis),
+    ("ml.predict_demand", _ml_case("predict_demand")),
+    ("ml.optimize_price", _ml_case("optimize_price")),
+    ("ml.detect_anomalies", _ml_case("detect_anomalies", with_product=False)),
+    ("ml.get_stock_optimization", _ml_case("get_stock_optimization")),
+    ("ml.get_product_insights_summary", _ml_case("get_product_insights_summary")),
+]
+
+
+def run_case(ctx, name, fn, repeat: int, warmup: int) -> dict:
+    from app.query_budget import count_queries
+
+    for _ in range(warmup):
+        fn(ctx)
+    timings = []
+    statements = 0
+    note = None
+    for _ in range(repeat):
+        with count_queries(ctx.engine) as log:
+            start = time.perf_counter()
+            note = fn(ctx)
+            timings.append((time.perf_counter() - start) * 1000)
+        statements = log.count
+    result = {
+        "runs": repeat,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "statements": statements,
+    }
+    if note:
+        result["note"] = note
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(args) -> dict:
+    dataset = build_dataset(BENCH_DB, args.scale, args.seed, args.cache_dir)
+    ctx = Context(args.seed)
+    results = {}
+    for name, fn in CASES:
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        repeat = args.repeat
+        if name.startswith("ml."):
+            repeat = max(3, repeat // ML_REPEAT_DIVISOR)
+        try:
+            results[name] = run_case(ctx, name, fn, repeat, args.warmup)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        _print_result(name, results[name])
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": dataset,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+
+
+def _print_result(name: str, result: dict):
+    if "error" in result:
+        print(f"❌ {name:<34} {result['error']}")
+        return
+    print(
+        f"⏱️  {name:<34} mediana {result['median_ms']:>9.2f} ms  "
+        f"p95 {result['p95_ms']:>9.2f} ms  SQL {result['statements']:>4}"
+        + (f"  ({result['note']})" if "note" in result else "")
+    )
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """Rows (name, baseline_ms, current_ms, change, status) for every case in either run."""
+    rows = []
+    base_results = baseline.get("results", {})
+    for name in sorted(set(base_results) | set(current["results"])):
+        base = base_results.get(name)
+        cur = current["results"].get(name)
+        base_ms = base.get("median_ms") if base else None
+        if cur is None:
+            rows.append((name, base_ms, None, None, "ausente"))
+            continue
+        if "error" in cur:
+            rows.append((name, base_ms, None, None, "erro"))
+            continue
+        if base_ms is None:
+            # Caso novo ou que falhou na baseline: não há com o que comparar
+            rows.append((name, None, cur["median_ms"], None, "novo"))
+            continue
+        delta = cur["median_ms"] - base["median_ms"]
+        change = delta / base["median_ms"] if base["median_ms"] else 0.0
+        if cur["statements"] > base["statements"]:
+            status = "regressão (SQL)"
+        elif change > threshold and delta > min_delta_ms:
+            status = "regressão"
+        elif change < -threshold and -delta > min_delta_ms:
+            status = "melhora"
+        else:
+            status = "ok"
+        rows.append((name, base["median_ms"], cur["median_ms"], change, status))
+    return rows
+
+
+def print_comparison(rows: list, current: dict, baseline: dict):
+    base_scale = baseline.get("meta", {}).get("dataset", {}).get("scale")
+    if base_scale != current["meta"]["dataset"]["scale"]:
+        print(f"⚠️  Baseline na escala {base_scale}, execução atual em "
+              f"{current['meta']['dataset']['scale']}: comparação pouco significativa")
+    print(f"\n{'caso':<34} {'baseline':>10} {'atual':>10} {'variação':>9}  status")
+    for name, base_ms, cur_ms, change, status in rows:
+        base_txt = f"{base_ms:.2f}" if base_ms is not None else "-"
+        cur_txt = f"{cur_ms:.2f}" if cur_ms is not None else "-"
+        change_txt = f"{change:+.1%}" if change is not None else "-"
+        print(f"{name:<34} {base_txt:>10} {cur_txt:>10} {change_txt:>9}  {status}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks da API PC-Express")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do histórico de vendas")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Execuções medidas")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument(
+        "--only", action="append", help="Prefixo de casos a executar (pode repetir)"
+    )
+    parser.add_argument("--cache-dir", help="Reaproveita os bancos gerados neste diretório")
+    parser.add_argument("--output", help="Grava o resultado em JSON neste arquivo")
+    parser.add_argument("--compare", help="Compara com um resultado JSON anterior (baseline)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    print(f"📦 Gerando conjunto '{args.scale}' em {BENCH_DIR}")
+    try:
+        current = run_suite(args)
+    finally:
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado salvo em {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if args.only:
+            baseline["results"] = {
+                name: result
+                for name, result in baseline.get("results", {}).items()
+                if any(name.startswith(prefix) for prefix in args.only)
+            }
+        rows = compare(current, baseline, args.threshold, args.min_delta_ms)
+        print_comparison(rows, current, baseline)
+        regressions = [row for row in rows if row[4].startswith("regressão") or row[4] == "erro"]
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressão(ões) em relação ao baseline")
+            return 1
+        print("\n✅ Nenhuma regressão em relação ao baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
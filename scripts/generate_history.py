@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Gera um histórico sintético de vendas (vendas, itens e movimentos de saída)
+para todos os produtos, com o gerador vetorizado do CashFlowSimulator.
+
+Útil para testar análises e benchmarks com milhões de linhas. A mesma semente
+sobre o mesmo catálogo gera o mesmo histórico.
+
+Uso:
+    python scripts/generate_history.py --email admin@pc-express.com --dias 730 --semente 42
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, SessionLocal, engine
+from app.models import User
+from app.services.cash_flow_simulator import (
+    BULK_AVAILABLE,
+    BULK_BATCH_SIZE,
+    CashFlowSimulator,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histórico sintético de vendas em massa")
+    parser.add_argument("--email", help="Gera apenas para este usuário (padrão: todos)")
+    parser.add_argument("--dias", type=int, default=365, help="Dias de histórico (padrão: 365)")
+    parser.add_argument("--semente", type=int, default=None, help="Semente para reprodução")
+    parser.add_argument(
+        "--lote", type=int, default=BULK_BATCH_SIZE, help="Linhas por executemany"
+    )
+    args = parser.parse_args()
+
+    if not BULK_AVAILABLE:
+        print("❌ numpy não instalado.")
+        sys.exit(1)
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user_id = None
+        if args.email:
+            user = db.query(User).filter(User.email == args.email).first()
+            if not user:
+                print(f"❌ Usuário {args.email} não encontrado.")
+                sys.exit(1)
+            user_id = user.id
+
+        result = CashFlowSimulator(db).generate_bulk_history(
+            args.dias, user_id, seed=args.semente, batch_size=args.lote
+        )
+        print(
+            f"✅ {result['vendas']:,} vendas ({result['vendas'] * 3:,} linhas) para "
+            f"{result['produtos']:,} produtos em {result['dias']} dias "
+            f"({result['segundos']:.2f}s)"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Importa produtos em massa a partir de um arquivo CSV ou NDJSON.
+
+Uso:
+    python scripts/import_products.py produtos.csv --email admin@pc-express.com
+    python scripts/import_products.py produtos.ndjson --formato ndjson
+
+As colunas/chaves são os campos de ProductCreate (codigo, nome, categoria,
+quantidade, preco, descricao, fornecedor_id, estoque_minimo, lead_time_days,
+safety_stock). Produtos existentes são atualizados pelo código.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, SessionLocal, engine
+from app.models import User
+from app.services.product_import import detect_format, import_products
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação em massa de produtos")
+    parser.add_argument("arquivo", help="Arquivo CSV ou NDJSON")
+    parser.add_argument("--email", help="Usuário dono dos produtos (padrão: primeiro usuário)")
+    parser.add_argument("--formato", choices=["csv", "ndjson"], help="Formato do arquivo")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        query = db.query(User)
+        if args.email:
+            query = query.filter(User.email == args.email)
+        user = query.first()
+        if not user:
+            print("❌ Usuário não encontrado. Crie um usuário primeiro.")
+            sys.exit(1)
+
+        formato = detect_format(args.arquivo, args.formato)
+        print(f"📥 Importando {args.arquivo} ({formato}) para {user.email}...")
+        with open(args.arquivo, encoding="utf-8-sig", newline="") as stream:
+            result = import_products(db, user.id, stream, formato)
+
+        print(f"✅ {result['total_rows']} linhas em {result['elapsed_seconds']}s")
+        print(f"   - Inseridos: {result['inserted']}")
+        print(f"   - Atualizados: {result['updated']}")
+        print(f"   - Com erro: {result['failed']}")
+        for error in result["errors"][:20]:
+            print(f"   ⚠️  linha {error['linha']} ({error['codigo'] or '-'}): {error['erro']}")
+        if result["failed"] > 20:
+            print(f"   ... e mais {result['failed'] - 20} erros")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga assíncrono para a API do PC-Express.
+
+Dispara sessões contra a API HTTP real com chegadas de Poisson (taxa média
+`--taxa` sessões/s), no máximo `--concorrencia` sessões simultâneas e um mix de
+tráfego configurável:
+
+    venda    - pedido DRAFT -> PENDING_APPROVAL -> aprovação (gera a venda via outbox)
+    estoque  - entrada/saída de estoque em um produto
+    pedido   - ciclo de vida completo: DRAFT -> PENDING_APPROVAL -> aprovação -> recebimento
+    leitura  - listagens e insights (produtos, pedidos, vendas, alertas, reposição)
+
+Fornecedores e produtos ficam em cache local (recarregados a cada
+`--cache-catalogo` segundos), então o gerador não consulta o catálogo a cada
+sessão. Ao final imprime, por endpoint, vazão e latência (p50/p90/p95/p99/máx);
+`--json` grava o mesmo relatório em arquivo para comparação entre execuções.
+
+A latência é medida do envio à resposta; o tempo que uma sessão esperou por
+uma vaga de concorrência aparece separado ("espera na fila"), para que a
+saturação do cliente não seja confundida com lentidão do servidor.
+
+Uso:
+    python scripts/load_generator.py --url http://localhost:8000 --taxa 50 --duracao 60
+    python scripts/load_generator.py --mix venda=50,leitura=50 --concorrencia 100 --semear 500
+    python scripts/sales_simulator.py --carga --taxa 20        # mesmo gerador
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+try:
+    import httpx
+
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+DEFAULT_MIX = {"venda": 35, "estoque": 25, "pedido": 10, "leitura": 30}
+DEFAULT_EMAIL = "carga@pc-express.com"
+DEFAULT_PASSWORD = "carga123"
+CATALOG_TTL_SECONDS = 30.0
+PERCENTILES = (50, 90, 95, 99)
+
+READ_ENDPOINTS = [
+    ("GET /products", "/products"),
+    ("GET /purchase-orders", "/purchase-orders"),
+    ("GET /purchase-orders/statistics", "/purchase-orders/statistics"),
+    ("GET /sales", "/sales"),
+    ("GET /alerts/low-stock", "/alerts/low-stock"),
+    ("GET /insights/overview", "/insights/overview"),
+    ("GET /auto-restock/analysis", "/auto-restock/analysis?limit=50"),
+]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(
+                f"Cenário desconhecido: {name} (use {', '.join(DEFAULT_MIX)})"
+            )
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("O mix precisa de ao menos um peso positivo")
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Stats:
+    """Latencies and outcomes per endpoint label."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.outcomes: Dict[str, Dict[str, int]] = {}
+        self.sessions: Dict[str, int] = {}
+        self.session_errors: Dict[str, int] = {}
+        self.queue_waits: List[float] = []
+
+    def record(self, label: str, seconds: float, outcome: str):
+        self.latencies.setdefault(label, []).append(seconds)
+        counts = self.outcomes.setdefault(label, {"2xx": 0, "4xx": 0, "5xx": 0, "erro": 0})
+        counts[outcome] += 1
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        all_latencies = []
+        for label in sorted(self.latencies):
+            values = sorted(self.latencies[label])
+            all_latencies.extend(values)
+            endpoints[label] = _summary(values, elapsed, self.outcomes[label])
+        waits = sorted(self.queue_waits)
+        totals = {"2xx": 0, "4xx": 0, "5xx": 0, "erro": 0}
+        for counts in self.outcomes.values():
+            for k in totals:
+                totals[k] += counts[k]
+        return {
+            "duracao_s": round(elapsed, 2),
+            "sessoes": dict(self.sessions),
+            "sessoes_com_falha": dict(self.session_errors),
+            "total": _summary(sorted(all_latencies), elapsed, totals),
+            "espera_fila_ms": {
+                "p50": round(percentile(waits, 50) * 1000, 1),
+                "p99": round(percentile(waits, 99) * 1000, 1),
+                "max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            },
+            "endpoints": endpoints,
+        }
+
+
+def _summary(values: List[float], elapsed: float, outcomes: Dict[str, int]) -> Dict:
+    summary = {
+        "requisicoes": len(values),
+        "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        **outcomes,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(values, pct) * 1000, 1)
+    summary["max_ms"] = round(values[-1] * 1000, 1) if values else 0.0
+    return summary
+
+
+def _outcome(status_code: int) -> str:
+    if status_code >= 500:
+        return "5xx"
+    return "4xx" if status_code >= 400 else "2xx"
+
+
+class ApiClient:
+    """Authenticated async client; logs in again once when the token expires."""
+
+    def __init__(self, http: "httpx.AsyncClient", stats: Stats, email: str, password: str):
+        self.http = http
+        self.stats = stats
+        self.email = email
+        self.password = password
+        self._login_lock = asyncio.Lock()
+        self._token_version = 0
+
+    async def login(self):
+        data = {"username": self.email, "password": self.password}
+        response = await self.http.post("/auth/token", data=data)
+        if response.status_code == 401:
+            await self.http.post(
+                "/auth/register", json={"email": self.email, "password": self.password}
+            )
+            response = await self.http.post("/auth/token", data=data)
+        response.raise_for_status()
+        self.http.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        self._token_version += 1
+
+    async def call(
+        self, label: str, method: str, url: str, **kwargs
+    ) -> Optional["httpx.Response"]:
+        """Send a request and record its latency under `label`; None on network errors."""
+        for attempt in range(2):
+            version = self._token_version
+            start = time.perf_counter()
+            try:
+                response = await self.http.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                self.stats.record(label, time.perf_counter() - start, "erro")
+                return None
+            elapsed = time.perf_counter() - start
+            if response.status_code == 401 and attempt == 0:
+                async with self._login_lock:
+                    if version == self._token_version:
+                        await self.login()
+                continue
+            self.stats.record(label, elapsed, _outcome(response.status_code))
+            return response
+        return None
+
+
+class Catalog:
+    """Suppliers and products cached for `ttl` seconds."""
+
+    def __init__(self, api: ApiClient, ttl: float = CATALOG_TTL_SECONDS):
+        self.api = api
+        self.ttl = ttl
+        self.products: List[Dict] = []
+        self.by_supplier: Dict[int, List[Dict]] = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, force: bool = False):
+        if not force and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        async with self._lock:
+            if not force and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            response = await self.api.http.get("/products")
+            response.raise_for_status()
+            self.products = response.json()
+            self.by_supplier = {}
+            for product in self.products:
+                if product.get("fornecedor_id"):
+                    self.by_supplier.setdefault(product["fornecedor_id"], []).append(product)
+            self._loaded_at = time.monotonic()
+
+    def random_order_lines(self, rng: random.Random) -> Optional[Dict]:
+        if not self.by_supplier:
+            return None
+        supplier_id = rng.choice(list(self.by_supplier))
+        products = self.by_supplier[supplier_id]
+        chosen = rng.sample(products, rng.randint(1, min(4, len(products))))
+        return {
+            "fornecedor_id": supplier_id,
+            "items": [
+                {
+                    "produto_id": p["id"],
+                    "quantidade_solicitada": rng.randint(1, 5),
+                    "preco_unitario": p["preco"],
+                }
+                for p in chosen
+            ],
+        }
+
+
+async def _submit_and_approve(api: ApiClient, po_id: int) -> bool:
+    """Move a DRAFT order to approval and approve it (orders are always created as DRAFT)."""
+    response = await api.call(
+        "PUT /purchase-orders/{id}",
+        "PUT",
+        f"/purchase-orders/{po_id}",
+        json={"status": "PENDING_APPROVAL"},
+    )
+    if response is None or response.status_code != 200:
+        return False
+    response = await api.call(
+        "POST /purchase-orders/{id}/approve", "POST", f"/purchase-orders/{po_id}/approve"
+    )
+    return response is not None and response.status_code == 200
+
+
+async def _create_order(api: ApiClient, catalog: Catalog, rng: random.Random, note: str):
+    order = catalog.random_order_lines(rng)
+    if order is None:
+        return None
+    order["observacoes"] = note
+    response = await api.call("POST /purchase-orders", "POST", "/purchase-orders", json=order)
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()
+
+
+async def scenario_venda(api: ApiClient, catalog: Catalog, rng: random.Random):
+    po = await _create_order(api, catalog, rng, "Venda simulada (gerador de carga)")
+    if po is not None:
+        await _submit_and_approve(api, po["id"])
+
+
+async def scenario_estoque(api: ApiClient, catalog: Catalog, rng: random.Random):
+    if not catalog.products:
+        return
+    product = rng.choice(catalog.products)
+    quantidade = rng.randint(1, 10)
+    if rng.random() < 0.5 and product["quantidade"] >= quantidade:
+        action = "remove"
+    else:
+        action = "add"
+    response = await api.call(
+        f"POST /products/{{id}}/stock/{action}",
+        "POST",
+        f"/products/{product['id']}/stock/{action}",
+        json={"quantidade": quantidade, "motivo": "Gerador de carga"},
+    )
+    if response is not None and response.status_code == 200:
+        # Mantém o cache aproximado para não tentar remover além do disponível
+        product["quantidade"] = response.json()["quantidade"]
+
+
+async def scenario_pedido(api: ApiClient, catalog: Catalog, rng: random.Random):
+    po = await _create_order(api, catalog, rng, "Pedido simulado (gerador de carga)")
+    if po is None or not await _submit_and_approve(api, po["id"]):
+        return
+    await api.call(
+        "POST /purchase-orders/{id}/receive",
+        "POST",
+        f"/purchase-orders/{po['id']}/receive",
+        json=[
+            {"item_id": item["id"], "quantidade_recebida": item["quantidade_solicitada"]}
+            for item in po["items"]
+        ],
+    )
+
+
+async def scenario_leitura(api: ApiClient, catalog: Catalog, rng: random.Random):
+    if catalog.products and rng.random() < 0.25:
+        product = rng.choice(catalog.products)
+        await api.call(
+            "GET /products/{id}/movements", "GET", f"/products/{product['id']}/movements"
+        )
+        return
+    label, url = rng.choice(READ_ENDPOINTS)
+    await api.call(label, "GET", url)
+
+
+SCENARIOS = {
+    "venda": scenario_venda,
+    "estoque": scenario_estoque,
+    "pedido": scenario_pedido,
+    "leitura": scenario_leitura,
+}
+
+
+async def seed_catalog(api: ApiClient, catalog: Catalog, count: int, rng: random.Random):
+    """Create suppliers and `count` products through the API when the catalogue is empty."""
+    suppliers = []
+    for i in range(3):
+        response = await api.http.post("/suppliers", json={"nome": f"Fornecedor carga {i + 1}"})
+        response.raise_for_status()
+        suppliers.append(response.json()["id"])
+    prefix = f"LG{int(time.time())}"
+    lines = [
+        json.dumps(
+            {
+                "codigo": f"{prefix}-{i:06d}",
+                "nome": f"Produto carga {i}",
+                "categoria": rng.choice(["memoria", "armazenamento", "perifericos", "video"]),
+                "quantidade": rng.randint(0, 200),
+                "preco": round(rng.uniform(20, 3000), 2),
+                "estoque_minimo": rng.randint(5, 30),
+                "fornecedor_id": suppliers[i % len(suppliers)],
+            }
+        )
+        for i in range(count)
+    ]
+    response = await api.http.post(
+        "/products/import",
+        params={"formato": "ndjson"},
+        files={"file": ("produtos.ndjson", "\n".join(lines).encode(), "application/x-ndjson")},
+    )
+    response.raise_for_status()
+    await catalog.refresh(force=True)
+
+
+async def run_load(args) -> Dict:
+    rng = random.Random(args.semente)
+    stats = Stats()
+    limits = httpx.Limits(
+        max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia
+    )
+    async with httpx.AsyncClient(
+        base_url=args.url, timeout=args.timeout, limits=limits
+    ) as http:
+        api = ApiClient(http, stats, args.email, args.senha)
+        await api.login()
+        catalog = Catalog(api, args.cache_catalogo)
+        await catalog.refresh(force=True)
+        if not catalog.products and args.semear:
+            print(f"🌱 Catálogo vazio: criando {args.semear} produtos...")
+            await seed_catalog(api, catalog, args.semear, rng)
+        if not catalog.by_supplier:
+            print("❌ Nenhum produto com fornecedor. Use --semear N ou scripts/seed.py.")
+            sys.exit(1)
+
+        names = list(args.mix)
+        weights = [args.mix[name] for name in names]
+        semaphore = asyncio.Semaphore(args.concorrencia)
+        loop = asyncio.get_running_loop()
+
+        async def session(name: str, scheduled: float):
+            async with semaphore:
+                stats.queue_waits.append(max(0.0, loop.time() - scheduled))
+                stats.sessions[name] = stats.sessions.get(name, 0) + 1
+                try:
+                    await catalog.refresh()
+                    await SCENARIOS[name](api, catalog, random.Random(rng.random()))
+                except Exception as e:  # uma sessão com falha não derruba a execução
+                    stats.session_errors[name] = stats.session_errors.get(name, 0) + 1
+                    if args.verboso:
+                        print(f"❌ {name}: {e}")
+
+        print(
+            f"🚀 {args.taxa} sessões/s por {args.duracao}s, concorrência {args.concorrencia}, "
+            f"mix {args.mix}"
+        )
+        tasks = set()
+        start = loop.time()
+        deadline = start + args.duracao
+        next_arrival = start
+        last_progress = start
+        while True:
+            next_arrival += rng.expovariate(args.taxa)
+            if next_arrival >= deadline:
+                break
+            await asyncio.sleep(max(0.0, next_arrival - loop.time()))
+            task = asyncio.create_task(session(rng.choices(names, weights)[0], next_arrival))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            if loop.time() - last_progress >= 10:
+                last_progress = loop.time()
+                done = sum(len(v) for v in stats.latencies.values())
+                print(
+                    f"   {last_progress - start:5.0f}s: {done} requisições, "
+                    f"{len(tasks)} sessões em andamento"
+                )
+        if tasks:
+            await asyncio.gather(*tasks)
+        return stats.report(loop.time() - start)
+
+
+def print_report(report: Dict):
+    header = (
+        f"{'endpoint':<40} {'req':>7} {'rps':>8} {'4xx':>5} {'5xx':>5} {'erro':>5} "
+        + " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES)
+        + f" {'máx':>8}"
+    )
+    print("=" * len(header))
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for label, s in rows:
+        print(
+            f"{label[:40]:<40} {s['requisicoes']:>7} {s['rps']:>8.2f} {s['4xx']:>5} "
+            f"{s['5xx']:>5} {s['erro']:>5} "
+            + " ".join(f"{s[f'p{p}_ms']:>8.1f}" for p in PERCENTILES)
+            + f" {s['max_ms']:>8.1f}"
+        )
+    print("=" * len(header))
+    waits = report["espera_fila_ms"]
+    print(
+        f"⏱️  {report['duracao_s']}s | sessões {report['sessoes']} | espera na fila "
+        f"p50 {waits['p50']}ms p99 {waits['p99']}ms máx {waits['max']}ms (latências em ms)"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Gerador de carga HTTP para a API")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base da API")
+    parser.add_argument("--email", default=DEFAULT_EMAIL, help="Usuário (criado se não existir)")
+    parser.add_argument("--senha", default=DEFAULT_PASSWORD)
+    parser.add_argument("--taxa", type=float, default=10.0, help="Sessões por segundo (média)")
+    parser.add_argument("--duracao", type=float, default=60.0, help="Duração em segundos")
+    parser.add_argument("--concorrencia", type=int, default=50, help="Sessões simultâneas")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=dict(DEFAULT_MIX),
+        help="Pesos dos cenários, ex.: venda=35,estoque=25,pedido=10,leitura=30",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição (s)")
+    parser.add_argument(
+        "--cache-catalogo",
+        type=float,
+        default=CATALOG_TTL_SECONDS,
+        help="Segundos entre recargas do catálogo",
+    )
+    parser.add_argument("--semear", type=int, default=0, help="Cria N produtos se não houver")
+    parser.add_argument("--semente", type=int, default=None, help="Semente para reprodução")
+    parser.add_argument("--json", help="Grava o relatório neste arquivo")
+    parser.add_argument("--verboso", action="store_true", help="Mostra erros das sessões")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    if not HTTPX_AVAILABLE:
+        print("❌ httpx não instalado (pip install httpx).")
+        sys.exit(1)
+    if args.taxa <= 0 or args.concorrencia <= 0:
+        print("❌ --taxa e --concorrencia devem ser positivos.")
+        sys.exit(1)
+
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 Relatório gravado em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Teste de carga HTTP com relatório de SLO.
+
+Sobe a aplicação (uvicorn com `--workers`) num diretório temporário contra um
+banco gerado por scripts/benchmarks/dataset.py, ou usa `--url` para testar um
+servidor já no ar (por exemplo a pilha do docker-compose atrás do nginx.conf).
+Em seguida simula usuários em etapas de concorrência crescente (`--etapas`).
+Cada usuário virtual:
+
+- faz login (POST /auth/token) e abre o Dashboard: produtos, fornecedores,
+  alertas e top produtos em paralelo, como o Dashboard.jsx;
+- faz polling de /auto-restock/analysis a cada 30 s (AutoRestock.jsx) e
+  recarrega o Dashboard a cada 5 min, revalidando com If-None-Match como o
+  cache do navegador (respostas 304 contam como sucesso);
+- entre um polling e outro, com tempo de pensamento exponencial, registra
+  vendas, movimenta estoque, repõe produtos sugeridos pela análise e recebe
+  pedidos (cenários de scripts/load_generator.py).
+
+`--acelerar` divide todos os intervalos (padrão 10: polling a cada 3 s), para
+que uma etapa de um minuto exercite o mesmo mix de uma sessão longa.
+
+Ao fim de cada etapa imprime p50/p90/p95/p99 e erros por rota e compara com os
+SLOs: `--slo-padrao` vale para toda rota e `--slo "ROTA=..."` sobrescreve uma
+rota específica. A taxa de erro considera 5xx e falhas de rede; 4xx (estoque
+insuficiente, por exemplo) aparece no relatório, mas não conta contra o SLO.
+
+Uso:
+    python scripts/load_test.py --escala small --etapas 5,10,25,50 --duracao-etapa 60
+    python scripts/load_test.py --workers 4 --slo "GET /insights/overview=p95:1500"
+    python scripts/load_test.py --url http://localhost --email admin@pc-express.com --senha ...
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from scripts.load_generator import (  # noqa: E402
+    HTTPX_AVAILABLE,
+    ApiClient,
+    Catalog,
+    Stats,
+    print_report,
+    scenario_estoque,
+    scenario_pedido,
+    scenario_venda,
+)
+
+if HTTPX_AVAILABLE:
+    import httpx
+
+DEFAULT_STAGES = "5,10,25,50"
+DEFAULT_STAGE_SECONDS = 60.0
+DEFAULT_SPEEDUP = 10.0
+DEFAULT_PASSWORD = "carga123"
+DEFAULT_SLO = "p95:800,p99:2000,erro:1"
+AUTO_RESTOCK_POLL_SECONDS = 30.0  # AutoRestock.jsx
+DASHBOARD_POLL_SECONDS = 300.0  # Dashboard.jsx
+THINK_SECONDS = 20.0  # intervalo médio entre ações de um usuário (antes de --acelerar)
+SERVER_START_TIMEOUT = 60.0
+SLO_KEYS = ("p50", "p90", "p95", "p99", "erro")
+
+# Ações entre os pollings: (nome, peso)
+ACTIONS = [("venda", 40), ("estoque", 25), ("reposicao", 20), ("pedido", 15)]
+
+
+def parse_slo_spec(value: str) -> Dict[str, float]:
+    """'p95:800,p99:2000,erro:1' -> {'p95': 800.0, 'p99': 2000.0, 'erro': 1.0}"""
+    spec = {}
+    for part in value.split(","):
+        key, _, limit = part.strip().partition(":")
+        if key not in SLO_KEYS or not limit:
+            raise argparse.ArgumentTypeError(
+                f"SLO inválido: {part!r} (use {', '.join(k + ':N' for k in SLO_KEYS)})"
+            )
+        spec[key] = float(limit)
+    return spec
+
+
+def parse_route_slo(value: str):
+    route, sep, spec = value.rpartition("=")
+    if not sep or not route.strip():
+        raise argparse.ArgumentTypeError(f"Use 'MÉTODO /rota=p95:N,...', recebido {value!r}")
+    return route.strip(), parse_slo_spec(spec)
+
+
+def parse_stages(value: str) -> List[int]:
+    try:
+        stages = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Etapas inválidas: {value!r}")
+    if not stages or min(stages) <= 0:
+        raise argparse.ArgumentTypeError("As etapas devem ser inteiros positivos")
+    return stages
+
+
+def evaluate_slos(report: Dict, default: Dict[str, float], routes: Dict) -> List[Dict]:
+    """Violations of the stage report: one entry per (route, metric) over its limit."""
+    violations = []
+    for label, summary in report["endpoints"].items():
+        spec = {**default, **routes.get(label, {})}
+        for key, limit in spec.items():
+            if key == "erro":
+                failed = summary["5xx"] + summary["erro"]
+                value = round(100 * failed / summary["requisicoes"], 2)
+            else:
+                value = summary[f"{key}_ms"]
+            if value > limit:
+                violations.append({"rota": label, "metrica": key, "valor": value, "limite": limit})
+    return violations
+
+
+class AppServer:
+    """uvicorn serving the app over a generated dataset in a temporary directory."""
+
+    def __init__(self, args):
+        self.args = args
+        self.directory = tempfile.mkdtemp(prefix="pcexpress-load-")
+        self.process: Optional[subprocess.Popen] = None
+        self.log = None
+        self.url = None
+        self.dataset = None
+
+    def _prepare_database(self, path: str):
+        from app.auth import get_password_hash
+        from scripts.benchmarks.dataset import BENCH_EMAIL, build_dataset
+
+        self.dataset = build_dataset(path, self.args.escala, self.args.semente, self.args.cache_dir)
+        # O usuário do conjunto é criado sem senha utilizável
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "UPDATE users SET hashed_password = ? WHERE email = ?",
+                (get_password_hash(self.args.senha), BENCH_EMAIL),
+            )
+        self.args.email = BENCH_EMAIL
+
+    def __enter__(self):
+        try:
+            self._start()
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def _start(self):
+        database = os.path.join(self.directory, "load.db")
+        print(f"📦 Gerando conjunto '{self.args.escala}' em {self.directory}")
+        self._prepare_database(database)
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        env = dict(
+            os.environ,
+            PYTHONPATH=ROOT_DIR,
+            DATABASE_URL=f"sqlite:///{database}",
+            SLOW_QUERY_LOG=os.path.join(self.directory, "slow_queries.jsonl"),
+        )
+        command = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(self.args.workers), "--log-level", "warning",
+        ]
+        self.log = open(os.path.join(self.directory, "server.log"), "wb")
+        self.process = subprocess.Popen(
+            command, cwd=self.directory, env=env, stdout=self.log, stderr=subprocess.STDOUT
+        )
+        self.url = f"http://127.0.0.1:{port}"
+        self._wait_ready()
+        print(f"🟢 API no ar em {self.url} ({self.args.workers} worker(s))")
+
+    def _wait_ready(self):
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uvicorn terminou na inicialização; veja {self.log.name}")
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.25)
+        raise RuntimeError(f"A API não respondeu em {SERVER_START_TIMEOUT:.0f}s")
+
+    def __exit__(self, *exc):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.log is not None:
+            self.log.close()
+        if self.args.manter:
+            print(f"📁 Banco e logs mantidos em {self.directory}")
+        else:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+# Usuário virtual
+async def cached_get(api: ApiClient, state: Dict, label: str, url: str):
+    """GET revalidated with If-None-Match like the browser cache (--sem-cache disables)."""
+    etags = state.setdefault("etags", {})
+    headers = {"If-None-Match": etags[url]} if url in etags else None
+    response = await api.call(label, "GET", url, headers=headers)
+    if response is not None and response.status_code == 200 and "etag" in response.headers:
+        if state.get("cache", True):
+            etags[url] = response.headers["etag"]
+    return response
+
+
+async def open_dashboard(api: ApiClient, state: Dict):
+    await asyncio.gather(
+        cached_get(api, state, "GET /products", "/products"),
+        cached_get(api, state, "GET /suppliers", "/suppliers"),
+        cached_get(api, state, "GET /alerts/low-stock", "/alerts/low-stock"),
+        cached_get(
+            api, state, "GET /sales/analytics/top-products", "/sales/analytics/top-products?limit=5"
+        ),
+    )
+
+
+async def poll_auto_restock(api: ApiClient, state: Dict):
+    response = await cached_get(
+        api, state, "GET /auto-restock/analysis", "/auto-restock/analysis"
+    )
+    # 304: a lista de sugeridos anterior continua valendo
+    if response is not None and response.status_code == 200:
+        state["sugeridos"] = [item["product"]["id"] for item in response.json()["restock_items"]]
+
+
+async def restock_suggested(api: ApiClient, state: Dict, rng: random.Random):
+    if not state.get("sugeridos"):
+        return
+    product_id = state["sugeridos"].pop(rng.randrange(len(state["sugeridos"])))
+    await api.call(
+        "POST /auto-restock/restock-product/{id}",
+        "POST",
+        f"/auto-restock/restock-product/{product_id}",
+    )
+
+
+async def virtual_user(args, stats: Stats, catalog: Catalog, seed: float, deadline: float):
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    speed = args.acelerar
+    # Usuários entram espalhados pelo início da etapa, não todos no mesmo instante
+    await asyncio.sleep(rng.uniform(0, min(AUTO_RESTOCK_POLL_SECONDS / speed, args.duracao_etapa)))
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as http:
+        api = ApiClient(http, stats, args.email, args.senha)
+        start = time.perf_counter()
+        try:
+            await api.login()
+        except httpx.HTTPError:
+            stats.record("POST /auth/token", time.perf_counter() - start, "erro")
+            return
+        stats.record("POST /auth/token", time.perf_counter() - start, "2xx")
+
+        state: Dict = {"cache": not args.sem_cache}
+        await asyncio.gather(open_dashboard(api, state), poll_auto_restock(api, state))
+        now = loop.time()
+        next_poll = now + AUTO_RESTOCK_POLL_SECONDS / speed
+        next_dashboard = now + DASHBOARD_POLL_SECONDS / speed
+        next_action = now + rng.expovariate(speed / THINK_SECONDS)
+        names = [name for name, _ in ACTIONS]
+        weights = [weight for _, weight in ACTIONS]
+        while True:
+            due = min(next_poll, next_dashboard, next_action)
+            if due >= deadline:
+                return
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            try:
+                if due == next_poll:
+                    next_poll += AUTO_RESTOCK_POLL_SECONDS / speed
+                    await poll_auto_restock(api, state)
+                elif due == next_dashboard:
+                    next_dashboard += DASHBOARD_POLL_SECONDS / speed
+                    await open_dashboard(api, state)
+                else:
+                    next_action += rng.expovariate(speed / THINK_SECONDS)
+                    action = rng.choices(names, weights)[0]
+                    stats.sessions[action] = stats.sessions.get(action, 0) + 1
+                    await catalog.refresh()
+                    if action == "reposicao":
+                        await restock_suggested(api, state, rng)
+                    elif action == "venda":
+                        await scenario_venda(api, catalog, rng)
+                    elif action == "estoque":
+                        await scenario_estoque(api, catalog, rng)
+                    else:
+                        await scenario_pedido(api, catalog, rng)
+            except Exception as e:  # uma ação com falha não encerra o usuário
+                stats.session_errors[type(e).__name__] = (
+                    stats.session_errors.get(type(e).__name__, 0) + 1
+                )
+
+
+async def run_stage(args, users: int, rng: random.Random) -> Dict:
+    stats = Stats()
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as http:
+        catalog_api = ApiClient(http, Stats(), args.email, args.senha)
+        await catalog_api.login()
+        catalog = Catalog(catalog_api)
+        await catalog.refresh(force=True)
+        if not catalog.by_supplier:
+            raise RuntimeError("Nenhum produto com fornecedor para o usuário do teste")
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + args.duracao_etapa
+        await asyncio.gather(
+            *(virtual_user(args, stats, catalog, rng.random(), deadline) for _ in range(users))
+        )
+        return stats.report(loop.time() - start)
+
+
+async def run_stages(args) -> List[Dict]:
+    rng = random.Random(args.semente)
+    default_slo = args.slo_padrao
+    route_slos = dict(args.slo or [])
+    stages = []
+    for users in args.etapas:
+        print(f"\n🚀 Etapa: {users} usuário(s) por {args.duracao_etapa:.0f}s (x{args.acelerar:g})")
+        report = await run_stage(args, users, rng)
+        violations = evaluate_slos(report, default_slo, route_slos)
+        stages.append(
+            {"usuarios": users, "ok": not violations, "violacoes": violations, "relatorio": report}
+        )
+        print_report(report)
+        for v in violations:
+            unit = "%" if v["metrica"] == "erro" else "ms"
+            print(f"❌ SLO {v['rota']}: {v['metrica']} {v['valor']}{unit} > {v['limite']}{unit}")
+        if not violations:
+            print("✅ Todos os SLOs atendidos")
+        elif not args.continuar:
+            print("⏹️  SLO violado: etapas seguintes canceladas (use --continuar para seguir)")
+            break
+    return stages
+
+
+def print_stage_summary(stages: List[Dict]):
+    print(f"\n{'usuários':>9} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'erro %':>7}  SLO")
+    for stage in stages:
+        total = stage["relatorio"]["total"]
+        failed = total["5xx"] + total["erro"]
+        error_rate = 100 * failed / total["requisicoes"] if total["requisicoes"] else 0.0
+        print(
+            f"{stage['usuarios']:>9} {total['rps']:>8.1f} {total['p50_ms']:>8.1f} "
+            f"{total['p95_ms']:>8.1f} {total['p99_ms']:>8.1f} {error_rate:>7.2f}  "
+            + ("ok" if stage["ok"] else f"{len(stage['violacoes'])} violação(ões)")
+        )
+
+
+def capacity(stages: List[Dict]) -> Optional[int]:
+    """Highest concurrency whose stage, and every stage before it, met the SLOs."""
+    best = None
+    for stage in stages:
+        if not stage["ok"]:
+            break
+        best = stage["usuarios"]
+    return best
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from scripts.benchmarks.dataset import SCALES
+
+    parser = argparse.ArgumentParser(description="Teste de carga HTTP com SLOs")
+    parser.add_argument("--url", help="Testa um servidor já no ar em vez de subir um local")
+    parser.add_argument("--email", default=None, help="Usuário (com --url)")
+    parser.add_argument("--senha", default=DEFAULT_PASSWORD)
+    parser.add_argument("--escala", choices=sorted(SCALES), default="small")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--cache-dir", help="Reaproveita os bancos gerados neste diretório")
+    parser.add_argument("--workers", type=int, default=2, help="Workers do uvicorn local")
+    parser.add_argument("--manter", action="store_true", help="Mantém banco e logs do servidor")
+    parser.add_argument(
+        "--etapas", type=parse_stages, default=parse_stages(DEFAULT_STAGES),
+        help="Usuários simultâneos por etapa, ex.: 5,10,25,50",
+    )
+    parser.add_argument("--duracao-etapa", type=float, default=DEFAULT_STAGE_SECONDS)
+    parser.add_argument(
+        "--acelerar", type=float, default=DEFAULT_SPEEDUP,
+        help="Divide os intervalos de polling e de pensamento",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por requisição (s)")
+    parser.add_argument(
+        "--sem-cache", action="store_true",
+        help="Não revalida com If-None-Match (simula navegador sem cache HTTP)",
+    )
+    parser.add_argument(
+        "--slo-padrao", type=parse_slo_spec, default=parse_slo_spec(DEFAULT_SLO),
+        help=f"SLO de toda rota (padrão {DEFAULT_SLO}; erro em %%)",
+    )
+    parser.add_argument(
+        "--slo", type=parse_route_slo, action="append",
+        help="SLO de uma rota, ex.: 'GET /insights/overview=p95:1500' (pode repetir)",
+    )
+    parser.add_argument("--continuar", action="store_true", help="Segue após violar um SLO")
+    parser.add_argument(
+        "--meta-usuarios", type=int,
+        help="Sai com código 1 se a capacidade dentro do SLO ficar abaixo deste número",
+    )
+    parser.add_argument("--json", help="Grava o relatório neste arquivo")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not HTTPX_AVAILABLE:
+        print("❌ httpx não instalado (pip install httpx).")
+        return 1
+    if args.url and not args.email:
+        print("❌ Com --url informe --email e --senha de um usuário com catálogo.")
+        return 1
+
+    server = None
+    if args.url is None:
+        with AppServer(args) as server:
+            args.url = server.url
+            stages = asyncio.run(run_stages(args))
+    else:
+        stages = asyncio.run(run_stages(args))
+
+    print_stage_summary(stages)
+    best = capacity(stages)
+    print(
+        f"\n📈 Capacidade dentro do SLO: {best} usuário(s)"
+        if best is not None
+        else "\n📉 Nenhuma etapa dentro do SLO"
+    )
+    if args.json:
+        result = {
+            "meta": {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "url": args.url if server is None else "local",
+                "workers": args.workers if server is not None else None,
+                "dataset": server.dataset if server is not None else None,
+                "duracao_etapa": args.duracao_etapa,
+                "acelerar": args.acelerar,
+            },
+            "slo": {"padrao": args.slo_padrao, "rotas": dict(args.slo or [])},
+            "capacidade": best,
+            "etapas": stages,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"📝 Relatório gravado em {args.json}")
+    if args.meta_usuarios is not None and (best or 0) < args.meta_usuarios:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Roda o motor de reposição para todos os usuários.
+
+Recalcula as previsões de demanda e gera/atualiza um pedido de compra DRAFT
+por fornecedor com os produtos abaixo do ponto de pedido.
+
+Uso (ex.: via cron, a cada hora):
+    python scripts/run_reorder_engine.py
+    python scripts/run_reorder_engine.py --email admin@pc-express.com
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, SessionLocal, engine
+from app.models import User
+from app.services import reorder_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motor de reposição (pedidos DRAFT)")
+    parser.add_argument("--email", help="Roda apenas para este usuário")
+    args = parser.parse_args()
+
+    if not reorder_engine.ENGINE_AVAILABLE:
+        print("❌ pandas/numpy não instalados.")
+        sys.exit(1)
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        query = db.query(User)
+        if args.email:
+            query = query.filter(User.email == args.email)
+        users = query.all()
+        if not users:
+            print("❌ Nenhum usuário encontrado.")
+            sys.exit(1)
+
+        start = time.perf_counter()
+        for user in users:
+            user_start = time.perf_counter()
+            forecasts = reorder_engine.refresh_forecasts(db, user.id)
+            orders = reorder_engine.generate_draft_orders(db, user.id)
+            print(
+                f"📦 {user.email}: {forecasts} previsões, {len(orders)} pedidos DRAFT, "
+                f"R$ {sum(po.total_value for po in orders):,.2f} "
+                f"({time.perf_counter() - user_start:.2f}s)"
+            )
+        print(f"✅ {len(users)} usuários em {time.perf_counter() - start:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
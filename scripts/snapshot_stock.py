@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Grava os snapshots diários de estoque de todos os usuários.
+
+Uso (ex.: via cron, uma vez por dia perto da meia-noite):
+    python scripts/snapshot_stock.py
+    python scripts/snapshot_stock.py --data 2025-01-31
+    python scripts/snapshot_stock.py --backfill-days 90
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, SessionLocal, engine, ensure_indexes
+from app.services.stock_snapshots import backfill_snapshots, write_snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshots diários de estoque")
+    parser.add_argument("--data", type=date.fromisoformat, help="Dia do snapshot (padrão: hoje)")
+    parser.add_argument(
+        "--backfill-days", type=int, default=0, help="Reconstrói também os N dias anteriores"
+    )
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        if args.backfill_days:
+            print(f"📸 Reconstruindo snapshots dos últimos {args.backfill_days} dias...")
+            written = backfill_snapshots(db, args.backfill_days)
+            total = sum(written.values())
+        else:
+            day = args.data or date.today()
+            print(f"📸 Gravando snapshots de {day.isoformat()}...")
+            total = write_snapshots(db, day)
+        print(f"✅ {total} snapshots gravados em {time.perf_counter() - start:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Configuração comum dos testes.
+
+O engine da aplicação é criado na importação de `app.database`: aponte-o para
+um banco SQLite temporário (nunca o inventory.db de desenvolvimento) antes de
+qualquer import de `app`.
+
+Uso (a partir da raiz do repositório, com pytest instalado):
+    python -m pytest tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix="pcexpress-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["SLOW_QUERY_LOG"] = os.path.join(TEST_DIR, "slow_queries.jsonl")
+
+# Fixture query_budget_guard (ver app/query_budget_plugin.py)
+pytest_plugins = ["app.query_budget_plugin"]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _remove_test_dir():
+    yield
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
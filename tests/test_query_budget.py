@@ -0,0 +1,148 @@
+"""
+Orçamento de consultas das rotas com `@query_budget` (ver app/query_budget.py).
+
+Cada requisição roda sob a fixture `query_budget_guard`, que falha o teste se
+a rota executar mais instruções SQL (ou repetir mais uma forma) do que declarou.
+Os dados têm vários itens por pedido/venda para que um N+1 apareça.
+"""
+
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud, schemas
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.main import app
+from app.models import User
+from app.query_budget import QueryBudgetExceeded, assert_query_budget
+
+EMAIL = "budget@pc-express.com"
+ITEMS = 4
+
+
+def _ok(response, expected=200):
+    assert response.status_code == expected, response.text
+    return response.json() if response.content else None
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = TestClient(app)
+    _ok(client.post("/auth/register", json={"email": EMAIL, "password": "budget123"}))
+    db = SessionLocal()
+    try:
+        user_id = db.query(User.id).filter(User.email == EMAIL).scalar()
+    finally:
+        db.close()
+    # Com "uid" as rotas @conditional_get também passam pelo ETag (caminho dos navegadores)
+    client.headers["Authorization"] = "Bearer " + create_access_token(
+        {"sub": EMAIL, "uid": user_id}, timedelta(hours=1)
+    )
+    client.user_id = user_id
+    return client
+
+
+@pytest.fixture(scope="module")
+def data(client):
+    supplier = _ok(client.post("/suppliers", json={"nome": "Fornecedor Orçamento"}))
+    products = [
+        _ok(
+            client.post(
+                "/products",
+                json={
+                    "codigo": f"BUDGET-{i}",
+                    "nome": f"Produto {i}",
+                    "quantidade": 2 + i,
+                    "preco": 10.0 + i,
+                    "estoque_minimo": 5,
+                    "fornecedor_id": supplier["id"],
+                },
+            )
+        )
+        for i in range(ITEMS + 1)
+    ]
+    db = SessionLocal()
+    try:
+        crud.create_sale(db, _sale(products), client.user_id)
+    finally:
+        db.close()
+    return {"supplier": supplier, "products": products}
+
+
+def _sale(products):
+    items = [
+        schemas.SaleItemCreate(
+            produto_id=product["id"], quantidade=1, preco_unitario=10.0, preco_total=10.0
+        )
+        for product in products
+    ]
+    return schemas.SaleCreate(total_value=10.0 * len(items), items=items)
+
+
+def _purchase_order(data):
+    return {
+        "fornecedor_id": data["supplier"]["id"],
+        "items": [
+            {"produto_id": product["id"], "quantidade_solicitada": 3, "preco_unitario": 9.0}
+            for product in data["products"][:ITEMS]
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["/products", "/purchase-orders", "/sales", "/auto-restock/analysis"],
+)
+def test_list_routes_within_budget(client, data, url, query_budget_guard):
+    _ok(client.post("/purchase-orders", json=_purchase_order(data)))
+    response = client.get(url)
+    _ok(response)
+
+    # Revalidação do navegador: 304 sem passar do orçamento
+    etag = response.headers.get("etag")
+    if etag:
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_purchase_order_lifecycle_within_budget(client, data, query_budget_guard):
+    po = _ok(client.post("/purchase-orders", json=_purchase_order(data)))
+    assert len(po["items"]) == ITEMS
+
+    _ok(client.get(f"/purchase-orders/{po['id']}"))
+    # Pedidos nascem em rascunho: envia para aprovação antes de aprovar
+    _ok(
+        client.put(
+            f"/purchase-orders/{po['id']}",
+            json={"status": "PENDING_APPROVAL", "observacoes": "Conferido"},
+        )
+    )
+    _ok(client.post(f"/purchase-orders/{po['id']}/approve"))
+    _ok(
+        client.post(
+            f"/purchase-orders/{po['id']}/receive",
+            json=[{"item_id": item["id"], "quantidade_recebida": 3} for item in po["items"]],
+        )
+    )
+
+
+def test_create_sale_within_budget(client, data):
+    db = SessionLocal()
+    try:
+        # Venda, itens, baixa de estoque, versão dos dados e refresh: não cresce com os itens
+        with assert_query_budget(6, max_repeats=1):
+            crud.create_sale(db, _sale(data["products"]), client.user_id)
+    finally:
+        db.close()
+
+
+def test_assert_query_budget_detects_repeats(client, data):
+    db = SessionLocal()
+    try:
+        with pytest.raises(QueryBudgetExceeded):
+            with assert_query_budget(100, max_repeats=1):
+                for product in data["products"]:
+                    crud.get_product(db, product["id"], client.user_id)
+    finally:
+        db.close()